@@ -8,27 +8,42 @@ from PIL import Image
 import torchxrayvision as xrv
 from datetime import datetime
 from tqdm import tqdm
+from radiology_knowledge_base import get_knowledge_base
+from differential_engine import DifferentialEngine
+
+# Shared model registry lives in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from ai.model_registry import get_model_registry, load_xrv_densenet
+from ai.progress import StageTimer
 
 class AdvancedRadiologyAI:
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.registry = get_model_registry()
+        self.device = self.registry.device
         print(f"Using device: {self.device}")
         
         # Initialize model
         print("Loading AI models...")
         self.model = self.load_model()
-        self.model = self.model.to(self.device)
         print("Model loaded successfully")
         
+        # Pick threads and backends for this host; benchmarked once, then cached
+        self.registry.autotune({'model': self.model}, {'model': (1, 224, 224)})
+        
         # Define standard image size
         self.image_size = (224, 224)
+        
+        # Clinical lookup tables shared by every report
+        self.knowledge_base = get_knowledge_base()
+        self.differential_engine = DifferentialEngine(
+            self.knowledge_base.differential_rules,
+            self.knowledge_base.differential_min_confidence
+        )
 
     def load_model(self):
         """Load pre-trained model"""
         print("Loading TorchXRayVision model...")
-        model = xrv.models.DenseNet(weights="densenet121-res224-all")
-        model.eval()
-        return model
+        return load_xrv_densenet("densenet121-res224-all")
 
     def preprocess_image(self, image_path):
         """Preprocess image for model input"""
@@ -49,39 +64,44 @@ class AdvancedRadiologyAI:
             # Add batch and channel dimensions
             img = torch.from_numpy(img).unsqueeze(0).unsqueeze(0)
             
-            # Move to device
-            img = img.to(self.device)
-            
             return img
             
         except Exception as e:
             print(f"Error in preprocessing: {str(e)}")
             raise
 
-    def analyze_image(self, image_path):
-        """Perform thorough image analysis"""
+    def analyze_image(self, image_path, progress_callback=None):
+        """Perform thorough image analysis.
+
+        progress_callback(stage, message) is called as each analysis stage starts.
+        """
         try:
             start_time = time.time()
+            timer = StageTimer(progress_callback)
             
             # Process image
+            timer.stage('preprocess')
             img = self.preprocess_image(image_path)
             
             print("\nAnalyzing image...")
+            timer.stage('forward')
             with torch.no_grad():
-                output = self.model(img)
+                output = self.registry.forward(self.model, img)
             
             # Get predictions and pathology names
             predictions = {
                 name: float(pred) for name, pred in 
-                zip(self.model.pathologies, output[0].cpu())
+                zip(self.model.pathologies, output[0].float().cpu())
             }
             
             # Generate comprehensive report
+            timer.stage('report')
             analysis = self.generate_comprehensive_report(predictions)
             
             # Add analysis time
             analysis_time = time.time() - start_time
             analysis['analysis_time'] = analysis_time
+            analysis['stage_timings'] = timer.finish()
             analysis['success'] = True
             
             return analysis
@@ -132,159 +152,15 @@ class AdvancedRadiologyAI:
 
     def get_condition_description(self, condition):
         """Get detailed description of radiological findings"""
-        descriptions = {
-            'Cardiomegaly': {
-                'definition': 'Enlargement of the heart',
-                'appearance': 'Increased cardiothoracic ratio >0.5',
-                'clinical_significance': 'May indicate underlying heart disease',
-                'common_causes': [
-                    'Hypertension',
-                    'Coronary artery disease',
-                    'Valvular heart disease',
-                    'Cardiomyopathy'
-                ]
-            },
-            'Edema': {
-                'definition': 'Fluid accumulation in lung tissues',
-                'appearance': 'Bilateral opacities, often with peripheral distribution',
-                'clinical_significance': 'Indicates fluid overload or heart failure',
-                'common_causes': [
-                    'Congestive heart failure',
-                    'Renal failure',
-                    'Fluid overload',
-                    'Hypoalbuminemia'
-                ]
-            },
-            'Pneumonia': {
-                'definition': 'Infection/inflammation of lung tissue',
-                'appearance': 'Focal or diffuse opacities, often with air bronchograms',
-                'clinical_significance': 'Requires prompt antibiotic treatment',
-                'common_causes': [
-                    'Bacterial infection',
-                    'Viral infection',
-                    'Aspiration',
-                    'Hospital-acquired infection'
-                ]
-            },
-            'Atelectasis': {
-                'definition': 'Collapse of lung tissue',
-                'appearance': 'Volume loss with shift of fissures/mediastinum',
-                'clinical_significance': 'May impair oxygenation',
-                'common_causes': [
-                    'Post-operative',
-                    'Bronchial obstruction',
-                    'Poor inspiratory effort',
-                    'Pleural effusion'
-                ]
-            },
-            'Pleural Effusion': {
-                'definition': 'Fluid in pleural space',
-                'appearance': 'Blunting of costophrenic angles, fluid levels',
-                'clinical_significance': 'May indicate underlying disease',
-                'common_causes': [
-                    'Heart failure',
-                    'Malignancy',
-                    'Infection',
-                    'Pulmonary embolism'
-                ]
-            }
-        }
-        
-        return descriptions.get(condition, {
-            'definition': 'Radiological finding',
-            'appearance': 'Varies',
-            'clinical_significance': 'Requires clinical correlation',
-            'common_causes': ['Multiple possible etiologies']
-        })
+        return self.knowledge_base.description(condition)
 
     def get_recommendations(self, condition, confidence):
         """Get detailed clinical recommendations based on findings"""
-        if confidence < 50:
-            return [{
-                'type': 'Clinical',
-                'action': 'Correlate with clinical findings',
-                'urgency': 'Routine'
-            }]
-        
-        recommendations = {
-            'Cardiomegaly': [
-                {
-                    'type': 'Imaging',
-                    'action': 'Obtain echocardiogram',
-                    'urgency': 'Within 1 week'
-                },
-                {
-                    'type': 'Consultation',
-                    'action': 'Cardiology referral',
-                    'urgency': 'Within 1 week'
-                },
-                {
-                    'type': 'Laboratory',
-                    'action': 'BNP, troponin, basic metabolic panel',
-                    'urgency': 'Within 24 hours'
-                }
-            ],
-            'Pneumonia': [
-                {
-                    'type': 'Treatment',
-                    'action': 'Start empiric antibiotics',
-                    'urgency': 'Immediate'
-                },
-                {
-                    'type': 'Laboratory',
-                    'action': 'Blood cultures, CBC, CRP',
-                    'urgency': 'Immediate'
-                },
-                {
-                    'type': 'Monitoring',
-                    'action': 'Pulse oximetry monitoring',
-                    'urgency': 'Continuous'
-                }
-            ],
-            'Pleural Effusion': [
-                {
-                    'type': 'Imaging',
-                    'action': 'Consider chest ultrasound',
-                    'urgency': 'Within 24 hours'
-                },
-                {
-                    'type': 'Procedure',
-                    'action': 'Consider thoracentesis if large',
-                    'urgency': 'Within 24-48 hours'
-                },
-                {
-                    'type': 'Laboratory',
-                    'action': 'Basic metabolic panel, LDH, protein',
-                    'urgency': 'Within 24 hours'
-                }
-            ]
-        }
-        
-        return recommendations.get(condition, [{
-            'type': 'Clinical',
-            'action': 'Clinical correlation recommended',
-            'urgency': 'As needed'
-        }])
+        return self.knowledge_base.recommendations_for(condition, confidence)
 
     def determine_urgency(self, findings):
         """Determine overall urgency level based on findings"""
-        urgent_conditions = {
-            'Pneumothorax': 90,
-            'Pneumonia': 80,
-            'Pulmonary Edema': 85,
-            'Mass': 75
-        }
-        
-        for finding in findings:
-            condition = finding['condition']
-            confidence = finding['confidence']
-            
-            if condition in urgent_conditions and confidence > urgent_conditions[condition]:
-                return 'STAT'
-            elif confidence > 70:
-                return 'URGENT'
-        
-        return 'ROUTINE'
+        return self.knowledge_base.urgency(findings)
 
     def generate_action_plan(self, findings):
         """Generate structured action plan based on findings"""
@@ -351,77 +227,11 @@ class AdvancedRadiologyAI:
 
     def generate_differential_diagnoses(self, findings):
         """Generate differential diagnoses based on findings"""
-        differentials = []
-        
-        # Group related findings
-        related_findings = {}
-        for finding in findings:
-            if finding['confidence'] > 30:
-                system = self.get_body_system(finding['condition'])
-                if system not in related_findings:
-                    related_findings[system] = []
-                related_findings[system].append(finding)
-        
-        # Generate differentials for each system
-        for system, system_findings in related_findings.items():
-            differentials.extend(
-                self.get_system_differential_diagnoses(system, system_findings)
-            )
-        
-        return differentials
+        return self.differential_engine.differentials(findings)
 
     def get_body_system(self, condition):
         """Map condition to body system"""
-        system_mapping = {
-            'Cardiomegaly': 'Cardiovascular',
-            'Edema': 'Cardiovascular',
-            'Pneumonia': 'Respiratory',
-            'Atelectasis': 'Respiratory',
-            'Pleural Effusion': 'Respiratory',
-            'Mass': 'Neoplastic',
-            'Nodule': 'Neoplastic'
-        }
-        return system_mapping.get(condition, 'Other')
-
-    def get_system_differential_diagnoses(self, system, findings):
-        """Generate system-specific differential diagnoses"""
-        differentials = []
-        
-        if system == 'Cardiovascular':
-            if any('Cardiomegaly' in f['condition'] for f in findings):
-                differentials.extend([
-                    {
-                        'diagnosis': 'Hypertensive Heart Disease',
-                        'likelihood': 'High',
-                        'supporting_findings': ['Cardiomegaly'],
-                        'next_steps': ['Check blood pressure', 'Echocardiogram']
-                    },
-                    {
-                        'diagnosis': 'Dilated Cardiomyopathy',
-                        'likelihood': 'Medium',
-                        'supporting_findings': ['Cardiomegaly', 'Possible edema'],
-                        'next_steps': ['BNP', 'Echocardiogram']
-                    }
-                ])
-        
-        elif system == 'Respiratory':
-            if any('Pneumonia' in f['condition'] for f in findings):
-                differentials.extend([
-                    {
-                        'diagnosis': 'Community Acquired Pneumonia',
-                        'likelihood': 'High',
-                        'supporting_findings': ['Consolidation', 'Possible effusion'],
-                        'next_steps': ['Sputum culture', 'Blood cultures']
-                    },
-                    {
-                        'diagnosis': 'Viral Pneumonia',
-                        'likelihood': 'Medium',
-                        'supporting_findings': ['Ground glass opacities'],
-                        'next_steps': ['Viral panel', 'O2 saturation monitoring']
-                    }
-                ])
-        
-        return differentials
+        return self.knowledge_base.body_system(condition)
 
 def main():
     if len(sys.argv) != 2:
@@ -0,0 +1,54 @@
+import os
+import sys
+
+# Analyzers live in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+def image_files(folder):
+    return sorted(
+        os.path.join(root, name)
+        for root, _, files in os.walk(folder) for name in files
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_cascade.py [--train <training_folder>] <held_out_folder>")
+        return
+
+    from ai.comprehensive_radiology_ai import ComprehensiveRadiologyAI
+    from ai.screening import train_screener, evaluate_cascade, load_screener
+
+    arguments = sys.argv[1:]
+    analyzer = ComprehensiveRadiologyAI()
+
+    if arguments[0] == '--train':
+        training = image_files(arguments[1])
+        print(f"Distilling the chest screener from {len(training)} images...")
+        print(f"Saved screener weights to {train_screener(analyzer, training)}")
+        analyzer.screener = load_screener()
+        arguments = arguments[2:]
+
+    if not arguments:
+        return
+    if analyzer.screener is None:
+        print("No screener weights found; run with --train <folder> first")
+        return
+
+    held_out = image_files(arguments[0])
+    if not held_out:
+        print(f"Error: No images found in {arguments[0]}")
+        return
+
+    report = evaluate_cascade(analyzer, held_out)
+    print(f"\n{report['images']} held-out chest films, suspicion threshold {analyzer.suspicion_threshold}")
+    print(f"  Throughput: full {report['full_images_per_second']:.1f} img/s, "
+          f"cascade {report['cascade_images_per_second']:.1f} img/s ({report['speedup']:.2f}x)")
+    print(f"  Screened out: {report['screened_out'] * 100:.1f}% of studies")
+    print(f"  Miss rate: {report['missed']}/{report['abnormal']} abnormal studies cleared "
+          f"({report['miss_rate'] * 100:.1f}%)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import sys
+import time
+import resource
+import multiprocessing
+import numpy as np
+
+def legacy_preprocess(image_path):
+    """Previous skimage pipeline, with the 0-255 value range kept so outputs are comparable"""
+    import skimage.io, skimage.color, skimage.transform
+    import torchxrayvision as xrv
+
+    img = skimage.io.imread(image_path)
+    if len(img.shape) > 2:
+        img = skimage.color.rgb2gray(img[..., :3]) * 255
+    maxval = 65535 if img.dtype == np.uint16 else 255
+    img = skimage.transform.resize(img, (224, 224), preserve_range=True)
+    return xrv.datasets.normalize(img, maxval)
+
+def fast_preprocess(image_path):
+    """Current xray_diagnosis pipeline"""
+    import xray_diagnosis
+    return xray_diagnosis.preprocess_image(image_path)[0, 0].numpy()
+
+def run(name, image_path, queue):
+    """Run one pipeline in a fresh process and report its output, time and peak memory growth"""
+    # Import everything up front so module loading does not count towards peak memory
+    import torch, torchxrayvision
+    if name == 'legacy':
+        import skimage.io, skimage.color, skimage.transform
+        function = legacy_preprocess
+    else:
+        import xray_diagnosis
+        function = fast_preprocess
+
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    output = function(image_path)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+
+    queue.put((np.asarray(output, dtype=np.float32), elapsed, peak))
+
+def measure(name, image_path):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run, args=(name, image_path, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python benchmark_xray_preprocessing.py <image> [<image> ...]")
+        return
+
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    unit = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+    for image_path in sys.argv[1:]:
+        if not os.path.exists(image_path):
+            print(f"Error: Image file not found: {image_path}")
+            continue
+
+        legacy, legacy_time, legacy_peak = measure('legacy', image_path)
+        fast, fast_time, fast_peak = measure('fast', image_path)
+
+        # Outputs span [-1024, 1024]; report differences relative to that range
+        difference = np.abs(legacy - fast)
+        print(f"\n{image_path}")
+        print(f"  Time:        legacy {legacy_time * 1000:.1f} ms, fast {fast_time * 1000:.1f} ms")
+        print(f"  Peak memory: legacy +{legacy_peak / unit:.1f} MB, fast +{fast_peak / unit:.1f} MB")
+        print(f"  Parity:      max abs diff {difference.max():.2f}, mean abs diff {difference.mean():.3f} "
+              f"({difference.mean() / 20.48:.3f}% of range)")
+
+if __name__ == "__main__":
+    main()
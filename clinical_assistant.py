@@ -10,9 +10,18 @@ from torchvision import transforms, models
 from PIL import Image
 import numpy as np
 
+# Shared GUI helpers live in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from gui.thumbnail_loader import ThumbnailLoader
+from ai.model_registry import get_model_registry
+
 class ClinicalAssistant(QMainWindow):
     def __init__(self):
         super().__init__()
+        
+        # Previews decode in the background with an LRU pixmap cache
+        self.thumbnails = ThumbnailLoader(parent=self)
+        self.thumbnails.thumbnail_ready.connect(self.show_preview)
         self.setWindowTitle("Clinical Assistant")
         self.setMinimumSize(1000, 700)
         
@@ -34,9 +43,9 @@ class ClinicalAssistant(QMainWindow):
 
     def load_model(self):
         # Load pre-trained ResNet model
-        model = models.resnet50(pretrained=True)
-        model.eval()
-        return model
+        return get_model_registry().get(
+            "torchvision/resnet50-imagenet", lambda: models.resnet50(pretrained=True)
+        )
 
     def setup_ui(self):
         # Create central widget and main layout
@@ -140,15 +149,18 @@ class ClinicalAssistant(QMainWindow):
         
         if file_name:
             self.current_image_path = file_name
-            pixmap = QPixmap(file_name)
-            scaled_pixmap = pixmap.scaled(
-                self.image_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            pixmap = self.thumbnails.request(file_name, self.image_label.size())
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+            else:
+                self.image_label.setText("Loading preview...")
             self.analysis_text.clear()
 
+    def show_preview(self, image_path, pixmap):
+        """Show a decoded preview if it belongs to the current image"""
+        if self.current_image_path and image_path == os.path.abspath(self.current_image_path):
+            self.image_label.setPixmap(pixmap)
+
     def analyze_image(self):
         if not self.current_image_path:
             self.analysis_text.setText("Please upload an image first.")
@@ -162,7 +174,7 @@ class ClinicalAssistant(QMainWindow):
             
             # Analyze image
             with torch.no_grad():
-                output = self.model(input_batch)
+                output = get_model_registry().forward(self.model, input_batch)
             
             # Generate analysis text
             analysis = self.generate_analysis(output)
@@ -194,7 +206,7 @@ class ClinicalAssistant(QMainWindow):
         analysis_text += "2. Detected Features:\n"
         
         # Simulate different findings based on model output
-        probabilities = torch.nn.functional.softmax(model_output[0], dim=0)
+        probabilities = torch.nn.functional.softmax(model_output[0].float(), dim=0)
         max_prob = torch.max(probabilities).item()
         
         if max_prob > 0.8:
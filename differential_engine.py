@@ -0,0 +1,95 @@
+import numpy as np
+
+class DifferentialEngine:
+    """Differential diagnosis scoring driven by an inverted index.
+
+    Each rule weights the findings that support a candidate diagnosis. The
+    rules are indexed by finding, so scoring a report only touches the
+    postings of the findings that are actually present and accumulates all
+    candidate scores in a single vectorized pass.
+    """
+
+    def __init__(self, rules, min_confidence=30):
+        self.rules = rules
+        self.min_confidence = min_confidence
+
+        evidence_postings = {}
+        required_postings = {}
+        for rule_index, rule in enumerate(rules):
+            for finding, weight in rule['evidence'].items():
+                evidence_postings.setdefault(finding, []).append((rule_index, weight))
+            for finding in dict.fromkeys(rule['required']):
+                required_postings.setdefault(finding, []).append(rule_index)
+
+        # Flatten postings into contiguous arrays addressed by per-finding positions
+        self._evidence_positions = {}
+        rule_indices, weights = [], []
+        for finding, postings in evidence_postings.items():
+            start = len(rule_indices)
+            rule_indices.extend(index for index, _ in postings)
+            weights.extend(weight for _, weight in postings)
+            self._evidence_positions[finding] = np.arange(start, len(rule_indices))
+        self._rule_indices = np.array(rule_indices, dtype=np.intp)
+        self._weights = np.array(weights, dtype=np.float64)
+
+        self._required_rules = required_postings
+        # A rule fires only when all of its distinct required findings are present
+        self._required_counts = [len(set(rule['required'])) for rule in rules]
+
+    def score(self, findings):
+        """Return (rules, scores) arrays for the rules whose required findings are all present.
+
+        Rules come back in index order. Work grows with the findings and the
+        rules they touch, not with the size of the rule set.
+        """
+        present = {}
+        for finding in findings:
+            if finding['confidence'] > self.min_confidence:
+                condition = finding['condition']
+                present[condition] = max(present.get(condition, 0), finding['confidence'])
+
+        matched = {}
+        for condition in present:
+            for rule_index in self._required_rules.get(condition, ()):
+                matched[rule_index] = matched.get(rule_index, 0) + 1
+        candidates = np.array(sorted(
+            rule_index for rule_index, count in matched.items()
+            if count == self._required_counts[rule_index]
+        ), dtype=np.intp)
+        scores = np.zeros(len(candidates))
+        if not len(candidates):
+            return candidates, scores
+
+        positions, confidences = [], []
+        for condition, confidence in present.items():
+            if condition in self._evidence_positions:
+                postings = self._evidence_positions[condition]
+                positions.append(postings)
+                confidences.append(np.full(len(postings), confidence / 100.0))
+
+        if positions:
+            positions = np.concatenate(positions)
+            rule_indices = self._rule_indices[positions]
+            contributions = self._weights[positions] * np.concatenate(confidences)
+            # Evidence for rules that did not fire is dropped before accumulating
+            keep = np.isin(rule_indices, candidates)
+            np.add.at(scores, np.searchsorted(candidates, rule_indices[keep]), contributions[keep])
+
+        return candidates, scores
+
+    def differentials(self, findings):
+        """Ranked differential diagnoses supported by the findings"""
+        candidates, scores = self.score(findings)
+        differentials = []
+
+        for position in np.argsort(-scores, kind='stable'):
+            rule = self.rules[candidates[position]]
+            differentials.append({
+                'diagnosis': rule['diagnosis'],
+                'likelihood': rule['likelihood'],
+                'score': float(scores[position]),
+                'supporting_findings': list(rule['supporting_findings']),
+                'next_steps': list(rule['next_steps'])
+            })
+
+        return differentials
@@ -12,6 +12,11 @@ from torchvision.models import densenet121
 from PIL import Image
 import numpy as np
 
+# Shared GUI helpers live in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from gui.thumbnail_loader import ThumbnailLoader
+from ai.model_registry import get_model_registry
+
 # Define the conditions this model can detect
 CONDITIONS = [
     'Atelectasis', 'Cardiomegaly', 'Consolidation', 'Edema', 'Effusion',
@@ -35,6 +40,10 @@ class CheXNet(nn.Module):
 class MedicalAssistant(QMainWindow):
     def __init__(self):
         super().__init__()
+        
+        # Previews decode in the background with an LRU pixmap cache
+        self.thumbnails = ThumbnailLoader(parent=self)
+        self.thumbnails.thumbnail_ready.connect(self.show_preview)
         self.setWindowTitle("Medical X-Ray Assistant")
         self.setMinimumSize(1200, 800)
         
@@ -54,11 +63,9 @@ class MedicalAssistant(QMainWindow):
         self.current_image_path = None
 
     def load_model(self):
-        model = CheXNet()
-        # In a real application, you would load pre-trained weights here
+        # In a real application, the builder would load pre-trained weights here
         # model.load_state_dict(torch.load('chexnet_weights.pth'))
-        model.eval()
-        return model
+        return get_model_registry().get("medical-assistant/chexnet", CheXNet)
 
     def setup_ui(self):
         central_widget = QWidget()
@@ -211,18 +218,21 @@ class MedicalAssistant(QMainWindow):
         
         if file_name:
             self.current_image_path = file_name
-            pixmap = QPixmap(file_name)
-            scaled_pixmap = pixmap.scaled(
-                self.image_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            pixmap = self.thumbnails.request(file_name, self.image_label.size())
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+            else:
+                self.image_label.setText("Loading preview...")
             self.analysis_text.clear()
             # Reset progress bars
             for bar in self.condition_bars.values():
                 bar.setValue(0)
 
+    def show_preview(self, image_path, pixmap):
+        """Show a decoded preview if it belongs to the current image"""
+        if self.current_image_path and image_path == os.path.abspath(self.current_image_path):
+            self.image_label.setPixmap(pixmap)
+
     def analyze_image(self):
         if not self.current_image_path:
             self.analysis_text.setText("Please upload an X-ray image first.")
@@ -236,10 +246,10 @@ class MedicalAssistant(QMainWindow):
             
             # Analyze image
             with torch.no_grad():
-                output = self.model(input_batch)
+                output = get_model_registry().forward(self.model, input_batch)
             
             # Update progress bars with predictions
-            predictions = output[0].numpy() * 100
+            predictions = output[0].float().cpu().numpy() * 100
             for condition, prob in zip(CONDITIONS, predictions):
                 self.condition_bars[condition].setValue(int(prob))
             
@@ -5,12 +5,20 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
                             QTextEdit, QProgressBar, QSplashScreen)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QPixmap, QFont, QIcon
-import time
-from advanced_radiology_ai import AdvancedRadiologyAI
+
+# Shared GUI helpers live in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from gui.thumbnail_loader import ThumbnailLoader
+from ai.inference_process import RemoteAnalyzer
+from ai.progress import format_timings
+
+# Stages reported by AdvancedRadiologyAI.analyze_image, in order
+ANALYSIS_STAGES = ['preprocess', 'forward', 'report']
 
 class AnalysisWorker(QThread):
     finished = pyqtSignal(dict)
     progress = pyqtSignal(str)
+    stage = pyqtSignal(int)
     
     def __init__(self, ai_system, image_path):
         super().__init__()
@@ -18,24 +26,37 @@ class AnalysisWorker(QThread):
         self.image_path = image_path
     
     def run(self):
-        self.progress.emit("Loading models...")
-        time.sleep(1)  # Give UI time to update
-        
-        self.progress.emit("Preprocessing image...")
-        time.sleep(1)
-        
-        self.progress.emit("Analyzing with multiple AI models...")
-        analysis = self.ai_system.analyze_image(self.image_path)
-        
-        self.progress.emit("Generating report...")
-        time.sleep(1)
-        
+        analysis = self.ai_system.analyze_image(self.image_path, progress_callback=self.report_stage)
         self.finished.emit(analysis)
+    
+    def report_stage(self, stage, message):
+        """Forward analyzer stage transitions to the UI thread"""
+        self.stage.emit(ANALYSIS_STAGES.index(stage))
+        self.progress.emit(message)
+
+class ModelLoader(QThread):
+    """Construct the AI system, and so load its model, off the UI thread"""
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    
+    def run(self):
+        try:
+            # Models run in a separate inference process; the GUI talks to it over IPC
+            ai_system = RemoteAnalyzer('advanced_radiology_ai', 'AdvancedRadiologyAI')
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.loaded.emit(ai_system)
 
 class RadiologyGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, splash=None):
         super().__init__()
+        
+        # Previews decode in the background with an LRU pixmap cache
+        self.thumbnails = ThumbnailLoader(parent=self)
+        self.thumbnails.thumbnail_ready.connect(self.show_preview)
         self.ai_system = None
+        self.splash = splash
         self.initUI()
     
     def initUI(self):
@@ -165,8 +186,35 @@ class RadiologyGUI(QMainWindow):
     def initialize_ai_system(self):
         """Initialize the AI system in the background"""
         self.status_label.setText("Initializing AI system...")
-        self.ai_system = AdvancedRadiologyAI()
+        self.show_splash_message("Loading AI models...")
+        self.model_loader = ModelLoader()
+        self.model_loader.loaded.connect(self.ai_system_ready)
+        self.model_loader.failed.connect(self.ai_system_failed)
+        self.model_loader.start()
+    
+    def ai_system_ready(self, ai_system):
+        """Enable analysis once the model has loaded"""
+        self.ai_system = ai_system
+        self.analyze_btn.setEnabled(hasattr(self, 'current_image_path'))
         self.status_label.setText("System ready")
+        self.close_splash()
+    
+    def ai_system_failed(self, error):
+        self.status_label.setText(f"Failed to load AI system: {error}")
+        self.close_splash()
+    
+    def show_splash_message(self, message):
+        if self.splash is not None:
+            self.splash.showMessage(
+                message,
+                Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter,
+                Qt.GlobalColor.white
+            )
+    
+    def close_splash(self):
+        if self.splash is not None:
+            self.splash.finish(self)
+            self.splash = None
     
     def upload_image(self):
         """Handle image upload"""
@@ -178,18 +226,22 @@ class RadiologyGUI(QMainWindow):
         )
         
         if file_name:
-            pixmap = QPixmap(file_name)
-            scaled_pixmap = pixmap.scaled(
-                self.image_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
+            pixmap = self.thumbnails.request(file_name, self.image_label.size())
+            if pixmap is not None:
+                self.image_label.setPixmap(pixmap)
+            else:
+                self.image_label.setText("Loading preview...")
             self.current_image_path = file_name
-            self.analyze_btn.setEnabled(True)
+            self.analyze_btn.setEnabled(self.ai_system is not None)
             self.analysis_text.clear()
             self.status_label.setText("Image loaded")
     
+    def show_preview(self, image_path, pixmap):
+        """Show a decoded preview if it belongs to the current image"""
+        current = getattr(self, 'current_image_path', None)
+        if current and image_path == os.path.abspath(current):
+            self.image_label.setPixmap(pixmap)
+
     def analyze_image(self):
         """Handle image analysis"""
         if not hasattr(self, 'current_image_path'):
@@ -197,12 +249,14 @@ class RadiologyGUI(QMainWindow):
         
         # Disable UI elements
         self.analyze_btn.setEnabled(False)
-        self.progress_bar.setMaximum(0)  # Indeterminate progress
+        self.progress_bar.setMaximum(len(ANALYSIS_STAGES))
+        self.progress_bar.setValue(0)
         self.progress_bar.show()
         
         # Create and start worker thread
         self.worker = AnalysisWorker(self.ai_system, self.current_image_path)
         self.worker.progress.connect(self.update_progress)
+        self.worker.stage.connect(self.progress_bar.setValue)
         self.worker.finished.connect(self.analysis_complete)
         self.worker.start()
     
@@ -259,7 +313,7 @@ class RadiologyGUI(QMainWindow):
             report += "verified by a qualified radiologist. Clinical correlation is recommended."
             
             self.analysis_text.setText(report)
-            self.status_label.setText("Analysis complete")
+            self.status_label.setText(f"Analysis complete ({format_timings(analysis['stage_timings'])})")
         else:
             self.analysis_text.setText(f"Error during analysis: {analysis.get('error', 'Unknown error')}")
             self.status_label.setText("Analysis failed")
@@ -272,12 +326,10 @@ def main():
     splash = QSplashScreen(splash_pix)
     splash.show()
     
-    # Create and show main window
-    window = RadiologyGUI()
+    # Show the main window right away; the splash closes once the model has loaded
+    window = RadiologyGUI(splash)
     window.show()
-    
-    # Close splash screen
-    splash.finish(window)
+    splash.raise_()
     
     sys.exit(app.exec())
 
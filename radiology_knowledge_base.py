@@ -0,0 +1,83 @@
+import os
+import json
+from types import MappingProxyType
+from functools import lru_cache
+
+KNOWLEDGE_BASE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'data', 'radiology_knowledge_base.json'
+)
+SUPPORTED_VERSION = 2
+
+def freeze(value):
+    """Recursively convert dicts to read-only mappings and lists to tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+class RadiologyKnowledgeBase:
+    """Read-only clinical lookup tables used to build radiology reports.
+
+    The tables are loaded once from a versioned JSON file and frozen, so
+    every report shares the same description and recommendation objects
+    instead of rebuilding them per finding.
+    """
+
+    def __init__(self, data):
+        self.version = data.get('version')
+        if self.version != SUPPORTED_VERSION:
+            raise ValueError(
+                f"Unsupported knowledge base version {self.version} (expected {SUPPORTED_VERSION})"
+            )
+
+        self.descriptions = freeze(data['descriptions'])
+        self.default_description = freeze(data['default_description'])
+        self.recommendations = freeze(data['recommendations'])
+        self.default_recommendations = freeze(data['default_recommendations'])
+        self.low_confidence_threshold = data['low_confidence_threshold']
+        self.low_confidence_recommendations = freeze(data['low_confidence_recommendations'])
+        self.body_systems = freeze(data['body_systems'])
+        self.default_body_system = data['default_body_system']
+        self.urgent_conditions = freeze(data['urgent_conditions'])
+        self.urgent_confidence_threshold = data['urgent_confidence_threshold']
+        self.differential_min_confidence = data['differential_min_confidence']
+        self.differential_rules = freeze(data['differential_rules'])
+
+    @classmethod
+    def load(cls, path=KNOWLEDGE_BASE_PATH):
+        """Load the knowledge base from a JSON file"""
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def description(self, condition):
+        """Description of a radiological finding"""
+        return self.descriptions.get(condition, self.default_description)
+
+    def recommendations_for(self, condition, confidence):
+        """Clinical recommendations for a finding at the given confidence (percent)"""
+        if confidence < self.low_confidence_threshold:
+            return self.low_confidence_recommendations
+        return self.recommendations.get(condition, self.default_recommendations)
+
+    def body_system(self, condition):
+        """Body system a condition belongs to"""
+        return self.body_systems.get(condition, self.default_body_system)
+
+    def urgency(self, findings):
+        """Overall urgency level for findings sorted by confidence"""
+        for finding in findings:
+            condition = finding['condition']
+            confidence = finding['confidence']
+
+            if condition in self.urgent_conditions and confidence > self.urgent_conditions[condition]:
+                return 'STAT'
+            elif confidence > self.urgent_confidence_threshold:
+                return 'URGENT'
+
+        return 'ROUTINE'
+
+@lru_cache(maxsize=None)
+def get_knowledge_base(path=KNOWLEDGE_BASE_PATH):
+    """Process-wide knowledge base, loaded on first use"""
+    return RadiologyKnowledgeBase.load(path)
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import hashlib
+import platform
+import threading
+import statistics
+import torch
+import torch.nn as nn
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.cpu_topology import cpu_budget
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "clinical-imaging", "autotune.json")
+
+# Untuned behaviour: current thread count, contiguous inputs, oneDNN on, no autocast, eager
+DEFAULT_CONFIG = {
+    'threads': None,
+    'channels_last': False,
+    'mkldnn': True,
+    'autocast': None,
+    'compiled': False
+}
+
+# Options tried one at a time on top of the best thread count, in order
+CANDIDATE_OPTIONS = [
+    {'channels_last': True},
+    {'mkldnn': False},
+    {'autocast': 'bfloat16'},
+    {'compiled': True}
+]
+
+# A candidate must beat the current best by this fraction to be kept
+MIN_SPEEDUP = 0.05
+
+# Largest output difference, relative to the reference output, a candidate may introduce
+MAX_RELATIVE_ERROR = 0.02
+
+def host_fingerprint(device: torch.device, precision: str) -> str:
+    """Stable identifier for the hardware and software a tuned config is valid for"""
+    cpu_model = platform.processor()
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    cpu_model = line.split(':', 1)[1].strip()
+                    break
+    except OSError:
+        pass
+
+    parts = [
+        platform.machine(), cpu_model, str(os.cpu_count()), str(cpu_budget()),
+        torch.__version__, str(device), precision
+    ]
+    if device.type == 'cuda':
+        parts.append(torch.cuda.get_device_name(device))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+def configured_forward(model: Callable, config: Dict, batch: torch.Tensor, device_type: str) -> torch.Tensor:
+    """Run a forward pass with a tuned config's memory format and autocast.
+
+    The thread count and oneDNN switch are process-wide, so they are not
+    applied here; the registry sets them once after tuning.
+    """
+    if config.get('channels_last') and batch.dim() == 4:
+        batch = batch.contiguous(memory_format=torch.channels_last)
+    autocast = config.get('autocast')
+    # autocast state is per thread, so concurrent forward passes do not see each other's
+    with torch.autocast(device_type=device_type, dtype=getattr(torch, autocast or 'bfloat16'),
+                        enabled=autocast is not None):
+        return model(batch)
+
+class AutoTuner:
+    """Benchmarks execution configs for each model on this host and remembers the winners.
+
+    Thread counts are tried first, then channels-last inputs, oneDNN off,
+    bfloat16 autocast and torch.compile one at a time on top of the best
+    config so far; an option is kept only if it is faster and its outputs
+    match the untuned model. Results are stored per host fingerprint and
+    model key, so each host benchmarks a model once.
+    """
+
+    def __init__(self, device: torch.device, dtype: torch.dtype, precision: str,
+                 tune_threads: bool = True, path: str = None, batch_size: int = 4):
+        self.device = device
+        self.dtype = dtype
+        self.tune_threads = tune_threads and device.type == 'cpu'
+        self.path = path or os.environ.get("CLINICAL_AUTOTUNE_CACHE", DEFAULT_CACHE)
+        self.batch_size = batch_size
+        self.fingerprint = host_fingerprint(device, precision)
+        self._lock = threading.Lock()
+
+    def cached_config(self, key: str) -> Optional[Dict]:
+        return self._load().get(self.fingerprint, {}).get(key)
+
+    def tune(self, key: str, model: nn.Module, input_shape: Tuple[int, ...]) -> Dict:
+        """Benchmark configs for one model and persist the fastest"""
+        print(f"Tuning {key} for this host...")
+        batch = torch.randn(self.batch_size, *input_shape).to(device=self.device, dtype=self.dtype)
+
+        original_threads = torch.get_num_threads()
+        best = dict(DEFAULT_CONFIG, threads=original_threads if self.tune_threads else None)
+        with torch.no_grad():
+            reference = self.forward(model, best, batch).float()
+            best_time = self.time_config(model, best, batch)
+
+            for threads in self.thread_candidates():
+                if threads == best['threads']:
+                    continue
+                candidate = dict(best, threads=threads)
+                torch.set_num_threads(threads)
+                elapsed = self.time_config(model, candidate, batch)
+                if elapsed < best_time:
+                    best, best_time = candidate, elapsed
+
+            if best['threads']:
+                torch.set_num_threads(best['threads'])
+            for option in CANDIDATE_OPTIONS:
+                candidate = dict(best, **option)
+                if not self.supported(candidate):
+                    continue
+                elapsed = None
+                try:
+                    runner = self.runner(model, candidate)
+                    output = self.forward(runner, candidate, batch).float()
+                    if self.matches(output, reference):
+                        elapsed = self.time_config(runner, candidate, batch)
+                    else:
+                        print(f"  {option} changes outputs, skipped")
+                except Exception as e:
+                    print(f"  {option} failed: {e}")
+
+                if elapsed is not None and elapsed < best_time * (1 - MIN_SPEEDUP):
+                    best, best_time = candidate, elapsed
+                elif candidate['channels_last'] and not best['channels_last']:
+                    # Undo the in-place memory format change of a rejected candidate
+                    model.to(memory_format=torch.contiguous_format)
+
+        torch.set_num_threads(original_threads)
+        print(f"  {key}: {best_time * 1000 / self.batch_size:.1f} ms/image with {best}")
+        self._store(key, best)
+        return best
+
+    def forward(self, model: Callable, config: Dict, batch: torch.Tensor) -> torch.Tensor:
+        """Forward pass with a config's oneDNN switch; tuning runs before any request"""
+        with torch.backends.mkldnn.flags(enabled=config.get('mkldnn', True)):
+            return configured_forward(model, config, batch, self.device.type)
+
+    def thread_candidates(self) -> List[int]:
+        if not self.tune_threads:
+            return []
+        budget = cpu_budget()
+        return sorted({max(budget // divisor, 1) for divisor in (1, 2, 4, 8)}, reverse=True)
+
+    def supported(self, config: Dict) -> bool:
+        if config['autocast'] and self.dtype != torch.float32:
+            return False  # Already running in reduced precision
+        if config['compiled'] and not hasattr(torch, 'compile'):
+            return False
+        if not config['mkldnn'] and self.device.type != 'cpu':
+            return False
+        return True
+
+    @staticmethod
+    def runner(model: nn.Module, config: Dict) -> Callable:
+        """Model prepared for a config: memory format converted and compiled if requested"""
+        if config['channels_last']:
+            model.to(memory_format=torch.channels_last)
+        if config['compiled']:
+            return torch.compile(model)
+        return model
+
+    @staticmethod
+    def matches(output: torch.Tensor, reference: torch.Tensor) -> bool:
+        scale = max(float(reference.abs().max()), 1.0)
+        return float((output - reference).abs().max()) <= MAX_RELATIVE_ERROR * scale
+
+    def time_config(self, model: Callable, config: Dict, batch: torch.Tensor,
+                    warmup: int = 2, repeats: int = 5) -> float:
+        """Median forward time of a config"""
+        timings = []
+        for i in range(warmup + repeats):
+            start = time.perf_counter()
+            self.forward(model, config, batch)
+            if self.device.type == 'cuda':
+                torch.cuda.synchronize(self.device)
+            if i >= warmup:
+                timings.append(time.perf_counter() - start)
+        return statistics.median(timings)
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    def _store(self, key: str, config: Dict):
+        # Read-modify-replace so concurrent inference processes at worst re-tune a model
+        with self._lock:
+            cache = self._load()
+            cache.setdefault(self.fingerprint, {})[key] = config
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            temporary = f"{self.path}.{os.getpid()}.tmp"
+            with open(temporary, 'w') as output:
+                json.dump(cache, output, indent=2)
+            os.replace(temporary, self.path)
@@ -1,3 +1,5 @@
+import os
+import time
 import torch
 import torch.nn as nn
 import torchvision.models as models
@@ -5,7 +7,8 @@ import torchxrayvision as xrv
 import numpy as np
 from PIL import Image
 import torchvision.transforms as transforms
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import monai
 from monai.networks.nets import DenseNet121
 from monai.transforms import (
@@ -14,10 +17,36 @@ from monai.transforms import (
     ScaleIntensity,
     ResizeWithPadOrCrop,
 )
+from utils.image_pyramid import get_pyramid_cache
+from ai.progress import StageTimer
+from utils.cpu_topology import cpu_budget
+from ai.model_registry import get_model_registry, load_concurrently, load_xrv_densenet
+from ai.screening import load_screener
+from ai.modality_classifier import THUMBNAIL_SIZE, load_modality_classifier, load_thumbnail, classify
+from ai.tta import augment_views, summarize_views
+
+# Input size of the full models and of the cheaper variant used to meet deadlines
+INPUT_SIZE = 224
+FAST_INPUT_SIZE = 128
+
+# Image types with a cheaper variant; the TorchXRayVision chest model resamples
+# every input back to 224, so a smaller chest input costs the same and only loses detail
+FAST_IMAGE_TYPES = ('general', 'musculoskeletal', 'neuro')
+
+# Screener score from which a chest film goes on to the full model
+SUSPICION_THRESHOLD = 0.3
+
+# Screener disagreement between an image and its mirror image that counts as uncertain
+UNCERTAINTY_MARGIN = 0.1
+
+# Modality classifier confidence below which auto-detection falls back to the heuristics
+MODALITY_CONFIDENCE = 0.6
 
 class ComprehensiveRadiologyAI:
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Device, threads and precision are owned by the shared model registry
+        self.registry = get_model_registry()
+        self.device = self.registry.device
         print(f"Using device: {self.device}")
         
         # Initialize models
@@ -25,6 +54,33 @@ class ComprehensiveRadiologyAI:
         self.model_dict = self.load_models()
         print("Models loaded successfully")
         
+        # Pick threads and backends for this host; benchmarked once, then cached
+        self.registry.autotune(self.model_dict, {
+            'chest': (1, 224, 224),
+            'general': (3, 224, 224),
+            'musculoskeletal': (3, 224, 224),
+            'neuro': (3, 224, 224)
+        })
+        
+        # Triage cascade for chest films: opt-in with CLINICAL_CASCADE=1 once a screener has been
+        # distilled on this host and its miss rate checked with benchmark_cascade.py
+        self.screener = load_screener()
+        self.cascade = self.screener is not None and os.environ.get("CLINICAL_CASCADE", "0") == "1"
+        self.suspicion_threshold = float(os.environ.get("CLINICAL_SUSPICION_THRESHOLD", SUSPICION_THRESHOLD))
+        self.uncertainty_margin = UNCERTAINTY_MARGIN
+        if self.screener is not None:
+            self.registry.autotune({'screener': self.screener}, {'screener': (1, 224, 224)})
+        
+        # Learned modality detection when trained weights are installed, heuristics otherwise
+        self.modality_classifier = load_modality_classifier()
+        self.modality_confidence = MODALITY_CONFIDENCE
+        if self.modality_classifier is not None:
+            self.registry.autotune({'modality': self.modality_classifier},
+                                   {'modality': (1, THUMBNAIL_SIZE, THUMBNAIL_SIZE)})
+        
+        # Downsampled image levels shared with the GUI previews
+        self.pyramid = get_pyramid_cache()
+        
         # Define image transformations for different modalities
         self.transforms = {
             'chest': None,  # We'll handle chest X-ray preprocessing separately
@@ -61,48 +117,46 @@ class ComprehensiveRadiologyAI:
         ])
     
     def load_models(self) -> Dict[str, nn.Module]:
-        """Load multiple specialized radiology models"""
-        model_dict = {}
-        
-        # Load TorchXRayVision model for chest X-rays
-        model_dict['chest'] = xrv.models.DenseNet(weights="densenet121-res224-all")
-        model_dict['chest'].to(self.device)
-        model_dict['chest'].eval()
-        
+        """Load multiple specialized radiology models concurrently through the shared registry"""
         # Load MONAI DenseNet for general radiology
-        model_dict['general'] = DenseNet121(
-            spatial_dims=2,
-            in_channels=3,  # RGB input
-            out_channels=len(self.general_conditions)
-        )
-        model_dict['general'].to(self.device)
-        model_dict['general'].eval()
+        def general():
+            return DenseNet121(
+                spatial_dims=2,
+                in_channels=3,  # RGB input
+                out_channels=len(self.general_conditions)
+            )
         
         # Load specialized models for different body parts
-        model_dict['musculoskeletal'] = models.densenet121(pretrained=True)
-        num_ftrs = model_dict['musculoskeletal'].classifier.in_features
-        model_dict['musculoskeletal'].classifier = nn.Sequential(
-            nn.Linear(num_ftrs, 512),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(512, len(self.musculoskeletal_conditions))
-        )
-        model_dict['musculoskeletal'].to(self.device)
-        model_dict['musculoskeletal'].eval()
+        def musculoskeletal():
+            model = models.densenet121(pretrained=True)
+            num_ftrs = model.classifier.in_features
+            model.classifier = nn.Sequential(
+                nn.Linear(num_ftrs, 512),
+                nn.ReLU(),
+                nn.Dropout(0.3),
+                nn.Linear(512, len(self.musculoskeletal_conditions))
+            )
+            return model
         
         # Load model for neurological imaging
-        model_dict['neuro'] = models.resnet50(pretrained=True)
-        num_ftrs = model_dict['neuro'].fc.in_features
-        model_dict['neuro'].fc = nn.Sequential(
-            nn.Linear(num_ftrs, 512),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(512, len(self.neuro_conditions))
-        )
-        model_dict['neuro'].to(self.device)
-        model_dict['neuro'].eval()
+        def neuro():
+            model = models.resnet50(pretrained=True)
+            num_ftrs = model.fc.in_features
+            model.fc = nn.Sequential(
+                nn.Linear(num_ftrs, 512),
+                nn.ReLU(),
+                nn.Dropout(0.3),
+                nn.Linear(512, len(self.neuro_conditions))
+            )
+            return model
         
-        return model_dict
+        return load_concurrently({
+            # TorchXRayVision model for chest X-rays
+            'chest': lambda: load_xrv_densenet("densenet121-res224-all"),
+            'general': lambda: self.registry.get("comprehensive-radiology/general", general),
+            'musculoskeletal': lambda: self.registry.get("comprehensive-radiology/musculoskeletal", musculoskeletal),
+            'neuro': lambda: self.registry.get("comprehensive-radiology/neuro", neuro)
+        })
     
     @property
     def general_conditions(self) -> List[str]:
@@ -151,8 +205,51 @@ class ComprehensiveRadiologyAI:
         ]
     
     def detect_image_type(self, image_path: str) -> str:
-        """Detect the type of radiological image using advanced image analysis"""
-        image = Image.open(image_path).convert('L')  # Convert to grayscale for analysis
+        """Detect the type of radiological image"""
+        return self.detect_modalities([image_path])[0]['image_type']
+    
+    def detect_modalities(self, image_paths: List[str], max_workers: int = None) -> List[Optional[Dict]]:
+        """Modality, body part, image type and confidence of many images.
+        
+        Thumbnails are classified in batches by the modality classifier;
+        images it is unsure about, or all images when it is not installed,
+        go through the heuristics instead. Unreadable images give None.
+        """
+        def thumbnail(path):
+            try:
+                return load_thumbnail(path)
+            except Exception:
+                return None
+        
+        detections = [None] * len(image_paths)
+        if self.modality_classifier is not None:
+            with ThreadPoolExecutor(max_workers=max_workers or min(8, cpu_budget())) as pool:
+                thumbnails = list(pool.map(thumbnail, image_paths))
+            readable = [i for i, image in enumerate(thumbnails) if image is not None]
+            for start in range(0, len(readable), 256):
+                indices = readable[start:start + 256]
+                for i, detection in zip(indices, classify(self.modality_classifier, [thumbnails[i] for i in indices])):
+                    detections[i] = detection
+        
+        for i, path in enumerate(image_paths):
+            if detections[i] is None or detections[i]['confidence'] < self.modality_confidence:
+                try:
+                    detections[i] = {
+                        'modality': None,
+                        'body_part': None,
+                        'image_type': self.detect_image_type_heuristic(path),
+                        'confidence': None,
+                        'method': 'heuristic',
+                        'classifier': detections[i]
+                    }
+                except Exception:
+                    detections[i] = None
+        return detections
+    
+    def detect_image_type_heuristic(self, image_path: str) -> str:
+        """Detect the type of radiological image from intensity statistics"""
+        # Statistics are resolution independent, so read a small pyramid level
+        image = self.pyramid.get_image(image_path, (256, 256)).convert('L')
         
         # Get image statistics
         img_array = np.array(image)
@@ -322,83 +419,253 @@ class ComprehensiveRadiologyAI:
         
         return recommendations
     
-    def analyze_image(self, image_path: str, image_type: str = None) -> Dict:
-        """Analyze radiological image and generate comprehensive report"""
+    def resolve_image_type(self, image_path: str, image_type: str = None) -> str:
+        """Normalize a requested image type, auto-detecting it when not specified"""
+        return self.resolve_image_types([image_path], image_type)[0][0]
+    
+    def resolve_image_types(self, image_paths: List[str], image_type: str = None,
+                            max_workers: int = None) -> List[Tuple[str, Optional[Dict]]]:
+        """Image type and detection details of each image; auto-detection runs batched"""
+        if image_type is None or image_type.lower() == 'auto-detect':
+            detections = self.detect_modalities(image_paths, max_workers)
+            return [
+                (detection['image_type'], detection) if detection is not None else (None, None)
+                for detection in detections
+            ]
+        return [(image_type.lower().replace(" ", "_"), None)] * len(image_paths)
+    
+    def load_image(self, image_path: str, size: int = INPUT_SIZE) -> Image.Image:
+        """Load the nearest pyramid level that still covers the model input size"""
+        return self.pyramid.get_image(image_path, (size, size))
+    
+    def preprocess(self, image: Image.Image, image_type: str, size: int = INPUT_SIZE) -> torch.Tensor:
+        """Convert an image into a model input tensor without batch dimension"""
+        if image_type == 'chest':
+            # Process chest X-rays using TorchXRayVision's method
+            img = np.array(image.convert('L'))
+            img = xrv.datasets.normalize(img, 255)  # Normalize to [-1024, 1024]
+            return transforms.Resize(size)(torch.from_numpy(img).unsqueeze(0))
+        
+        # Keep RGB for other models trained on ImageNet
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        transform = self.transforms.get(image_type, self.transforms['general'])
+        tensor = transform(image)
+        if size != INPUT_SIZE:
+            # The networks pool adaptively, so they accept a smaller input as is
+            tensor = transforms.Resize((size, size), antialias=True)(tensor)
+        return tensor
+    
+    def conditions_for(self, image_type: str) -> List[str]:
+        """Output class names of the model used for an image type"""
+        if image_type == 'chest':
+            return list(self.model_dict['chest'].pathologies)
+        elif image_type == "musculoskeletal":
+            return self.musculoskeletal_conditions
+        elif image_type == "neuro":
+            return self.neuro_conditions
+        return self.general_conditions
+    
+    def predict_probabilities(self, batch: torch.Tensor, image_type: str) -> torch.Tensor:
+        """Run one forward pass over a batch and return a (images, conditions) probability tensor"""
+        with torch.no_grad():
+            outputs = self.registry.forward(self.model_dict[image_type], batch).float()
+        if image_type == 'chest':
+            # TorchXRayVision models already output calibrated probabilities
+            return outputs.cpu()
+        return torch.sigmoid(outputs).cpu()
+    
+    def predict(self, batch: torch.Tensor, image_type: str) -> List[Dict[str, float]]:
+        """Run one forward pass over a batch and return per-image probabilities"""
+        conditions = self.conditions_for(image_type)
+        return [dict(zip(conditions, row)) for row in self.predict_probabilities(batch, image_type).tolist()]
+    
+    def use_cascade(self, image_type: str, cascade: bool = None) -> bool:
+        """Whether chest films of this request are screened before the full model"""
+        enabled = self.cascade if cascade is None else cascade
+        return enabled and self.screener is not None and image_type == 'chest'
+    
+    def screen(self, batch: torch.Tensor) -> List[Tuple[float, bool]]:
+        """Screener score of each image and whether it needs the full model.
+        
+        Images go on when the score reaches the suspicion threshold, or when
+        the scores of the image and its mirror image disagree by more than
+        the uncertainty margin.
+        """
+        with torch.no_grad():
+            outputs = self.registry.forward(self.screener, torch.cat([batch, batch.flip(-1)]))
+            scores = torch.sigmoid(outputs.float()).cpu().view(2, -1)
+        results = []
+        for original, mirrored in zip(scores[0].tolist(), scores[1].tolist()):
+            score = (original + mirrored) / 2
+            uncertain = abs(original - mirrored) > self.uncertainty_margin
+            results.append((score, score >= self.suspicion_threshold or uncertain))
+        return results
+    
+    def build_report(self, image_type: str, findings: Dict[str, float]) -> Dict:
+        """Build the per-image report from raw class probabilities"""
+        # Filter findings by confidence
+        significant_findings = {
+            k: v for k, v in findings.items() if v > 0.2
+        }
+        
+        # Get detailed features and recommendations
+        features = self.get_features(image_type, significant_findings)
+        recommendations = self.get_recommendations(image_type, significant_findings)
+        
+        # Determine urgency level
+        urgency = 'STAT' if any(conf > 0.7 for conf in findings.values()) else 'ROUTINE'
+        
+        return {
+            'success': True,
+            'image_type': image_type,
+            'findings': significant_findings,
+            'features': features,
+            'recommendations': recommendations,
+            'urgency_level': urgency
+        }
+    
+    def analyze_image(self, image_path: str, image_type: str = None, progress_callback=None,
+                      fast: bool = False, cascade: bool = None, tta: bool = False) -> Dict:
+        """Analyze radiological image and generate comprehensive report.
+        
+        progress_callback(stage, message) is called as each analysis stage starts.
+        fast runs the models on a reduced-resolution input, a cheaper and less
+        accurate read used when the full analysis would miss a deadline; it
+        is ignored for image types outside FAST_IMAGE_TYPES.
+        cascade (default: the analyzer's setting) screens chest films first
+        and clears unsuspicious ones without the full model. The report's
+        'variant' is 'full', 'fast' or 'screened'. tta runs flipped, rotated
+        and cropped views in one batched forward pass; findings are the mean
+        over views and report['tta'] holds each condition's mean and variance.
+        """
+        timer = StageTimer(progress_callback)
         try:
-            # Auto-detect image type if not specified
-            if image_type is None or image_type.lower() == 'auto-detect':
-                image_type = self.detect_image_type(image_path)
-            else:
-                image_type = image_type.lower().replace(" ", "_")
+            timer.stage('decode')
+            image_type, detection = self.resolve_image_types([image_path], image_type)[0]
+            fast = fast and image_type in FAST_IMAGE_TYPES
+            size = FAST_INPUT_SIZE if fast else INPUT_SIZE
+            image = self.load_image(image_path, size)
             
-            # Load and preprocess image based on type
-            image = Image.open(image_path)
+            timer.stage('preprocess')
+            image_tensor = self.preprocess(image, image_type, size).unsqueeze(0)
             
-            if image_type == 'chest':
-                # Process chest X-rays using TorchXRayVision's method
-                img = np.array(image.convert('L'))
-                img = xrv.datasets.normalize(img, 255)  # Normalize to [0, 1]
-                img = transforms.Resize(224)(torch.from_numpy(img).unsqueeze(0))
-                image_tensor = img.unsqueeze(0)  # Add batch dimension
+            timer.stage('forward')
+            score, needs_full = None, True
+            if self.use_cascade(image_type, cascade):
+                score, needs_full = self.screen(image_tensor)[0]
+            summary = None
+            if not needs_full:
+                findings = {}
+            elif tta:
+                views = augment_views(image_tensor[0])
+                summary = summarize_views(self.conditions_for(image_type),
+                                          self.predict_probabilities(views, image_type))
+                findings = summary['mean']
             else:
-                # Keep RGB for other models trained on ImageNet
-                if image.mode != 'RGB':
-                    image = image.convert('RGB')
-                transform = self.transforms.get(image_type, self.transforms['general'])
-                # Apply transform for non-chest images
-                image_tensor = transform(image).unsqueeze(0)
+                findings = self.predict(image_tensor, image_type)[0]
             
-            # Move tensor to device
-            image_tensor = image_tensor.to(self.device)
+            timer.stage('report')
+            report = self.build_report(image_type, findings)
+            if summary is not None:
+                report['tta'] = summary
+            report['variant'] = 'screened' if not needs_full else 'fast' if fast else 'full'
+            report['input_size'] = size
+            if score is not None:
+                report['screening_score'] = score
+            if detection is not None:
+                report['detection'] = detection
+            report['stage_timings'] = timer.finish()
+            return report
             
-            # Select appropriate model and get predictions
-            model = self.model_dict[image_type]
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
+    def analyze_batch(self, image_paths: List[str], image_type: str = None, batch_size: int = 32,
+                      max_workers: int = None, result_callback=None, cascade: bool = None) -> Dict:
+        """Analyze many images with parallel decoding and batched forward passes.
+        
+        Images are grouped by resolved image type and input shape, so
+        auto-detected studies of different modalities can share one call.
+        result_callback(index, result) is called as each image's report is
+        ready. Forward time is amortized over the images of a batch. With
+        the cascade, only chest films the screener flags reach the full model.
+        """
+        try:
+            # Auto-detection classifies all thumbnails in batched passes up front
+            detect_start = time.perf_counter()
+            resolved_types = self.resolve_image_types(image_paths, image_type, max_workers)
+            detect_time = (time.perf_counter() - detect_start) / max(len(image_paths), 1)
             
-            with torch.no_grad():
-                if image_type == 'chest':
-                    outputs = model(image_tensor)
-                    findings = {}
-                    # Get predictions from the model
-                    outputs = outputs.squeeze()  # Remove batch dimension
-                    for i, pathology in enumerate(model.pathologies):
-                        prob = float(torch.sigmoid(outputs[i]).item())
-                        findings[pathology] = prob
-                else:
-                    outputs = model(image_tensor)
-                    probabilities = torch.sigmoid(outputs)[0]
+            # Decode and preprocess in parallel; PIL and torch release the GIL
+            def load(path, resolved):
+                try:
+                    if resolved is None:
+                        raise ValueError(f"Could not read {path}")
+                    timings = {}
+                    start = time.perf_counter()
+                    image = self.load_image(path)
+                    timings['decode'] = time.perf_counter() - start + detect_time
                     
-                    # Get appropriate condition list
-                    if image_type == "musculoskeletal":
-                        conditions = self.musculoskeletal_conditions
-                    elif image_type == "neuro":
-                        conditions = self.neuro_conditions
-                    else:
-                        conditions = self.general_conditions
-                    
-                    findings = {
-                        condition: float(prob)
-                        for condition, prob in zip(conditions, probabilities)
-                    }
+                    start = time.perf_counter()
+                    tensor = self.preprocess(image, resolved)
+                    timings['preprocess'] = time.perf_counter() - start
+                    return resolved, tensor, timings, None
+                except Exception as e:
+                    return None, None, None, str(e)
             
-            # Filter findings by confidence
-            significant_findings = {
-                k: v for k, v in findings.items() if v > 0.2
-            }
+            # Decode threads share the container's CPU quota with the forward passes
+            with ThreadPoolExecutor(max_workers=max_workers or min(8, cpu_budget())) as pool:
+                loaded = list(pool.map(load, image_paths, [resolved for resolved, _ in resolved_types]))
             
-            # Get detailed features and recommendations
-            features = self.get_features(image_type, significant_findings)
-            recommendations = self.get_recommendations(image_type, significant_findings)
+            results = [None] * len(image_paths)
+            groups = {}
+            for i, (resolved, tensor, _, error) in enumerate(loaded):
+                if error is not None:
+                    results[i] = {'success': False, 'image_path': image_paths[i], 'error': error}
+                    if result_callback is not None:
+                        result_callback(i, results[i])
+                else:
+                    groups.setdefault((resolved, tuple(tensor.shape)), []).append(i)
             
-            # Determine urgency level
-            urgency = 'STAT' if any(conf > 0.7 for conf in findings.values()) else 'ROUTINE'
+            # One forward pass per chunk of same-type, same-shape inputs
+            for (resolved, _), group in groups.items():
+                for start in range(0, len(group), batch_size):
+                    indices = group[start:start + batch_size]
+                    batch = torch.stack([loaded[i][1] for i in indices])
+                    forward_start = time.perf_counter()
+                    if self.use_cascade(resolved, cascade):
+                        screening = self.screen(batch)
+                    else:
+                        screening = [(None, True)] * len(indices)
+                    suspicious = [k for k, (_, needs_full) in enumerate(screening) if needs_full]
+                    predictions = {}
+                    if suspicious:
+                        predictions = dict(zip(suspicious, self.predict(batch[suspicious], resolved)))
+                    forward_time = (time.perf_counter() - forward_start) / len(indices)
+                    
+                    for k, i in enumerate(indices):
+                        report_start = time.perf_counter()
+                        results[i] = self.build_report(resolved, predictions.get(k, {}))
+                        results[i]['variant'] = 'full' if k in predictions else 'screened'
+                        if screening[k][0] is not None:
+                            results[i]['screening_score'] = screening[k][0]
+                        if resolved_types[i][1] is not None:
+                            results[i]['detection'] = resolved_types[i][1]
+                        results[i]['image_path'] = image_paths[i]
+                        results[i]['stage_timings'] = dict(
+                            loaded[i][2], forward=forward_time,
+                            report=time.perf_counter() - report_start
+                        )
+                        if result_callback is not None:
+                            result_callback(i, results[i])
             
             return {
                 'success': True,
-                'image_type': image_type,
-                'findings': significant_findings,
-                'features': features,
-                'recommendations': recommendations,
-                'urgency_level': urgency
+                'images': results
             }
             
         except Exception as e:
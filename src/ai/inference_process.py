@@ -0,0 +1,263 @@
+import time
+import queue
+import pickle
+import importlib
+import itertools
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Optional
+from utils.cpu_topology import Placement, apply_placement
+
+# Marker for arrays moved into shared memory
+SHARED_ARRAY = '__shared_array__'
+
+def export_arrays(value: Any) -> Any:
+    """Move NumPy arrays nested in a result into shared memory blocks.
+
+    Arrays are replaced by descriptors naming their block; the receiving
+    process copies them out with import_arrays and unlinks the blocks.
+    Read-only mappings, such as the knowledge base's frozen tables, become
+    plain dicts so the result can be pickled.
+    """
+    if isinstance(value, np.ndarray):
+        block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+        np.ndarray(value.shape, value.dtype, buffer=block.buf)[...] = value
+        descriptor = {SHARED_ARRAY: block.name, 'shape': value.shape, 'dtype': value.dtype.str}
+        block.close()
+        return descriptor
+    if isinstance(value, Mapping):
+        return {key: export_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(export_arrays(item) for item in value)
+    return value
+
+def import_arrays(value: Any) -> Any:
+    """Inverse of export_arrays: copy arrays out of shared memory and release the blocks"""
+    if isinstance(value, dict) and SHARED_ARRAY in value:
+        block = shared_memory.SharedMemory(name=value[SHARED_ARRAY])
+        try:
+            return np.ndarray(value['shape'], np.dtype(value['dtype']), buffer=block.buf).copy()
+        finally:
+            block.close()
+            block.unlink()
+    if isinstance(value, dict):
+        return {key: import_arrays(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(import_arrays(item) for item in value)
+    return value
+
+def send_result(connection, header: tuple, value: Any):
+    """Send a result after header, or an error report if it cannot be serialized.
+
+    The pipe pickles a message completely before writing it, so a failed
+    send leaves nothing half-written and the process keeps serving.
+    """
+    exported = export_arrays(value)
+    try:
+        connection.send(header + (exported,))
+    except (TypeError, AttributeError, pickle.PicklingError) as e:
+        import_arrays(exported)  # Release the shared memory blocks nobody will read
+        connection.send(header + ({'success': False, 'error': f"Result could not be sent: {e}"},))
+
+class RequestCancelled(Exception):
+    """Raised inside the inference process to stop a cancelled request"""
+
+def serve(connection, module_name: str, class_name: str, placement: Optional[Placement] = None):
+    """Inference process main loop: load one analyzer and run requests from the GUI.
+
+    Once loaded it sends ('ready', load_time, memory_report) with the
+    model registry's per-model memory. Messages from the client are
+    ('call', id, method, args, kwargs) and ('cancel', id). Replies are
+    ('progress', id, stage, message), ('result', id, index, result) and
+    finally ('done', id, value).
+    """
+    try:
+        start = time.perf_counter()
+        if placement is not None:
+            # Pin before loading so the weights are allocated on the worker's NUMA node
+            apply_placement(placement)
+        analyzer = getattr(importlib.import_module(module_name), class_name)()
+        # Imported here so torch stays out of the GUI process
+        from ai.model_registry import get_model_registry
+        registry = get_model_registry()
+        print(f"{class_name} model memory:\n{registry.format_memory_report()}")
+        connection.send(('ready', time.perf_counter() - start, registry.memory_report()))
+    except Exception as e:
+        connection.send(('failed', str(e)))
+        return
+
+    # Read in the background so cancellations arrive while a request runs
+    requests = queue.Queue()
+    cancelled = set()
+
+    def read():
+        while True:
+            try:
+                message = connection.recv()
+            except (EOFError, OSError):
+                requests.put(None)
+                return
+            if message[0] == 'cancel':
+                cancelled.add(message[1])
+            else:
+                requests.put(message)
+
+    threading.Thread(target=read, daemon=True).start()
+
+    while True:
+        message = requests.get()
+        if message is None:
+            return  # The GUI went away
+        _, request_id, method, args, kwargs = message
+
+        def check_cancelled():
+            if request_id in cancelled:
+                raise RequestCancelled()
+
+        def progress_callback(stage, text):
+            check_cancelled()
+            connection.send(('progress', request_id, stage, text))
+
+        def result_callback(index, result):
+            send_result(connection, ('result', request_id, index), result)
+            check_cancelled()
+
+        if kwargs.pop('progress_callback', False):
+            kwargs['progress_callback'] = progress_callback
+        if kwargs.pop('result_callback', False):
+            kwargs['result_callback'] = result_callback
+
+        try:
+            value = getattr(analyzer, method)(*args, **kwargs)
+        except Exception as e:
+            value = {'success': False, 'error': str(e)}
+        send_result(connection, ('done', request_id), value)
+        cancelled.discard(request_id)
+
+class RemoteAnalyzer:
+    """Client for an analyzer running in a separate inference process.
+
+    It exposes the analyzer's analyze_image and analyze_batch methods with
+    the same arguments and callbacks, so the GUI's worker threads use it in
+    place of an in-process analyzer while PyTorch stays out of the UI
+    process. Requests carry image paths: pixels reach the inference process
+    through the shared on-disk image pyramid, and arrays in results come
+    back through shared memory. If the inference process dies, the running
+    request fails and the process is restarted for the next one; the GUI
+    session and its queue are unaffected. A placement from plan_workers
+    pins the process to a NUMA node and sizes its thread pools.
+    """
+
+    def __init__(self, module_name: str, class_name: str, placement: Optional[Placement] = None):
+        self.module_name = module_name
+        self.class_name = class_name
+        self.placement = placement
+        self.load_time = None
+        self.memory_report = []
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._process = None
+        self._connection = None
+        self.start()
+
+    def start(self):
+        """Start the inference process and wait until its models have loaded"""
+        parent, child = self._context.Pipe()
+        process = self._context.Process(
+            target=serve, args=(child, self.module_name, self.class_name, self.placement),
+            daemon=True, name=f"inference-{self.class_name}"
+        )
+        process.start()
+        child.close()
+
+        try:
+            status, *value = parent.recv()
+        except EOFError:
+            status, value = 'failed', [f"inference process exited with code {process.exitcode}"]
+        if status != 'ready':
+            parent.close()
+            process.join(timeout=5)
+            raise RuntimeError(value[0])
+
+        self._process, self._connection = process, parent
+        self.load_time, self.memory_report = value
+
+    def restart(self):
+        """Replace the inference process with a fresh one"""
+        with self._lock:
+            self._stop()
+            self.start()
+
+    def close(self):
+        with self._lock:
+            self._stop()
+
+    def analyze_image(self, *args, progress_callback: Optional[Callable] = None, **kwargs) -> Dict:
+        return self._call('analyze_image', args, kwargs, progress_callback=progress_callback)
+
+    def analyze_batch(self, *args, result_callback: Optional[Callable] = None, **kwargs) -> Dict:
+        return self._call('analyze_batch', args, kwargs, result_callback=result_callback)
+
+    def _call(self, method, args, kwargs, progress_callback=None, result_callback=None):
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._stop()
+                try:
+                    self.start()
+                except (RuntimeError, OSError, EOFError) as e:
+                    # Fail this request; the next one tries to start the process again
+                    self._stop()
+                    return {'success': False, 'error': f"Inference process could not be restarted: {e}"}
+
+            request_id = next(self._ids)
+            kwargs = dict(kwargs, progress_callback=progress_callback is not None,
+                          result_callback=result_callback is not None)
+            try:
+                self._connection.send(('call', request_id, method, args, kwargs))
+                return self._receive(request_id, progress_callback, result_callback)
+            except (EOFError, OSError, BrokenPipeError):
+                exitcode = self._process.exitcode
+                self._stop()
+                return {
+                    'success': False,
+                    'error': f"Inference process stopped (exit code {exitcode}); it restarts on the next request"
+                }
+
+    def _receive(self, request_id, progress_callback, result_callback):
+        cancel_sent = False
+        while True:
+            # Poll so a crashed process is noticed even if the pipe stays open
+            if not self._connection.poll(0.5):
+                if not self._process.is_alive():
+                    raise EOFError()
+                continue
+
+            kind, message_id, *payload = self._connection.recv()
+            if message_id != request_id:
+                continue  # Left over from an interrupted request
+            if kind == 'done':
+                return import_arrays(payload[0])
+
+            try:
+                if kind == 'progress' and progress_callback is not None:
+                    progress_callback(*payload)
+                elif kind == 'result' and result_callback is not None:
+                    result_callback(payload[0], import_arrays(payload[1]))
+            except Exception:
+                # The caller cancelled; let the inference process stop and report back
+                if not cancel_sent:
+                    self._connection.send(('cancel', request_id))
+                    cancel_sent = True
+
+    def _stop(self):
+        if self._connection is not None:
+            self._connection.close()
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+            self._process.join(timeout=5)
+        self._process = None
+        self._connection = None
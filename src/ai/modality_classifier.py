@@ -0,0 +1,149 @@
+import os
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Optional, Tuple
+from ai.model_registry import get_model_registry
+from utils.image_pyramid import get_pyramid_cache
+
+DEFAULT_WEIGHTS = os.path.join(os.path.expanduser("~"), ".cache", "clinical-imaging", "modality_classifier.pt")
+
+THUMBNAIL_SIZE = 64
+
+MODALITIES = ['X-ray', 'CT', 'MRI']
+BODY_PARTS = ['chest', 'head', 'spine', 'extremity', 'pelvis', 'abdomen']
+
+# Analyzer model used for each body part
+BODY_PART_IMAGE_TYPES = {
+    'chest': 'chest',
+    'head': 'neuro',
+    'spine': 'musculoskeletal',
+    'extremity': 'musculoskeletal',
+    'pelvis': 'musculoskeletal',
+    'abdomen': 'general'
+}
+
+class ModalityNet(nn.Module):
+    """Tiny CNN predicting modality and body part from a 64x64 grayscale thumbnail"""
+
+    def __init__(self):
+        super().__init__()
+        layers = []
+        channels = 1
+        for width in (16, 32, 64, 128):
+            layers += [
+                nn.Conv2d(channels, width, 3, padding=1, bias=False),
+                nn.BatchNorm2d(width),
+                nn.ReLU(inplace=True),
+                nn.MaxPool2d(2)
+            ]
+            channels = width
+        self.features = nn.Sequential(*layers)
+        self.modality = nn.Linear(channels, len(MODALITIES))
+        self.body_part = nn.Linear(channels, len(BODY_PARTS))
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        features = F.adaptive_avg_pool2d(self.features(x), 1).flatten(1)
+        # One output tensor keeps the registry's forward and autotuner unchanged
+        return torch.cat([self.modality(features), self.body_part(features)], dim=1)
+
+def thumbnail_tensor(images: List[Image.Image]) -> torch.Tensor:
+    """Batch of 64x64 grayscale thumbnails scaled to [0, 1]"""
+    arrays = [
+        np.asarray(image.convert('L').resize((THUMBNAIL_SIZE, THUMBNAIL_SIZE), Image.Resampling.BOX),
+                   dtype=np.float32) / 255
+        for image in images
+    ]
+    return torch.from_numpy(np.stack(arrays)).unsqueeze(1)
+
+def load_thumbnail(image_path: str) -> Image.Image:
+    """Smallest pyramid level covering the thumbnail, so training and inference decode images alike.
+
+    The pyramid rescales 16-bit and float images to 8 bits; a raw
+    Image.open would leave them in a different intensity range.
+    """
+    return get_pyramid_cache().get_image(image_path, (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+
+def classifier_weights_path() -> str:
+    return os.environ.get("CLINICAL_MODALITY_WEIGHTS", DEFAULT_WEIGHTS)
+
+def load_modality_classifier() -> Optional[ModalityNet]:
+    """Trained classifier from the shared registry, or None if no weights are installed"""
+    path = classifier_weights_path()
+    if not os.path.exists(path):
+        return None
+
+    def build():
+        model = ModalityNet()
+        model.load_state_dict(torch.load(path, map_location='cpu'))
+        return model
+    return get_model_registry().get(f"modality-classifier/{os.path.abspath(path)}", build)
+
+def classify(model: ModalityNet, images: List[Image.Image]) -> List[Dict]:
+    """Modality, body part, analyzer image type and confidence for a batch of images.
+
+    Confidence is the lower of the modality and body part probabilities.
+    """
+    registry = get_model_registry()
+    with torch.no_grad():
+        outputs = registry.forward(model, thumbnail_tensor(images)).float().cpu()
+    modality = torch.softmax(outputs[:, :len(MODALITIES)], dim=1)
+    body_part = torch.softmax(outputs[:, len(MODALITIES):], dim=1)
+    modality_confidence, modality_index = modality.max(dim=1)
+    body_part_confidence, body_part_index = body_part.max(dim=1)
+
+    return [
+        {
+            'modality': MODALITIES[m],
+            'body_part': BODY_PARTS[b],
+            'image_type': BODY_PART_IMAGE_TYPES[BODY_PARTS[b]],
+            'confidence': min(float(mc), float(bc)),
+            'method': 'classifier'
+        }
+        for m, b, mc, bc in zip(modality_index.tolist(), body_part_index.tolist(),
+                                modality_confidence, body_part_confidence)
+    ]
+
+def train_modality_classifier(image_paths: List[str], labels: List[Tuple[str, str]], epochs: int = 20,
+                              batch_size: int = 64, learning_rate: float = 1e-3) -> str:
+    """Train the classifier on (modality, body part) labelled images and save its weights.
+
+    Returns the weights path.
+    """
+    inputs = torch.cat([
+        thumbnail_tensor([load_thumbnail(path) for path in image_paths[start:start + batch_size]])
+        for start in range(0, len(image_paths), batch_size)
+    ])
+    modality_targets = torch.tensor([MODALITIES.index(modality) for modality, _ in labels])
+    body_part_targets = torch.tensor([BODY_PARTS.index(body_part) for _, body_part in labels])
+
+    model = ModalityNet()
+    optimizer = torch.optim.AdamW(model.parameters(), lr=learning_rate)
+    model.train()
+    for epoch in range(epochs):
+        order = torch.randperm(len(inputs))
+        total, correct = 0.0, 0
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            # Random flips so the thumbnails' laterality is not learned
+            batch = inputs[indices]
+            flip = torch.rand(len(indices)) < 0.5
+            batch[flip] = batch[flip].flip(-1)
+
+            outputs = model(batch)
+            loss = (F.cross_entropy(outputs[:, :len(MODALITIES)], modality_targets[indices])
+                    + F.cross_entropy(outputs[:, len(MODALITIES):], body_part_targets[indices]))
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(indices)
+            correct += int((outputs[:, len(MODALITIES):].argmax(dim=1) == body_part_targets[indices]).sum())
+        print(f"Epoch {epoch + 1}/{epochs}: loss {total / len(order):.4f}, "
+              f"body part accuracy {correct / len(order) * 100:.1f}%")
+
+    path = classifier_weights_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    torch.save(model.state_dict(), path)
+    return path
@@ -0,0 +1,248 @@
+import os
+import time
+import threading
+import torch
+import torch.nn as nn
+from typing import Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from ai.autotune import AutoTuner, configured_forward
+from utils.cpu_topology import cpu_budget
+
+# Input shapes compiled per model; further shapes run eagerly rather than recompiling
+MAX_COMPILED_SHAPES = 8
+
+PRECISIONS = {
+    'float32': torch.float32,
+    'float16': torch.float16,
+    'bfloat16': torch.bfloat16
+}
+
+class ModelRegistry:
+    """Process-wide owner of loaded networks and of the device, threading and precision they run with.
+
+    Models are registered under a key naming their weight set, so analyzers
+    in the same process asking for the same weights (e.g. the TorchXRayVision
+    DenseNet) share one copy. The GUIs run each analyzer in its own inference
+    process with its own registry, so there weights are only shared within an
+    analyzer; memory_report() shows what each process holds. Each model is moved to the configured device and precision
+    and put in eval mode once, when first loaded. Defaults come from the
+    CLINICAL_DEVICE, CLINICAL_TORCH_THREADS and CLINICAL_PRECISION
+    environment variables. Models run through forward(), which applies the
+    per-host execution config found by autotune().
+    """
+
+    def __init__(self, device: str = None, num_threads: int = None, precision: str = None):
+        device = device or os.environ.get("CLINICAL_DEVICE")
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+
+        precision = precision or os.environ.get("CLINICAL_PRECISION", "float32")
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision {precision} (expected one of {', '.join(PRECISIONS)})")
+        if precision == 'float16' and self.device.type == 'cpu':
+            print("float16 is not supported for CPU inference, using float32")
+            precision = 'float32'
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+
+        num_threads = num_threads or int(os.environ.get("CLINICAL_TORCH_THREADS", 0))
+        # torch defaults to every core, ignoring container quotas and worker pinning
+        torch.set_num_threads(num_threads if num_threads > 0 else cpu_budget())
+        self.num_threads = torch.get_num_threads()
+
+        # An explicit thread count is kept; the tuner only picks backends then
+        self.tuner = AutoTuner(self.device, self.dtype, self.precision, tune_threads=num_threads <= 0)
+        self._configs: Dict[str, Dict] = {}
+        self._compiled: Dict[Tuple[str, Tuple[int, ...]], Callable] = {}
+
+        self._lock = threading.Lock()
+        self._models: Dict[str, nn.Module] = {}
+        self._users: Dict[str, int] = {}
+        self._loading: Dict[str, threading.Event] = {}
+        self._keys: Dict[int, str] = {}
+
+    def get(self, key: str, builder: Callable[[], nn.Module]) -> nn.Module:
+        """Return the model registered under key, building it with builder() on first use"""
+        with self._lock:
+            if key in self._models:
+                self._users[key] += 1
+                return self._models[key]
+            loading = self._loading.get(key)
+            if loading is None:
+                self._loading[key] = threading.Event()
+
+        if loading is not None:
+            # Another thread is loading the same weights; wait for its copy
+            loading.wait()
+            return self.get(key, builder)
+
+        try:
+            model = builder()
+            model.eval()
+            model.to(device=self.device, dtype=self.dtype)
+            with self._lock:
+                self._models[key] = model
+                self._users[key] = 1
+                self._keys[id(model)] = key
+            print(f"Loaded {key}: {self.model_bytes(model) / 2**20:.1f} MB on {self.device} ({self.precision})")
+            return model
+        finally:
+            with self._lock:
+                self._loading.pop(key).set()
+
+    def prepare_input(self, tensor: torch.Tensor) -> torch.Tensor:
+        """Move a model input to the registry's device and precision"""
+        return tensor.to(device=self.device, dtype=self.dtype)
+
+    def forward(self, model: nn.Module, batch: torch.Tensor) -> torch.Tensor:
+        """Run a registered model on a batch with its tuned execution config"""
+        key = self._keys.get(id(model))
+        config = self._configs.get(key)
+        batch = self.prepare_input(batch)
+        if config is None:
+            return model(batch)
+        return configured_forward(self._runner(key, model, config, batch), config, batch, self.device.type)
+
+    def autotune(self, models: Dict[str, nn.Module], input_shapes: Dict[str, Tuple[int, ...]]):
+        """Apply the fastest execution config for each model on this host.
+
+        input_shapes gives each model's per-image input shape. Configs are
+        benchmarked the first time a model is seen on a host and read from
+        the tuning cache afterwards. CLINICAL_AUTOTUNE=0 disables tuning and
+        CLINICAL_AUTOTUNE=force re-benchmarks.
+        """
+        mode = os.environ.get("CLINICAL_AUTOTUNE", "1")
+        if mode == "0":
+            return
+        for name, model in models.items():
+            key = self._keys.get(id(model))
+            if key is None or key in self._configs:
+                continue  # Not registered, or tuned by another analyzer
+            config = None if mode == "force" else self.tuner.cached_config(key)
+            if config is None:
+                config = self.tuner.tune(key, model, input_shapes[name])
+            self._apply(key, model, config)
+        self._apply_process_settings()
+
+    def _apply(self, key: str, model: nn.Module, config: Dict):
+        if config.get('channels_last'):
+            model.to(memory_format=torch.channels_last)
+        with self._lock:
+            self._configs[key] = config
+
+    def _apply_process_settings(self):
+        """Set the process-wide thread count and oneDNN switch once from the tuned configs.
+
+        Threads are the most any tuned model wants; oneDNN is turned off
+        only if every tuned model runs faster without it. Called at
+        start-up, before requests run, so concurrent forward passes never
+        change these settings under each other.
+        """
+        with self._lock:
+            configs = list(self._configs.values())
+        tuned = [config['threads'] for config in configs if config.get('threads')]
+        if tuned and self.tuner.tune_threads:
+            torch.set_num_threads(max(tuned))
+            self.num_threads = torch.get_num_threads()
+        if configs:
+            torch.backends.mkldnn.enabled = any(config.get('mkldnn', True) for config in configs)
+
+    def _runner(self, key: str, model: nn.Module, config: Dict, batch: torch.Tensor) -> Callable:
+        """Model to run a batch on: compiled once per input shape when the config asks for it"""
+        if not config.get('compiled'):
+            return model
+        shape = (key, tuple(batch.shape))
+        with self._lock:
+            runner = self._compiled.get(shape)
+            if runner is None:
+                if sum(1 for compiled_key, _ in self._compiled if compiled_key == key) >= MAX_COMPILED_SHAPES:
+                    return model
+                # Static shapes: each entry is specialized for exactly one input shape
+                runner = self._compiled[shape] = torch.compile(model, dynamic=False)
+        return runner
+
+    def release(self, key: str):
+        """Drop a model once its last user releases it"""
+        with self._lock:
+            if key not in self._users:
+                return
+            self._users[key] -= 1
+            if self._users[key] == 0:
+                del self._users[key]
+                del self._keys[id(self._models.pop(key))]
+                self._configs.pop(key, None)
+                for shape in [shape for shape in self._compiled if shape[0] == key]:
+                    del self._compiled[shape]
+
+    @staticmethod
+    def model_bytes(model: nn.Module) -> int:
+        """Memory held by a model's parameters and buffers"""
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
+    def memory_report(self) -> List[Dict]:
+        """Per-model memory, largest first"""
+        with self._lock:
+            models = list(self._models.items())
+            users = dict(self._users)
+        report = [
+            {
+                'model': key,
+                'parameters': sum(p.numel() for p in model.parameters()),
+                'megabytes': self.model_bytes(model) / 2**20,
+                'users': users[key],
+                'device': str(self.device),
+                'precision': self.precision
+            }
+            for key, model in models
+        ]
+        return sorted(report, key=lambda entry: entry['megabytes'], reverse=True)
+
+    def format_memory_report(self) -> str:
+        report = self.memory_report()
+        lines = [f"{entry['model']}: {entry['megabytes']:.1f} MB, {entry['users']} user(s)" for entry in report]
+        total = sum(entry['megabytes'] for entry in report)
+        return "\n".join(lines + [f"Total: {total:.1f} MB on {self.device} ({self.precision})"])
+
+_shared_registry: Optional[ModelRegistry] = None
+_shared_lock = threading.Lock()
+
+def get_model_registry() -> ModelRegistry:
+    """Process-wide model registry shared by every analyzer"""
+    global _shared_registry
+    with _shared_lock:
+        if _shared_registry is None:
+            _shared_registry = ModelRegistry()
+        return _shared_registry
+
+def load_concurrently(loaders: Dict[str, Callable[[], nn.Module]], max_workers: int = None) -> Dict[str, nn.Module]:
+    """Run independent model loaders in a thread pool and log how long each took.
+
+    Weight deserialization and copies release the GIL, so start-up is bounded
+    by the slowest model rather than the sum of all of them. Loaders usually
+    go through the registry, which keeps a model requested twice to one copy.
+    """
+    def timed(name):
+        start = time.perf_counter()
+        model = loaders[name]()
+        return model, time.perf_counter() - start
+
+    start = time.perf_counter()
+    workers = max_workers or min(len(loaders), cpu_budget()) or 1
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="model-load") as executor:
+        futures = {name: executor.submit(timed, name) for name in loaders}
+        # result() re-raises a loader's exception once the other loaders finish
+        results = {name: future.result() for name, future in futures.items()}
+
+    timings = {name: elapsed for name, (_, elapsed) in results.items()}
+    for name, elapsed in sorted(timings.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name}: {elapsed:.2f}s")
+    print(f"Loaded {len(loaders)} models in {time.perf_counter() - start:.2f}s "
+          f"(sequential total {sum(timings.values()):.2f}s)")
+    return {name: model for name, (model, _) in results.items()}
+
+def load_xrv_densenet(weights: str = "densenet121-res224-all") -> nn.Module:
+    """TorchXRayVision DenseNet, shared by every analyzer in this process that uses the same weights"""
+    import torchxrayvision as xrv
+    return get_model_registry().get(
+        f"torchxrayvision/{weights}", lambda: xrv.models.DenseNet(weights=weights)
+    )
@@ -1,3 +1,4 @@
+import time
 import torch
 import torch.nn as nn
 import torchvision.models as models
@@ -5,10 +6,19 @@ import numpy as np
 from PIL import Image
 import torchvision.transforms as transforms
 from typing import Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from ai.stain_normalization import MacenkoNormalizer
+from utils.image_pyramid import get_pyramid_cache
+from ai.progress import StageTimer
+from utils.cpu_topology import cpu_budget
+from ai.model_registry import get_model_registry, load_concurrently
+from ai.tta import augment_views, summarize_views
 
 class PathologyAI:
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        # Device, threads and precision are owned by the shared model registry
+        self.registry = get_model_registry()
+        self.device = self.registry.device
         print(f"Using device: {self.device}")
         
         # Initialize models
@@ -16,42 +26,74 @@ class PathologyAI:
         self.model_dict = self.load_models()
         print("Models loaded successfully")
         
+        # Pick threads and backends for this host; benchmarked once, then cached
+        self.registry.autotune(self.model_dict, {'he': (3, 224, 224), 'gross': (3, 224, 224)})
+        
         # Define image transformations
         self.transform = transforms.Compose([
             transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+            transforms.ToTensor()
         ])
+        self.normalize = transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+        
+        # H&E stain normalization, parameters cached per slide
+        self.stain_normalizer = MacenkoNormalizer()
+        
+        # Downsampled image levels shared with the GUI previews
+        self.pyramid = get_pyramid_cache()
     
-    def load_models(self) -> Dict[str, nn.Module]:
-        """Load pre-trained models for different types of pathology analysis"""
-        model_dict = {}
+    def preprocess_batch(self, images: List[Image.Image], image_type: str,
+                         slide_paths: List[str] = None) -> torch.Tensor:
+        """Transform a list of RGB images into a normalized model input batch"""
+        batch = torch.stack([self.transform(image) for image in images]).to(self.device)
+        
+        # Stain-normalize H&E tiles with each slide's cached stain vectors
+        if image_type == "H&E Stain" and slide_paths is not None:
+            parameters = [
+                self.stain_normalizer.slide_parameters(path, image)
+                for path, image in zip(slide_paths, images)
+            ]
+            # Slides without enough tissue to estimate stains from are left unnormalized
+            stained = [i for i, slide in enumerate(parameters) if slide is not None]
+            if stained:
+                stain_matrices = np.stack([parameters[i][0] for i in stained])
+                max_concentrations = np.stack([parameters[i][1] for i in stained])
+                batch[stained] = self.stain_normalizer.normalize_batch(
+                    batch[stained], stain_matrices, max_concentrations
+                )
         
+        return self.normalize(batch)
+    
+    def load_models(self) -> Dict[str, nn.Module]:
+        """Load pre-trained models for different types of pathology analysis concurrently through the shared registry"""
         # Load DenseNet for H&E analysis
-        model_dict['he'] = models.densenet121(pretrained=True)
-        num_ftrs = model_dict['he'].classifier.in_features
-        model_dict['he'].classifier = nn.Sequential(
-            nn.Linear(num_ftrs, 512),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(512, len(self.he_classes))
-        )
-        model_dict['he'].to(self.device)
-        model_dict['he'].eval()
+        def he():
+            model = models.densenet121(pretrained=True)
+            num_ftrs = model.classifier.in_features
+            model.classifier = nn.Sequential(
+                nn.Linear(num_ftrs, 512),
+                nn.ReLU(),
+                nn.Dropout(0.3),
+                nn.Linear(512, len(self.he_classes))
+            )
+            return model
         
         # Load ResNet for gross specimen analysis
-        model_dict['gross'] = models.resnet50(pretrained=True)
-        num_ftrs = model_dict['gross'].fc.in_features
-        model_dict['gross'].fc = nn.Sequential(
-            nn.Linear(num_ftrs, 512),
-            nn.ReLU(),
-            nn.Dropout(0.3),
-            nn.Linear(512, len(self.gross_classes))
-        )
-        model_dict['gross'].to(self.device)
-        model_dict['gross'].eval()
+        def gross():
+            model = models.resnet50(pretrained=True)
+            num_ftrs = model.fc.in_features
+            model.fc = nn.Sequential(
+                nn.Linear(num_ftrs, 512),
+                nn.ReLU(),
+                nn.Dropout(0.3),
+                nn.Linear(512, len(self.gross_classes))
+            )
+            return model
         
-        return model_dict
+        return load_concurrently({
+            'he': lambda: self.registry.get("pathology/he", he),
+            'gross': lambda: self.registry.get("pathology/gross", gross)
+        })
     
     @property
     def he_classes(self) -> List[str]:
@@ -221,51 +263,152 @@ class PathologyAI:
         
         return recommendations
     
-    def analyze_image(self, image_path: str, image_type: str) -> Dict:
-        """Analyze pathology image and generate comprehensive report"""
+    def select_model(self, image_type: str) -> Tuple[nn.Module, List[str]]:
+        """Select the model and class names for an image type"""
+        if image_type == "H&E Stain":
+            return self.model_dict['he'], self.he_classes
+        return self.model_dict['gross'], self.gross_classes  # Gross Specimen
+    
+    def load_image(self, image_path: str) -> Image.Image:
+        """Load the nearest pyramid level that still covers the model input size"""
+        return self.pyramid.get_image(image_path, (224, 224)).convert('RGB')
+    
+    def build_report(self, image_type: str, findings: Dict[str, float]) -> Dict:
+        """Build the per-image report from raw class probabilities"""
+        # Filter findings by confidence
+        significant_findings = {
+            k: v for k, v in findings.items() if v > 0.2
+        }
+        
+        # Get detailed features and recommendations
+        features = self.get_features(image_type, significant_findings)
+        recommendations = self.get_recommendations(image_type, significant_findings)
+        
+        # Determine urgency level
+        urgency = 'STAT' if any(conf > 0.7 for conf in findings.values()) else 'ROUTINE'
+        
+        return {
+            'success': True,
+            'image_type': image_type,
+            'findings': significant_findings,
+            'features': features,
+            'recommendations': recommendations,
+            'urgency_level': urgency
+        }
+    
+    def analyze_image(self, image_path: str, image_type: str, progress_callback=None,
+                      tta: bool = False) -> Dict:
+        """Analyze pathology image and generate comprehensive report.
+        
+        progress_callback(stage, message) is called as each analysis stage starts.
+        tta runs flipped, rotated and cropped views in one batched forward
+        pass; findings are the mean over views and report['tta'] holds each
+        class's mean and variance.
+        """
+        timer = StageTimer(progress_callback)
         try:
             # Load and preprocess image
-            image = Image.open(image_path).convert('RGB')
-            image_tensor = self.transform(image).unsqueeze(0).to(self.device)
+            timer.stage('decode')
+            image = self.load_image(image_path)
+            timer.stage('preprocess')
+            image_tensor = self.preprocess_batch([image], image_type, [image_path])
             
             # Select appropriate model
-            if image_type == "H&E Stain":
-                model = self.model_dict['he']
-                classes = self.he_classes
-            else:  # Gross Specimen
-                model = self.model_dict['gross']
-                classes = self.gross_classes
+            model, classes = self.select_model(image_type)
             
-            # Get predictions
+            # Get predictions, for every augmented view at once with TTA
+            timer.stage('forward')
+            if tta:
+                image_tensor = augment_views(image_tensor[0])
             with torch.no_grad():
-                outputs = model(image_tensor)
-                probabilities = torch.sigmoid(outputs)[0]
+                outputs = self.registry.forward(model, image_tensor)
+                probabilities = torch.sigmoid(outputs.float()).cpu()
             
             # Convert to dictionary
-            findings = {
+            summary = summarize_views(classes, probabilities) if tta else None
+            findings = summary['mean'] if tta else {
                 class_name: float(prob)
-                for class_name, prob in zip(classes, probabilities)
+                for class_name, prob in zip(classes, probabilities[0])
             }
             
-            # Filter findings by confidence
-            significant_findings = {
-                k: v for k, v in findings.items() if v > 0.2
+            timer.stage('report')
+            report = self.build_report(image_type, findings)
+            if summary is not None:
+                report['tta'] = summary
+            report['stage_timings'] = timer.finish()
+            return report
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
             }
+    
+    def analyze_batch(self, image_paths: List[str], image_type: str, batch_size: int = 32,
+                      max_workers: int = None, result_callback=None) -> Dict:
+        """Analyze many images with parallel decoding and batched forward passes.
+        
+        result_callback(index, result) is called as each image's report is
+        ready. Preprocess and forward time are amortized over a batch.
+        """
+        try:
+            # Decode photos in parallel; PIL releases the GIL while decoding
+            def load(path):
+                try:
+                    start = time.perf_counter()
+                    image = self.load_image(path)
+                    return image, time.perf_counter() - start, None
+                except Exception as e:
+                    return None, None, str(e)
             
-            # Get detailed features and recommendations
-            features = self.get_features(image_type, significant_findings)
-            recommendations = self.get_recommendations(image_type, significant_findings)
+            # Decode threads share the container's CPU quota with the forward passes
+            with ThreadPoolExecutor(max_workers=max_workers or min(8, cpu_budget())) as pool:
+                loaded = list(pool.map(load, image_paths))
             
-            # Determine urgency level
-            urgency = 'STAT' if any(conf > 0.7 for conf in findings.values()) else 'ROUTINE'
+            results = [None] * len(image_paths)
+            valid = []
+            for i, (image, _, error) in enumerate(loaded):
+                if image is None:
+                    results[i] = {'success': False, 'image_path': image_paths[i], 'error': error}
+                    if result_callback is not None:
+                        result_callback(i, results[i])
+                else:
+                    valid.append(i)
+            
+            # One batched forward pass per chunk of decoded images
+            model, classes = self.select_model(image_type)
+            for start in range(0, len(valid), batch_size):
+                indices = valid[start:start + batch_size]
+                
+                preprocess_start = time.perf_counter()
+                batch = self.preprocess_batch(
+                    [loaded[i][0] for i in indices], image_type, [image_paths[i] for i in indices]
+                )
+                forward_start = time.perf_counter()
+                with torch.no_grad():
+                    outputs = self.registry.forward(model, batch)
+                    probabilities = torch.sigmoid(outputs.float()).cpu().tolist()
+                forward_end = time.perf_counter()
+                preprocess_time = (forward_start - preprocess_start) / len(indices)
+                forward_time = (forward_end - forward_start) / len(indices)
+                
+                for i, row in zip(indices, probabilities):
+                    report_start = time.perf_counter()
+                    results[i] = self.build_report(image_type, dict(zip(classes, row)))
+                    results[i]['image_path'] = image_paths[i]
+                    results[i]['stage_timings'] = {
+                        'decode': loaded[i][1],
+                        'preprocess': preprocess_time,
+                        'forward': forward_time,
+                        'report': time.perf_counter() - report_start
+                    }
+                    if result_callback is not None:
+                        result_callback(i, results[i])
             
             return {
                 'success': True,
                 'image_type': image_type,
-                'findings': significant_findings,
-                'features': features,
-                'recommendations': recommendations,
-                'urgency_level': urgency
+                'images': results
             }
             
         except Exception as e:
@@ -273,6 +416,56 @@ class PathologyAI:
                 'success': False,
                 'error': str(e)
             }
+    
+    def analyze_case(self, image_paths: List[str], image_type: str,
+                     batch_size: int = 32, max_workers: int = None) -> Dict:
+        """Analyze all images of a case with batched forward passes and aggregate the results"""
+        batch = self.analyze_batch(image_paths, image_type, batch_size, max_workers)
+        if batch['success']:
+            batch['case'] = self.aggregate_case(image_type, batch['images'])
+        return batch
+    
+    def aggregate_case(self, image_type: str, results: List[Dict]) -> Dict:
+        """Merge per-image reports into a case-level report"""
+        analyzed = [r for r in results if r.get('success', False)]
+        
+        # Highest confidence and number of images per finding
+        findings = {}
+        image_counts = {}
+        for result in analyzed:
+            for condition, confidence in result['findings'].items():
+                findings[condition] = max(findings.get(condition, 0.0), confidence)
+                image_counts[condition] = image_counts.get(condition, 0) + 1
+        findings = dict(sorted(findings.items(), key=lambda x: x[1], reverse=True))
+        
+        # Merge features and recommendations, keeping the first occurrence of each
+        features = []
+        seen_features = set()
+        recommendations = []
+        seen_recommendations = set()
+        for result in analyzed:
+            for feature in result['features']:
+                if feature['name'] not in seen_features:
+                    seen_features.add(feature['name'])
+                    features.append(feature)
+            for rec in result['recommendations']:
+                key = (rec['type'], rec['action'], rec['urgency'])
+                if key not in seen_recommendations:
+                    seen_recommendations.add(key)
+                    recommendations.append(rec)
+        
+        urgency = 'STAT' if any(r['urgency_level'] == 'STAT' for r in analyzed) else 'ROUTINE'
+        
+        return {
+            'image_type': image_type,
+            'images_analyzed': len(analyzed),
+            'images_failed': len(results) - len(analyzed),
+            'findings': findings,
+            'finding_image_counts': image_counts,
+            'features': features,
+            'recommendations': recommendations,
+            'urgency_level': urgency
+        }
 
 def main():
     # Test the pathology AI system
@@ -0,0 +1,46 @@
+import time
+from typing import Callable, Dict, Optional
+
+# Analysis stages in the order they run, with user-facing messages
+STAGES = ['decode', 'preprocess', 'forward', 'report']
+STAGE_MESSAGES = {
+    'decode': 'Decoding image...',
+    'preprocess': 'Preprocessing image...',
+    'forward': 'Analyzing with AI models...',
+    'report': 'Generating report...'
+}
+
+class StageTimer:
+    """Time analysis stages and report each transition to an optional callback.
+
+    The callback is called as callback(stage, message) when a stage starts,
+    from whichever thread runs the analysis.
+    """
+
+    def __init__(self, callback: Optional[Callable[[str, str], None]] = None):
+        self.callback = callback
+        self.timings: Dict[str, float] = {}
+        self._current = None
+        self._started = None
+
+    def stage(self, name: str):
+        """Finish the running stage and start the next one"""
+        self._close()
+        self._current = name
+        self._started = time.perf_counter()
+        if self.callback is not None:
+            self.callback(name, STAGE_MESSAGES.get(name, name))
+
+    def finish(self) -> Dict[str, float]:
+        """Finish the running stage and return all stage timings in seconds"""
+        self._close()
+        return dict(self.timings)
+
+    def _close(self):
+        if self._current is not None:
+            self.timings[self._current] = time.perf_counter() - self._started
+            self._current = None
+
+def format_timings(timings: Dict[str, float]) -> str:
+    """Compact one-line summary of stage timings"""
+    return ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
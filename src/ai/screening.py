@@ -0,0 +1,138 @@
+import os
+import time
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torchvision.models as models
+from typing import Dict, List, Optional
+from ai.model_registry import get_model_registry
+
+DEFAULT_WEIGHTS = os.path.join(os.path.expanduser("~"), ".cache", "clinical-imaging", "chest_screener.pt")
+
+# Resolution the screener sees; the full chest model runs at 224
+SCREEN_INPUT_SIZE = 112
+
+# Full-model confidence above which a study counts as abnormal when measuring misses
+ABNORMAL_CONFIDENCE = 0.5
+
+class ChestScreener(nn.Module):
+    """Small network estimating how suspicious a chest film is.
+
+    It takes the same TorchXRayVision-normalized single-channel 224 px
+    input as the full chest model, downsamples it and runs a
+    MobileNetV3-Small with a single output, the predicted highest finding
+    confidence of the full model. Weights come from train_screener, which
+    distills them from the full model on local studies.
+    """
+
+    def __init__(self, pretrained: bool = False):
+        super().__init__()
+        self.backbone = models.mobilenet_v3_small(pretrained=pretrained)
+        self.backbone.classifier[-1] = nn.Linear(self.backbone.classifier[-1].in_features, 1)
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        x = F.interpolate(x, size=(SCREEN_INPUT_SIZE, SCREEN_INPUT_SIZE), mode='area')
+        # [-1024, 1024] grayscale to the roughly unit-range RGB the backbone was trained on
+        x = (x / 1024).expand(-1, 3, -1, -1)
+        return self.backbone(x)[:, 0]
+
+def screener_weights_path() -> str:
+    return os.environ.get("CLINICAL_SCREENER_WEIGHTS", DEFAULT_WEIGHTS)
+
+def load_screener() -> Optional[ChestScreener]:
+    """Screener with distilled weights from the shared registry, or None if none have been trained"""
+    path = screener_weights_path()
+    if not os.path.exists(path):
+        return None
+
+    def build():
+        screener = ChestScreener()
+        screener.load_state_dict(torch.load(path, map_location='cpu'))
+        return screener
+    return get_model_registry().get(f"chest-screener/{os.path.abspath(path)}", build)
+
+def suspicion(findings: Dict[str, float]) -> float:
+    """Highest finding confidence, the quantity the screener learns to predict"""
+    return max(findings.values(), default=0.0)
+
+def train_screener(analyzer, image_paths: List[str], epochs: int = 5, batch_size: int = 32,
+                   learning_rate: float = 1e-3) -> str:
+    """Distill a screener from an analyzer's full chest model and save its weights.
+
+    The full model labels every image with its suspicion score, and the
+    screener is trained to regress it. Chest inputs keep the film's aspect
+    ratio, so each chunk is labelled in groups of equal shape, as in
+    analyze_batch. Returns the weights path.
+    """
+    inputs, targets = [], []
+    for start in range(0, len(image_paths), batch_size):
+        groups = {}
+        for path in image_paths[start:start + batch_size]:
+            tensor = analyzer.preprocess(analyzer.load_image(path), 'chest')
+            groups.setdefault(tuple(tensor.shape), []).append(tensor)
+        for tensors in groups.values():
+            batch = torch.stack(tensors)
+            targets.extend(suspicion(findings) for findings in analyzer.predict(batch, 'chest'))
+            # Keep only what the screener sees, a quarter of the full-size inputs
+            inputs.append(F.interpolate(batch, size=(SCREEN_INPUT_SIZE, SCREEN_INPUT_SIZE), mode='area'))
+        print(f"Labelled {min(start + batch_size, len(image_paths))}/{len(image_paths)} images")
+    inputs = torch.cat(inputs)
+    targets = torch.tensor(targets)
+
+    screener = ChestScreener(pretrained=True)
+    optimizer = torch.optim.AdamW(screener.parameters(), lr=learning_rate)
+    screener.train()
+    for epoch in range(epochs):
+        order = torch.randperm(len(inputs))
+        total = 0.0
+        for start in range(0, len(order), batch_size):
+            indices = order[start:start + batch_size]
+            loss = F.binary_cross_entropy_with_logits(screener(inputs[indices]), targets[indices])
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total += loss.item() * len(indices)
+        print(f"Epoch {epoch + 1}/{epochs}: loss {total / len(order):.4f}")
+
+    path = screener_weights_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    torch.save(screener.state_dict(), path)
+    return path
+
+def evaluate_cascade(analyzer, image_paths: List[str], abnormal_confidence: float = ABNORMAL_CONFIDENCE) -> Dict:
+    """Compare cascade and full-model analysis of held-out chest films.
+
+    Each image is analyzed once with the full model alone and once through
+    the cascade. A miss is an image the full model finds abnormal that the
+    screener cleared.
+    """
+    # Warm both paths up so one-off costs do not count
+    analyzer.analyze_image(image_paths[0], 'chest', cascade=False)
+    analyzer.analyze_image(image_paths[0], 'chest', cascade=True)
+
+    start = time.perf_counter()
+    full = [analyzer.analyze_image(path, 'chest', cascade=False) for path in image_paths]
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cascade = [analyzer.analyze_image(path, 'chest', cascade=True) for path in image_paths]
+    cascade_time = time.perf_counter() - start
+
+    pairs = [
+        (reference, result) for reference, result in zip(full, cascade)
+        if reference.get('success', False) and result.get('success', False)
+    ]
+    abnormal = [result for reference, result in pairs if suspicion(reference['findings']) >= abnormal_confidence]
+    missed = [result for result in abnormal if result['variant'] == 'screened']
+    screened = sum(1 for _, result in pairs if result['variant'] == 'screened')
+
+    return {
+        'images': len(pairs),
+        'full_images_per_second': len(image_paths) / full_time,
+        'cascade_images_per_second': len(image_paths) / cascade_time,
+        'speedup': full_time / cascade_time,
+        'screened_out': screened / max(len(pairs), 1),
+        'abnormal': len(abnormal),
+        'missed': len(missed),
+        'miss_rate': len(missed) / max(len(abnormal), 1)
+    }
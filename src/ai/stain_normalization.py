@@ -0,0 +1,127 @@
+import os
+import torch
+import numpy as np
+from PIL import Image
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+# Reference H&E stain matrix and maximum concentrations (Macenko et al., 2009)
+REFERENCE_STAIN_MATRIX = np.array([
+    [0.5626, 0.2159],
+    [0.7201, 0.8012],
+    [0.4062, 0.5581]
+], dtype=np.float32)
+REFERENCE_MAX_CONCENTRATIONS = np.array([1.9705, 1.0308], dtype=np.float32)
+
+# Slides whose stain parameters are kept, least recently used dropped first
+MAX_CACHED_SLIDES = 256
+
+class MacenkoNormalizer:
+    """Macenko H&E stain normalization with per-slide cached stain parameters.
+
+    Stain vectors are estimated once per slide from a thumbnail and reused for
+    every tile batch of that slide, so normalization itself is a couple of
+    matrix multiplications over the whole batch. Slides with too little
+    tissue to estimate from get None and are left as they are.
+    """
+
+    def __init__(self, light_intensity: float = 240.0, alpha: float = 1.0,
+                 beta: float = 0.15, thumbnail_size: int = 512, max_slides: int = MAX_CACHED_SLIDES):
+        self.light_intensity = light_intensity
+        self.alpha = alpha
+        self.beta = beta
+        self.thumbnail_size = thumbnail_size
+        self.max_slides = max_slides
+        self.reference_stain_matrix = REFERENCE_STAIN_MATRIX
+        self.reference_max_concentrations = REFERENCE_MAX_CONCENTRATIONS
+        self._slide_cache: OrderedDict = OrderedDict()
+
+    def slide_parameters(self, slide_path: str,
+                         image: Optional[Image.Image] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Get stain matrix and max concentrations for a slide, estimating them once"""
+        key = (os.path.abspath(slide_path), os.path.getmtime(slide_path))
+        if key in self._slide_cache:
+            self._slide_cache.move_to_end(key)
+            return self._slide_cache[key]
+
+        if image is None:
+            image = Image.open(slide_path)
+        thumbnail = image.convert('RGB')
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size))
+        parameters = self.estimate_stain_parameters(np.asarray(thumbnail))
+        self._slide_cache[key] = parameters
+        while len(self._slide_cache) > self.max_slides:
+            self._slide_cache.popitem(last=False)
+        return parameters
+
+    def clear_cache(self):
+        """Drop all cached slide parameters"""
+        self._slide_cache.clear()
+
+    def estimate_stain_parameters(self, rgb: np.ndarray) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """Estimate the H&E stain matrix and 99th percentile concentrations from an RGB array.
+
+        Returns None when too few pixels carry stain to estimate from.
+        """
+        optical_density = self._optical_density(rgb.reshape(-1, 3).astype(np.float32))
+
+        # Keep only pixels that carry enough stain in every channel
+        tissue = optical_density[np.all(optical_density > self.beta, axis=1)]
+        if tissue.shape[0] < 100:
+            # Mostly background; even reference parameters would recolour it through the stain plane
+            return None
+
+        # Plane spanned by the two principal eigenvectors of the OD covariance
+        _, eigenvectors = np.linalg.eigh(np.cov(tissue, rowvar=False))
+        plane = eigenvectors[:, 1:3]
+        projected = tissue @ plane
+
+        # Robust extreme angles within the plane give the two stain directions
+        angles = np.arctan2(projected[:, 1], projected[:, 0])
+        min_angle = np.percentile(angles, self.alpha)
+        max_angle = np.percentile(angles, 100 - self.alpha)
+        v_min = plane @ np.array([np.cos(min_angle), np.sin(min_angle)])
+        v_max = plane @ np.array([np.cos(max_angle), np.sin(max_angle)])
+
+        # Eigenvector signs are arbitrary; make both stain ODs positive before comparing them
+        v_min = v_min * np.sign(v_min.sum())
+        v_max = v_max * np.sign(v_max.sum())
+
+        # Hematoxylin has the larger red-channel OD
+        if v_min[0] > v_max[0]:
+            stain_matrix = np.stack([v_min, v_max], axis=1)
+        else:
+            stain_matrix = np.stack([v_max, v_min], axis=1)
+        stain_matrix = stain_matrix / np.linalg.norm(stain_matrix, axis=0, keepdims=True)
+
+        concentrations = np.linalg.lstsq(stain_matrix, optical_density.T, rcond=None)[0]
+        max_concentrations = np.percentile(concentrations, 99, axis=1)
+        max_concentrations = np.maximum(max_concentrations, 1e-6)
+
+        return stain_matrix.astype(np.float32), max_concentrations.astype(np.float32)
+
+    def normalize_batch(self, batch: torch.Tensor, stain_matrix: np.ndarray,
+                        max_concentrations: np.ndarray) -> torch.Tensor:
+        """Normalize a (B, 3, H, W) batch of [0, 1] RGB tiles in a single pass.
+
+        stain_matrix (3, 2) and max_concentrations (2,) apply to every tile;
+        stacked (B, 3, 2) and (B, 2) parameters normalize each tile with its own slide's.
+        """
+        b, c, h, w = batch.shape
+        device, dtype = batch.device, batch.dtype
+
+        source = torch.as_tensor(stain_matrix, device=device, dtype=dtype)
+        target = torch.as_tensor(self.reference_stain_matrix, device=device, dtype=dtype)
+        scale = torch.as_tensor(
+            self.reference_max_concentrations / max_concentrations, device=device, dtype=dtype
+        )
+
+        # Deconvolve, rescale and reconvolve folded into one 3x3 OD transform
+        transform = target @ (scale[..., :, None] * torch.linalg.pinv(source))
+
+        optical_density = -torch.log((batch.reshape(b, c, h * w) * 255.0 + 1.0) / self.light_intensity)
+        normalized = self.light_intensity * torch.exp(-(transform @ optical_density))
+        return (normalized / 255.0).clamp_(0.0, 1.0).reshape(b, c, h, w)
+
+    def _optical_density(self, rgb: np.ndarray) -> np.ndarray:
+        return -np.log((rgb + 1.0) / self.light_intensity)
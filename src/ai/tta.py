@@ -0,0 +1,47 @@
+import math
+import torch
+import torch.nn.functional as F
+from typing import Dict, List, Tuple
+
+# (horizontal flip, rotation in degrees, zoom) of each test-time view; zoom > 1 is a centre crop
+VIEWS = [
+    (False, 0, 1.0),
+    (True, 0, 1.0),
+    (False, 8, 1.0),
+    (False, -8, 1.0),
+    (False, 0, 1.1),
+    (True, 0, 1.1)
+]
+
+def view_transforms(views: List[Tuple[bool, float, float]] = VIEWS) -> torch.Tensor:
+    """Affine matrices mapping output to input coordinates for each view, shape (views, 2, 3)"""
+    theta = torch.zeros(len(views), 2, 3)
+    for i, (flip, degrees, zoom) in enumerate(views):
+        angle = math.radians(degrees)
+        cos, sin = math.cos(angle) / zoom, math.sin(angle) / zoom
+        theta[i, 0, 0] = -cos if flip else cos
+        theta[i, 0, 1] = -sin
+        theta[i, 1, 0] = -sin if flip else sin
+        theta[i, 1, 1] = cos
+    return theta
+
+def augment_views(image: torch.Tensor, views: List[Tuple[bool, float, float]] = VIEWS) -> torch.Tensor:
+    """Every test-time view of one (C, H, W) image as a (views, C, H, W) batch.
+
+    All views are resampled by a single grid_sample call; borders are
+    extended rather than zero-filled so rotations add no artificial edges.
+    """
+    batch = image.unsqueeze(0).expand(len(views), *image.shape)
+    theta = view_transforms(views).to(device=image.device, dtype=image.dtype)
+    grid = F.affine_grid(theta, list(batch.shape), align_corners=False)
+    return F.grid_sample(batch, grid, mode='bilinear', padding_mode='border', align_corners=False)
+
+def summarize_views(conditions: List[str], probabilities: torch.Tensor) -> Dict:
+    """Mean and variance across views of each condition's probability, from a (views, conditions) tensor"""
+    mean = probabilities.mean(dim=0).tolist()
+    variance = probabilities.var(dim=0, unbiased=False).tolist()
+    return {
+        'views': probabilities.shape[0],
+        'mean': dict(zip(conditions, mean)),
+        'variance': dict(zip(conditions, variance))
+    }
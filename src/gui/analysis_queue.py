@@ -0,0 +1,320 @@
+import os
+import time
+import heapq
+import collections
+import itertools
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+from ai.progress import STAGES
+
+# Priority classes, most urgent first; requests run earliest deadline first within a class
+PRIORITIES = ['STAT', 'URGENT', 'ROUTINE']
+
+# Seconds from submission by which a result is wanted, per priority class
+DEFAULT_DEADLINES = {'STAT': 60, 'URGENT': 600, 'ROUTINE': 3600}
+
+# Weight of the newest run in the running estimate of analysis time
+SERVICE_TIME_SMOOTHING = 0.3
+
+class AnalysisCancelled(Exception):
+    """Raised from the progress callback to stop a running analysis"""
+
+class AnalysisRequest:
+    """One queued analysis of an image with a given image type"""
+
+    def __init__(self, request_id, image_path, image_type, speculative=False,
+                 priority='ROUTINE', deadline=None, tta=False):
+        self.id = request_id
+        self.image_path = image_path
+        self.image_type = image_type
+        self.speculative = speculative
+        self.tta = tta
+        self.priority = priority
+        self.deadline = time.monotonic() + (deadline or DEFAULT_DEADLINES[priority])
+        self.fast = False
+        try:
+            self.modified = os.path.getmtime(image_path)
+        except OSError:
+            self.modified = None  # Missing file: the analyzer reports the error as the result
+        self.status = 'queued'
+        self.result = None
+        self.steps = len(STAGES)
+        self.cancel_event = threading.Event()
+
+    @property
+    def sort_key(self):
+        # Unclaimed speculation only runs when nothing requested is waiting
+        rank = len(PRIORITIES) if self.speculative else PRIORITIES.index(self.priority)
+        return (rank, self.deadline)
+
+    @property
+    def key(self):
+        return (os.path.abspath(self.image_path), self.modified, self.image_type, self.tta)
+
+    @property
+    def name(self):
+        return os.path.basename(self.image_path)
+
+    @property
+    def label(self):
+        label = f"[{self.status}] {os.path.basename(self.image_path)} ({self.image_type})"
+        if self.priority != 'ROUTINE':
+            label += f" - {self.priority}"
+        if self.tta:
+            label += " - TTA"
+        if self.fast:
+            label += " - fast model"
+        return label + " - speculative" if self.speculative else label
+
+class BatchRequest:
+    """One queued analysis of many images with batched forward passes"""
+
+    def __init__(self, request_id, image_paths, image_type, priority='ROUTINE', deadline=None):
+        self.id = request_id
+        self.image_paths = list(image_paths)
+        self.image_type = image_type
+        self.speculative = False
+        self.priority = priority
+        self.deadline = time.monotonic() + (deadline or DEFAULT_DEADLINES[priority])
+        self.status = 'queued'
+        self.result = None
+        self.steps = len(self.image_paths)
+        self.completed = 0
+        self.cancel_event = threading.Event()
+
+    @property
+    def key(self):
+        return ('batch', self.id)
+
+    @property
+    def sort_key(self):
+        return (PRIORITIES.index(self.priority), self.deadline)
+
+    @property
+    def name(self):
+        return f"{len(self.image_paths)} images"
+
+    @property
+    def label(self):
+        return f"[{self.status}] {self.name} ({self.image_type}) - {self.completed}/{self.steps} done"
+
+class DeadlineQueue:
+    """Blocking queue handing out requests by priority class, then earliest deadline.
+
+    A request whose sort key changed while queued is simply put again; the
+    stale entry is skipped when it comes up.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+
+    def put(self, request):
+        with self._condition:
+            heapq.heappush(self._heap, (request.sort_key, next(self._order), request))
+            self._condition.notify()
+
+    def get(self):
+        with self._condition:
+            while True:
+                while not self._heap:
+                    self._condition.wait()
+                sort_key, _, request = heapq.heappop(self._heap)
+                if sort_key == request.sort_key:
+                    return request
+
+class AnalysisPool(QObject):
+    """Long-lived worker threads that run queued analyses on one analyzer.
+
+    Submitting an image that is already queued, running or recently
+    finished returns the existing request instead of analyzing it twice.
+    Speculative requests are started before the user asks for a result and
+    become regular requests once a matching non-speculative submission
+    attaches to them. Cancellation is cooperative: queued requests are
+    dropped and running ones stop at the next stage transition reported by
+    the analyzer. Batch requests run through the analyzer's analyze_batch
+    and report each image's result through request_result as it finishes.
+
+    Queued requests run by priority class (STAT, URGENT, ROUTINE), earliest
+    deadline first within a class. With fast_fallback, a single-image
+    request that would finish past its deadline, judging by recent analysis
+    times for its image type, asks the analyzer for its cheaper fast variant
+    instead. Analyzers without one for the image type run the full model;
+    only results that really came from the fast variant are marked fast,
+    and those are not reused for later submissions. Signals are delivered
+    on the UI thread.
+    """
+    request_queued = pyqtSignal(object)
+    request_started = pyqtSignal(object)
+    request_progress = pyqtSignal(object, str)
+    request_stage = pyqtSignal(object, int)
+    request_result = pyqtSignal(object, int, dict)
+    request_finished = pyqtSignal(object, dict)
+    request_cancelled = pyqtSignal(object)
+
+    def __init__(self, num_workers=1, max_completed=64, fast_fallback=False, parent=None):
+        super().__init__(parent)
+        self.ai_system = None
+        self.max_completed = max_completed
+        self.fast_fallback = fast_fallback
+        self._service_times = {}
+        self._queue = DeadlineQueue()
+        self._lock = threading.Lock()
+        self._active = {}
+        self._completed = collections.OrderedDict()
+        self._ids = itertools.count(1)
+
+        # The analyzer's models are shared, so a single worker is the safe default
+        self._workers = [
+            threading.Thread(target=self._work, daemon=True, name=f"analysis-worker-{i}")
+            for i in range(num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def set_ai_system(self, ai_system):
+        self.ai_system = ai_system
+
+    def submit(self, image_path, image_type, speculative=False, priority='ROUTINE', deadline=None, tta=False):
+        """Queue an analysis, or return the matching queued, running or finished request.
+
+        deadline is in seconds from now and defaults to DEFAULT_DEADLINES for the priority.
+        tta asks the analyzer for test-time augmentation.
+        """
+        request = AnalysisRequest(next(self._ids), image_path, image_type, speculative, priority, deadline, tta)
+        with self._lock:
+            existing = self._active.get(request.key)
+            if existing is None or existing.cancel_event.is_set():
+                existing = self._completed.get(request.key)
+            if existing is not None:
+                # A real submission attaches to an in-flight or finished speculation
+                sort_key = existing.sort_key
+                existing.speculative = existing.speculative and speculative
+                if not speculative:
+                    existing.priority = min(existing.priority, priority, key=PRIORITIES.index)
+                    existing.deadline = min(existing.deadline, request.deadline)
+                if existing.status == 'queued' and existing.sort_key != sort_key:
+                    self._queue.put(existing)
+                return existing
+            self._active[request.key] = request
+
+        self.request_queued.emit(request)
+        self._queue.put(request)
+        return request
+
+    def submit_batch(self, image_paths, image_type, priority='ROUTINE', deadline=None):
+        """Queue a batched analysis of many images"""
+        request = BatchRequest(next(self._ids), image_paths, image_type, priority, deadline)
+        with self._lock:
+            self._active[request.key] = request
+
+        self.request_queued.emit(request)
+        self._queue.put(request)
+        return request
+
+    def cancel(self, request):
+        """Cancel a queued or running request"""
+        request.cancel_event.set()
+        with self._lock:
+            if request.status != 'queued':
+                return  # Running requests stop at their next stage
+            request.status = 'cancelled'
+            if self._active.get(request.key) is request:
+                del self._active[request.key]
+        self.request_cancelled.emit(request)
+
+    def pending(self):
+        """Requests that are queued or running"""
+        with self._lock:
+            return list(self._active.values())
+
+    def _work(self):
+        while True:
+            request = self._queue.get()
+            with self._lock:
+                if request.status != 'queued':
+                    continue  # Cancelled while waiting
+                request.status = 'running'
+
+            # Any failure becomes the request's result; the worker must outlive it
+            try:
+                self.request_started.emit(request)
+                start = time.monotonic()
+                if isinstance(request, BatchRequest):
+                    analysis = self._run_batch(request)
+                else:
+                    analysis = self._run_single(request)
+                    if analysis.get('success', False) and not request.fast:
+                        self._record_service_time(request.image_type, request.tta,
+                                                  time.monotonic() - start)
+            except Exception as e:
+                analysis = {'success': False, 'error': str(e)}
+
+            with self._lock:
+                if self._active.get(request.key) is request:
+                    del self._active[request.key]
+                cancelled = request.cancel_event.is_set()
+                request.status = 'cancelled' if cancelled else 'done'
+                request.result = None if cancelled else analysis
+                cacheable = (isinstance(request, AnalysisRequest) and not request.fast
+                             and analysis.get('success', False))
+                if not cancelled and cacheable:
+                    self._completed[request.key] = request
+                    while len(self._completed) > self.max_completed:
+                        self._completed.popitem(last=False)
+
+            try:
+                if cancelled:
+                    self.request_cancelled.emit(request)
+                else:
+                    self.request_finished.emit(request, analysis)
+            except Exception as e:
+                print(f"Error reporting the result of {request.name}: {e}")
+
+    def _run_single(self, request):
+        def report_stage(stage, message):
+            if request.cancel_event.is_set():
+                raise AnalysisCancelled()
+            self.request_stage.emit(request, STAGES.index(stage))
+            self.request_progress.emit(request, message)
+
+        options = {'tta': True} if request.tta else {}
+        if self.fast_fallback and self._misses_deadline(request):
+            self.request_progress.emit(request, "Behind deadline, trying the fast model")
+            analysis = self.ai_system.analyze_image(
+                request.image_path, request.image_type, progress_callback=report_stage,
+                fast=True, **options
+            )
+            request.fast = analysis.get('variant') == 'fast'
+            return analysis
+        return self.ai_system.analyze_image(
+            request.image_path, request.image_type, progress_callback=report_stage, **options
+        )
+
+    def _misses_deadline(self, request):
+        """Whether a full analysis started now is expected to finish after the deadline"""
+        with self._lock:
+            expected = self._service_times.get((request.image_type, request.tta))
+        return expected is not None and time.monotonic() + expected > request.deadline
+
+    def _record_service_time(self, image_type, tta, seconds):
+        """Smooth the full-analysis time of an image type, kept apart for TTA runs"""
+        with self._lock:
+            previous = self._service_times.get((image_type, tta))
+            self._service_times[(image_type, tta)] = seconds if previous is None else (
+                SERVICE_TIME_SMOOTHING * seconds + (1 - SERVICE_TIME_SMOOTHING) * previous
+            )
+
+    def _run_batch(self, request):
+        def report_result(index, result):
+            request.completed += 1
+            self.request_result.emit(request, index, result)
+            self.request_stage.emit(request, request.completed)
+            self.request_progress.emit(request, f"{request.completed}/{request.steps} analyzed")
+            if request.cancel_event.is_set():
+                raise AnalysisCancelled()
+
+        return self.ai_system.analyze_batch(
+            request.image_paths, request.image_type, result_callback=report_result
+        )
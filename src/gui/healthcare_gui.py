@@ -5,58 +5,47 @@ from PyQt6.QtWidgets import (QApplication, QMainWindow, QLabel, QPushButton,
                             QTextEdit, QProgressBar, QSplashScreen, QTabWidget,
                             QScrollArea, QFormLayout, QLineEdit, QTableWidget,
                             QTableWidgetItem, QHeaderView, QMenu, QMenuBar,
-                            QStackedWidget, QComboBox, QFrame, QDialog, QMessageBox)
+                            QStackedWidget, QComboBox, QFrame, QDialog, QMessageBox,
+                            QListWidget, QListWidgetItem, QAbstractItemView, QCheckBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer, QSize
 from PyQt6.QtGui import QPixmap, QFont, QIcon, QColor, QAction
 import time
+from functools import partial
 from datetime import datetime
-from ai.comprehensive_radiology_ai import ComprehensiveRadiologyAI
-from ai.pathology_ai import PathologyAI
+from ai.inference_process import RemoteAnalyzer
+from utils.cpu_topology import plan_workers
+from utils.image_pyramid import get_pyramid_cache
+from ai.progress import STAGES, format_timings
+from gui.analysis_queue import AnalysisPool, BatchRequest
+from gui.tiled_viewer import TiledImageViewer
+from gui.patient_browser import PatientBrowser
+from utils.patient_store import get_patient_store
 
-# Sample patient data
-SAMPLE_PATIENTS = [
-    {
-        'id': 'P001',
-        'name': 'John Smith',
-        'age': '45',
-        'gender': 'Male',
-        'dob': '1979-05-15',
-        'history': 'HTN, T2DM',
-        'allergies': 'Penicillin',
-        'last_visit': '2024-01-10',
-        'studies': [
-            {'date': '2024-01-10', 'type': 'Chest X-Ray', 'reason': 'Annual checkup'},
-            {'date': '2023-06-15', 'type': 'CT Chest', 'reason': 'Persistent cough'}
-        ]
-    },
-    {
-        'id': 'P002',
-        'name': 'Sarah Johnson',
-        'age': '62',
-        'gender': 'Female',
-        'dob': '1962-08-23',
-        'history': 'CAD, COPD',
-        'allergies': 'None',
-        'last_visit': '2024-02-01',
-        'studies': [
-            {'date': '2024-02-01', 'type': 'Chest X-Ray', 'reason': 'SOB workup'},
-            {'date': '2023-11-20', 'type': 'Chest X-Ray', 'reason': 'COPD exacerbation'}
-        ]
-    },
-    {
-        'id': 'P003',
-        'name': 'Michael Chen',
-        'age': '35',
-        'gender': 'Male',
-        'dob': '1989-11-30',
-        'history': 'Asthma',
-        'allergies': 'Sulfa',
-        'last_visit': '2024-01-25',
-        'studies': [
-            {'date': '2024-01-25', 'type': 'Chest X-Ray', 'reason': 'Pneumonia follow-up'}
-        ]
-    }
-]
+# Files picked up from dialogs and drag-and-drop; large pathology slides are usually TIFF
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+IMAGE_FILTER = f"Image Files ({' '.join('*' + extension for extension in IMAGE_EXTENSIONS)});;All Files (*)"
+
+# Results table sort order, most urgent first
+URGENCY_RANK = {'STAT': 0, 'URGENT': 1, 'ROUTINE': 2, 'FAILED': 3}
+
+def collect_image_files(paths):
+    """Expand files and folders into a sorted list of image files"""
+    image_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                image_files.extend(
+                    os.path.join(root, name) for name in files
+                    if name.lower().endswith(IMAGE_EXTENSIONS)
+                )
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            image_files.append(path)
+    return sorted(image_files)
+
+class SortKeyItem(QTableWidgetItem):
+    """Table item that sorts by the key stored in its UserRole data"""
+    def __lt__(self, other):
+        return self.data(Qt.ItemDataRole.UserRole) < other.data(Qt.ItemDataRole.UserRole)
 
 class ModernHeader(QWidget):
     def __init__(self, parent=None):
@@ -113,117 +102,29 @@ class ModernHeader(QWidget):
             }
         """)
 
-class PatientTab(QWidget):
-    def __init__(self, patient_data):
-        super().__init__()
-        self.patient_data = patient_data
-        self.initUI()
-    
-    def initUI(self):
-        layout = QVBoxLayout()
-        
-        # Patient info section
-        info_group = QWidget()
-        info_layout = QFormLayout()
-        
-        # Style for labels
-        label_style = """
-            QLabel {
-                font-weight: bold;
-                color: #2c3e50;
-                min-width: 100px;
-            }
-        """
-        
-        # Style for text fields
-        field_style = """
-            QLineEdit {
-                padding: 5px;
-                border: 1px solid #bdc3c7;
-                border-radius: 3px;
-                background: #f8f9fa;
-                min-width: 200px;
-            }
-            QLineEdit:disabled {
-                background: #f5f6f7;
-                color: #2c3e50;
-            }
-        """
-        
-        # Create and style fields
-        fields = [
-            ('Patient ID:', self.patient_data['id']),
-            ('Name:', self.patient_data['name']),
-            ('Age:', self.patient_data['age']),
-            ('Gender:', self.patient_data['gender']),
-            ('DOB:', self.patient_data['dob']),
-            ('Medical History:', self.patient_data['history']),
-            ('Allergies:', self.patient_data['allergies'])
-        ]
-        
-        for label_text, value in fields:
-            label = QLabel(label_text)
-            label.setStyleSheet(label_style)
-            field = QLineEdit(value)
-            field.setReadOnly(True)
-            field.setStyleSheet(field_style)
-            info_layout.addRow(label, field)
-        
-        info_group.setLayout(info_layout)
-        
-        # Studies section
-        studies_label = QLabel("Imaging Studies")
-        studies_label.setStyleSheet("""
-            QLabel {
-                font-size: 14px;
-                font-weight: bold;
-                color: #2c3e50;
-                margin-top: 15px;
-                margin-bottom: 5px;
-            }
-        """)
-        
-        studies_table = QTableWidget()
-        studies_table.setColumnCount(3)
-        studies_table.setHorizontalHeaderLabels(['Date', 'Type', 'Reason'])
-        studies_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
-        studies_table.setStyleSheet("""
-            QTableWidget {
-                border: 1px solid #bdc3c7;
-                border-radius: 3px;
-                background: white;
-            }
-            QHeaderView::section {
-                background-color: #f8f9fa;
-                padding: 5px;
-                border: none;
-                border-bottom: 1px solid #bdc3c7;
-                font-weight: bold;
-                color: #2c3e50;
-            }
-        """)
-        
-        # Add studies to table
-        studies_table.setRowCount(len(self.patient_data['studies']))
-        for i, study in enumerate(self.patient_data['studies']):
-            studies_table.setItem(i, 0, QTableWidgetItem(study['date']))
-            studies_table.setItem(i, 1, QTableWidgetItem(study['type']))
-            studies_table.setItem(i, 2, QTableWidgetItem(study['reason']))
-        
-        # Add all components to main layout
-        layout.addWidget(info_group)
-        layout.addWidget(studies_label)
-        layout.addWidget(studies_table)
-        layout.addStretch()
-        
-        self.setLayout(layout)
-
 class ImageAnalysisTab(QWidget):
+    # Whether the analyzer has a fast variant to fall back on when behind deadline
+    FAST_FALLBACK = False
+    
     def __init__(self, title, description, parent=None):
         super().__init__(parent)
         self.title = title
         self.description = description
+        self.ai_system = None  # Set by set_ai_system once the models have loaded
+        self.speculative_request = None
         self.initUI()
+        self.setAcceptDrops(True)
+        
+        # Long-lived workers that run queued analyses on this tab's analyzer
+        self.pool = AnalysisPool(fast_fallback=self.FAST_FALLBACK, parent=self)
+        self.pool.request_queued.connect(self.request_queued)
+        self.pool.request_started.connect(self.request_started)
+        self.pool.request_progress.connect(self.request_progress)
+        self.pool.request_stage.connect(self.progress_bar.setValue)
+        self.pool.request_result.connect(self.batch_result)
+        self.pool.request_finished.connect(self.request_finished)
+        self.pool.request_cancelled.connect(self.request_cancelled)
+        self.queue_items = {}
     
     def initUI(self):
         layout = QVBoxLayout()
@@ -253,21 +154,44 @@ class ImageAnalysisTab(QWidget):
         upload_section = QWidget()
         upload_layout = QVBoxLayout()
         
-        self.image_label = QLabel()
-        self.image_label.setMinimumSize(500, 500)
-        self.image_label.setStyleSheet("""
-            QLabel {
+        # Tiled zoom/pan viewer rendering from the image pyramid
+        self.viewer = TiledImageViewer(get_pyramid_cache(), "Drop images or folders here\nor click Upload")
+        self.viewer.setMinimumSize(500, 500)
+        self.viewer.setStyleSheet("""
+            QGraphicsView {
                 border: 2px dashed #bdc3c7;
                 border-radius: 5px;
                 background-color: #f8f9fa;
             }
         """)
-        self.image_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        self.image_label.setText("Drop image here\nor click Upload")
+        
+        # Window/level readout for grayscale studies; right-drag in the viewer adjusts it
+        window_layout = QHBoxLayout()
+        self.window_label = QLabel()
+        self.window_label.setStyleSheet("color: #7f8c8d;")
+        reset_window_btn = QPushButton("Reset Window")
+        reset_window_btn.setToolTip("Right-drag on the image to adjust window (horizontal) and level (vertical)")
+        reset_window_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #95a5a6;
+                color: white;
+                border-radius: 5px;
+                padding: 5px 15px;
+            }
+            QPushButton:hover {
+                background-color: #7f8c8d;
+            }
+        """)
+        reset_window_btn.clicked.connect(self.viewer.reset_window_level)
+        self.viewer.window_level_changed.connect(self.update_window_label)
+        self.viewer.image_loaded.connect(self.update_window_label)
+        window_layout.addWidget(self.window_label)
+        window_layout.addStretch()
+        window_layout.addWidget(reset_window_btn)
         
         button_layout = QHBoxLayout()
         
-        upload_btn = QPushButton("Upload Image")
+        upload_btn = QPushButton("Upload Images")
         upload_btn.setStyleSheet("""
             QPushButton {
                 background-color: #3498db;
@@ -304,10 +228,36 @@ class ImageAnalysisTab(QWidget):
         self.analyze_btn = analyze_btn
         self.analyze_btn.setEnabled(False)
         
+        # Opt-in: start analyzing as soon as an image is uploaded
+        self.speculative_check = QCheckBox("Analyze on upload")
+        self.speculative_check.setToolTip(
+            "Start the analysis in the background when an image is uploaded, "
+            "so results are ready when Analyze is pressed"
+        )
+        self.speculative_check.toggled.connect(lambda _: self.restart_speculation())
+        
+        # Priority of new requests; STAT studies run ahead of everything queued
+        self.priority_combo = QComboBox()
+        self.priority_combo.addItems(["Routine", "Urgent", "STAT"])
+        self.priority_combo.setToolTip("Queue priority for new analyses")
+        
+        # Averages flipped, rotated and cropped views for steadier borderline confidences
+        self.tta_check = QCheckBox("Test-time augmentation")
+        self.tta_check.setToolTip(
+            "Analyze several augmented views in one batched pass and report the "
+            "mean confidence with its spread across views"
+        )
+        self.tta_check.toggled.connect(lambda _: self.restart_speculation())
+        
         button_layout.addWidget(upload_btn)
         button_layout.addWidget(analyze_btn)
+        button_layout.addWidget(QLabel("Priority:"))
+        button_layout.addWidget(self.priority_combo)
+        button_layout.addWidget(self.tta_check)
+        button_layout.addWidget(self.speculative_check)
         
-        upload_layout.addWidget(self.image_label)
+        upload_layout.addWidget(self.viewer)
+        upload_layout.addLayout(window_layout)
         upload_layout.addLayout(button_layout)
         upload_section.setLayout(upload_layout)
         
@@ -363,48 +313,313 @@ class ImageAnalysisTab(QWidget):
         self.status_label.setStyleSheet("color: #7f8c8d;")
         self.status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
+        # Analysis queue section
+        queue_section = QWidget()
+        queue_layout = QVBoxLayout()
+        
+        self.queue_list = QListWidget()
+        self.queue_list.setMaximumHeight(120)
+        self.queue_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.queue_list.setStyleSheet("""
+            QListWidget {
+                border: 1px solid #bdc3c7;
+                border-radius: 5px;
+                background: white;
+            }
+        """)
+        self.queue_list.itemClicked.connect(self.show_request)
+        
+        cancel_btn = QPushButton("Cancel Selected")
+        cancel_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #e74c3c;
+                color: white;
+                border-radius: 5px;
+                padding: 5px 15px;
+            }
+            QPushButton:hover {
+                background-color: #c0392b;
+            }
+        """)
+        cancel_btn.clicked.connect(self.cancel_selected)
+        
+        queue_layout.addWidget(QLabel("Analysis Queue"))
+        queue_layout.addWidget(self.queue_list)
+        queue_layout.addWidget(cancel_btn, alignment=Qt.AlignmentFlag.AlignRight)
+        queue_section.setLayout(queue_layout)
+        
+        # Batch results, filled in as each image finishes
+        batch_section = QWidget()
+        batch_layout = QVBoxLayout()
+        
+        self.results_table = QTableWidget(0, 5)
+        self.results_table.setHorizontalHeaderLabels(
+            ["Image", "Urgency", "Top Finding", "Confidence (%)", "Time (s)"]
+        )
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.results_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.results_table.setSortingEnabled(True)
+        self.results_table.setMaximumHeight(200)
+        self.results_table.setStyleSheet("""
+            QTableWidget {
+                border: 1px solid #bdc3c7;
+                border-radius: 5px;
+                background: white;
+            }
+        """)
+        self.results_table.cellClicked.connect(self.show_batch_result)
+        
+        batch_layout.addWidget(QLabel("Batch Results"))
+        batch_layout.addWidget(self.results_table)
+        batch_section.setLayout(batch_layout)
+        
         # Add all sections to main layout
         layout.addWidget(header)
         layout.addWidget(upload_section)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.status_label)
+        layout.addWidget(queue_section)
+        layout.addWidget(batch_section)
         layout.addWidget(results_section)
         
         self.setLayout(layout)
     
     def upload_image(self):
-        file_name, _ = QFileDialog.getOpenFileName(
+        file_names, _ = QFileDialog.getOpenFileNames(
             self,
-            "Select Image",
+            "Select Images",
             "",
-            "Image Files (*.png *.jpg *.jpeg *.bmp);;All Files (*)"
+            IMAGE_FILTER
         )
         
-        if file_name:
-            pixmap = QPixmap(file_name)
-            scaled_pixmap = pixmap.scaled(
-                self.image_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            self.image_label.setPixmap(scaled_pixmap)
-            self.current_image_path = file_name
-            self.analyze_btn.setEnabled(True)
-            self.results_text.clear()
-            self.status_label.setText("Image loaded")
+        if len(file_names) == 1:
+            self.load_image(file_names[0])
+        elif file_names:
+            self.analyze_batch(file_names)
     
-    def analyze_image(self):
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+    
+    def dropEvent(self, event):
+        """Open a single dropped image, or queue dropped images and folders as a batch"""
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        image_files = collect_image_files(paths)
+        event.acceptProposedAction()
+        
+        if len(paths) == 1 and len(image_files) == 1:
+            self.load_image(image_files[0])
+        elif image_files:
+            self.analyze_batch(image_files)
+        else:
+            self.status_label.setText("No images found in the dropped files")
+    
+    def analyze_batch(self, image_files):
+        """Queue many images as one batched analysis with the selected image type"""
+        if self.ai_system is None:
+            self.status_label.setText("AI models are still loading, try again when they are ready")
+            return
+        self.pool.submit_batch(image_files, self.selected_image_type(), self.selected_priority())
+    
+    def load_image(self, file_name):
+        """Make an image current and show it in the viewer"""
+        self.current_image_path = file_name
+        self.viewer.open_image(file_name)
+        
+        self.analyze_btn.setEnabled(self.ai_system is not None)
+        self.results_text.clear()
+        self.status_label.setText("Image loaded" if self.ai_system is not None
+                                  else "Image loaded, waiting for AI models...")
+        self.restart_speculation()
+    
+    def update_window_label(self, *_):
+        """Show the viewer's current window/level, if the image supports windowing"""
+        if self.viewer.windowable():
+            item = self.viewer.image_item
+            self.window_label.setText(f"W: {item.window:.0f}  L: {item.level:.0f}")
+        else:
+            self.window_label.clear()
+    
+    def set_ai_system(self, ai_system):
+        """Attach the analyzer once its models have loaded in the background"""
+        self.ai_system = ai_system
+        self.pool.set_ai_system(ai_system)
+        self.analyze_btn.setEnabled(hasattr(self, 'current_image_path'))
+        self.status_label.setText("AI models ready")
+        self.restart_speculation()
+    
+    def model_load_failed(self, error):
+        self.status_label.setText(f"Failed to load AI models: {error}")
+    
+    def selected_image_type(self):
+        """To be implemented by subclasses"""
+        pass
+    
+    def selected_priority(self):
+        return self.priority_combo.currentText().upper()
+    
+    @staticmethod
+    def format_confidence(analysis, condition, confidence):
+        """Confidence as a percentage, with its spread across TTA views when available"""
+        text = f"{confidence*100:.1f}% confidence"
+        variance = analysis.get('tta', {}).get('variance', {}).get(condition)
+        if variance is not None:
+            text += f" (± {variance ** 0.5 * 100:.1f}% over {analysis['tta']['views']} views)"
+        return text
+    
+    def analysis_complete(self, analysis):
         """To be implemented by subclasses"""
         pass
+    
+    def display_analysis(self, analysis, image_path):
+        """Show an image with any model heatmaps as overlay layers, and its report"""
+        if self.viewer.image_path != image_path:
+            self.viewer.open_image(image_path)
+        self.viewer.clear_heatmaps()
+        for name, heatmap in analysis.get('heatmaps', {}).items():
+            self.viewer.add_heatmap(name, heatmap)
+        self.analysis_complete(analysis)
+    
+    def analyze_image(self):
+        """Queue the current image, attaching to a matching pending or finished request"""
+        if not hasattr(self, 'current_image_path'):
+            return
+        
+        pending = {request.id for request in self.pool.pending()}
+        request = self.pool.submit(self.current_image_path, self.selected_image_type(),
+                                   priority=self.selected_priority(), tta=self.tta_check.isChecked())
+        self.update_request_item(request)
+        
+        if request.status == 'done':
+            self.display_analysis(request.result, request.image_path)
+        elif request.id in pending:
+            self.status_label.setText(f"{os.path.basename(request.image_path)} is already {request.status}")
+    
+    def restart_speculation(self):
+        """Cancel any unclaimed speculation and speculate on the current image and type"""
+        request = self.speculative_request
+        self.speculative_request = None
+        if request is not None and request.speculative and request.status in ('queued', 'running'):
+            self.pool.cancel(request)
+        
+        if (self.speculative_check.isChecked() and self.ai_system is not None
+                and hasattr(self, 'current_image_path')):
+            self.speculative_request = self.pool.submit(
+                self.current_image_path, self.selected_image_type(), speculative=True,
+                tta=self.tta_check.isChecked()
+            )
+    
+    def update_request_item(self, request):
+        item = self.queue_items.get(request.id)
+        if item is not None:
+            item.setText(request.label)
+    
+    def request_queued(self, request):
+        item = QListWidgetItem(request.label)
+        item.setData(Qt.ItemDataRole.UserRole, request)
+        self.queue_list.addItem(item)
+        self.queue_items[request.id] = item
+        self.status_label.setText(f"Queued {request.name}")
+    
+    def request_started(self, request):
+        self.update_request_item(request)
+        self.progress_bar.setMaximum(request.steps)
+        self.progress_bar.setValue(0)
+        self.progress_bar.show()
+    
+    def request_progress(self, request, message):
+        self.status_label.setText(f"{request.name}: {message}")
+    
+    def request_finished(self, request, analysis):
+        self.update_request_item(request)
+        self.hide_progress_if_idle()
+        if isinstance(request, BatchRequest):
+            if analysis.get('success', False):
+                failed = sum(1 for result in analysis['images'] if not result.get('success', False))
+                self.status_label.setText(f"Batch complete: {request.name} analyzed, {failed} failed")
+            else:
+                self.status_label.setText(f"Batch failed: {analysis.get('error', 'Unknown error')}")
+        elif request.speculative:
+            self.status_label.setText(f"{request.name}: results ready, press Analyze to view")
+        else:
+            self.display_analysis(analysis, request.image_path)
+    
+    def request_cancelled(self, request):
+        self.update_request_item(request)
+        self.hide_progress_if_idle()
+        self.status_label.setText(f"Cancelled {request.name}")
+    
+    def batch_result(self, request, index, result):
+        """Add one finished image of a batch to the results table"""
+        self.update_request_item(request)
+        image_path = request.image_paths[index]
+        
+        if result.get('success', False):
+            urgency = result['urgency_level']
+            top_finding, confidence = max(
+                result['findings'].items(), key=lambda x: x[1], default=('No significant findings', 0)
+            )
+            if result.get('variant') == 'screened':
+                top_finding = 'Screened normal'
+            seconds = sum(result['stage_timings'].values())
+        else:
+            urgency = 'FAILED'
+            top_finding, confidence = result.get('error', 'Unknown error'), 0
+            seconds = 0
+        
+        name_item = QTableWidgetItem(os.path.basename(image_path))
+        name_item.setToolTip(image_path)
+        name_item.setData(Qt.ItemDataRole.UserRole, result)
+        urgency_item = SortKeyItem(urgency)
+        urgency_item.setData(Qt.ItemDataRole.UserRole, URGENCY_RANK.get(urgency, len(URGENCY_RANK)))
+        if urgency == 'STAT':
+            urgency_item.setForeground(QColor('#e74c3c'))
+        confidence_item = QTableWidgetItem()
+        confidence_item.setData(Qt.ItemDataRole.DisplayRole, round(confidence * 100, 1))
+        time_item = QTableWidgetItem()
+        time_item.setData(Qt.ItemDataRole.DisplayRole, round(seconds, 2))
+        
+        # Sorting is suspended while a row is filled so it stays together
+        self.results_table.setSortingEnabled(False)
+        row = self.results_table.rowCount()
+        self.results_table.insertRow(row)
+        for column, item in enumerate([name_item, urgency_item, QTableWidgetItem(top_finding),
+                                       confidence_item, time_item]):
+            self.results_table.setItem(row, column, item)
+        self.results_table.setSortingEnabled(True)
+    
+    def show_batch_result(self, row, column):
+        """Show the full report of a batch image"""
+        result = self.results_table.item(row, 0).data(Qt.ItemDataRole.UserRole)
+        if result is not None:
+            self.display_analysis(result, result['image_path'])
+    
+    def hide_progress_if_idle(self):
+        if not any(request.status == 'running' for request in self.pool.pending()):
+            self.progress_bar.hide()
+    
+    def cancel_selected(self):
+        for item in self.queue_list.selectedItems():
+            request = item.data(Qt.ItemDataRole.UserRole)
+            if request.status in ('queued', 'running'):
+                self.pool.cancel(request)
+    
+    def show_request(self, item):
+        """Show the report of a finished request"""
+        request = item.data(Qt.ItemDataRole.UserRole)
+        if request.result is not None and not isinstance(request, BatchRequest):
+            self.display_analysis(request.result, request.image_path)
 
 class RadiologyTab(ImageAnalysisTab):
+    FAST_FALLBACK = True
+    
     def __init__(self, parent=None):
         super().__init__(
             "Comprehensive Radiology Analysis",
             "Upload any radiological image for automated analysis. Supports multiple modalities including chest X-rays, musculoskeletal imaging, and neurological studies.",
             parent
         )
-        self.ai_system = ComprehensiveRadiologyAI()
         self.initializeRadiologyUI()
     
     def initializeRadiologyUI(self):
@@ -434,55 +649,41 @@ class RadiologyTab(ImageAnalysisTab):
             }
         """)
         
+        self.image_type.currentTextChanged.connect(lambda _: self.restart_speculation())
+        
         # Insert combobox after the image label
         layout = self.layout()
         layout.insertWidget(2, self.image_type)
     
-    def analyze_image(self):
-        if not hasattr(self, 'current_image_path'):
-            return
-        
-        self.analyze_btn.setEnabled(False)
-        self.progress_bar.setMaximum(0)
-        self.progress_bar.show()
-        
+    def selected_image_type(self):
         # Get selected image type
         selected_type = self.image_type.currentText()
         
         # Convert selected type to the format expected by the AI system
-        if selected_type == "Auto-detect" or selected_type == "Chest X-Ray":
-            image_type = "chest"  # Always use "chest" for chest X-rays
-        else:
-            image_type = selected_type.lower().replace(" ", "_")
-        
-        # Create and start worker thread
-        self.worker = RadiologyAnalysisWorker(
-            self.ai_system, 
-            self.current_image_path,
-            image_type
-        )
-        self.worker.progress.connect(self.update_progress)
-        self.worker.finished.connect(self.analysis_complete)
-        self.worker.start()
-    
-    def update_progress(self, message):
-        self.status_label.setText(message)
+        if selected_type == "Chest X-Ray":
+            return "chest"  # Always use "chest" for chest X-rays
+        return selected_type.lower().replace(" ", "_")
     
     def analysis_complete(self, analysis):
-        self.progress_bar.hide()
-        self.analyze_btn.setEnabled(True)
-        
         if analysis.get('success', False):
             report = "RADIOLOGY ANALYSIS REPORT\n"
             report += "=" * 50 + "\n\n"
             
+            if analysis.get('variant') == 'fast':
+                report += "PRELIMINARY: analyzed with the fast reduced-resolution model to meet the "
+                report += "deadline. Re-analyze once the queue has cleared for the full-resolution read.\n\n"
+            elif analysis.get('variant') == 'screened':
+                report += f"SCREENED NORMAL: the triage model scored this study "
+                report += f"{analysis['screening_score']*100:.1f}% suspicious, below the threshold for "
+                report += "full analysis. Routine radiologist review still applies.\n\n"
+            
             # Get primary diagnosis (highest confidence finding)
             primary_diagnosis = max(analysis['findings'].items(), key=lambda x: x[1], default=('No significant findings', 0))
             
             # Primary Diagnosis and Treatment
             report += "PRIMARY DIAGNOSIS:\n"
             report += "-" * 20 + "\n"
-            report += f"• {primary_diagnosis[0]} ({primary_diagnosis[1]*100:.1f}% confidence)\n\n"
+            report += f"• {primary_diagnosis[0]} ({self.format_confidence(analysis, *primary_diagnosis)})\n\n"
             
             report += "RECOMMENDED ACTIONS:\n"
             report += "-" * 20 + "\n"
@@ -499,6 +700,12 @@ class RadiologyTab(ImageAnalysisTab):
             
             # Image Info
             report += f"Image Type: {analysis['image_type'].replace('_', ' ').title()}\n"
+            detection = analysis.get('detection')
+            if detection is not None and detection['method'] == 'classifier':
+                report += (f"Detected: {detection['modality']} {detection['body_part']} "
+                           f"({detection['confidence']*100:.0f}% confidence)\n")
+            elif detection is not None:
+                report += "Detected: by image statistics (classifier unsure or not installed)\n"
             report += f"Urgency Level: {analysis['urgency_level']}\n\n"
             
             # Detailed Findings
@@ -506,7 +713,7 @@ class RadiologyTab(ImageAnalysisTab):
             report += "-" * 20 + "\n"
             for condition, confidence in analysis['findings'].items():
                 if condition != primary_diagnosis[0]:  # Skip primary diagnosis as it's shown above
-                    report += f"• {condition}: {confidence*100:.1f}% confidence\n"
+                    report += f"• {condition}: {self.format_confidence(analysis, condition, confidence)}\n"
             
             # Features
             if analysis['features']:
@@ -528,36 +735,11 @@ class RadiologyTab(ImageAnalysisTab):
             report += "verified by a qualified radiologist. Clinical correlation is recommended."
             
             self.results_text.setText(report)
-            self.status_label.setText("Analysis complete")
+            self.status_label.setText(f"Analysis complete ({format_timings(analysis['stage_timings'])})")
         else:
             self.results_text.setText(f"Error during analysis: {analysis.get('error', 'Unknown error')}")
             self.status_label.setText("Analysis failed")
 
-class RadiologyAnalysisWorker(QThread):
-    finished = pyqtSignal(dict)
-    progress = pyqtSignal(str)
-    
-    def __init__(self, ai_system, image_path, image_type):
-        super().__init__()
-        self.ai_system = ai_system
-        self.image_path = image_path
-        self.image_type = image_type
-    
-    def run(self):
-        self.progress.emit("Loading models...")
-        time.sleep(1)
-        
-        self.progress.emit("Preprocessing image...")
-        time.sleep(1)
-        
-        self.progress.emit("Analyzing with AI models...")
-        analysis = self.ai_system.analyze_image(self.image_path, self.image_type)
-        
-        self.progress.emit("Generating report...")
-        time.sleep(1)
-        
-        self.finished.emit(analysis)
-
 class PathologyTab(ImageAnalysisTab):
     def __init__(self, parent=None):
         super().__init__(
@@ -566,7 +748,6 @@ class PathologyTab(ImageAnalysisTab):
             parent
         )
         self.initializePathologyUI()
-        self.ai_system = PathologyAI()
     
     def initializePathologyUI(self):
         # Add pathology-specific controls
@@ -589,35 +770,16 @@ class PathologyTab(ImageAnalysisTab):
             }
         """)
         
+        self.image_type.currentTextChanged.connect(lambda _: self.restart_speculation())
+        
         # Insert combobox after the image label
         layout = self.layout()
         layout.insertWidget(2, self.image_type)
     
-    def analyze_image(self):
-        if not hasattr(self, 'current_image_path'):
-            return
-        
-        self.analyze_btn.setEnabled(False)
-        self.progress_bar.setMaximum(0)
-        self.progress_bar.show()
-        
-        # Create and start worker thread
-        self.worker = PathologyAnalysisWorker(
-            self.ai_system, 
-            self.current_image_path,
-            self.image_type.currentText()
-        )
-        self.worker.progress.connect(self.update_progress)
-        self.worker.finished.connect(self.analysis_complete)
-        self.worker.start()
-    
-    def update_progress(self, message):
-        self.status_label.setText(message)
+    def selected_image_type(self):
+        return self.image_type.currentText()
     
     def analysis_complete(self, analysis):
-        self.progress_bar.hide()
-        self.analyze_btn.setEnabled(True)
-        
         if analysis.get('success', False):
             report = "PATHOLOGY ANALYSIS REPORT\n"
             report += "=" * 50 + "\n\n"
@@ -629,7 +791,7 @@ class PathologyTab(ImageAnalysisTab):
             report += "FINDINGS:\n"
             report += "-" * 20 + "\n"
             for condition, confidence in analysis['findings'].items():
-                report += f"• {condition}: {confidence*100:.1f}% confidence\n"
+                report += f"• {condition}: {self.format_confidence(analysis, condition, confidence)}\n"
             
             # Features
             if analysis['features']:
@@ -651,40 +813,87 @@ class PathologyTab(ImageAnalysisTab):
             report += "verified by a qualified pathologist. Clinical correlation is recommended."
             
             self.results_text.setText(report)
-            self.status_label.setText("Analysis complete")
+            self.status_label.setText(f"Analysis complete ({format_timings(analysis['stage_timings'])})")
         else:
             self.results_text.setText(f"Error during analysis: {analysis.get('error', 'Unknown error')}")
             self.status_label.setText("Analysis failed")
 
-class PathologyAnalysisWorker(QThread):
-    finished = pyqtSignal(dict)
-    progress = pyqtSignal(str)
+class ModelLoader(QThread):
+    """Construct an analyzer, and so load its models, off the UI thread"""
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
     
-    def __init__(self, ai_system, image_path, image_type):
+    def __init__(self, name, factory):
         super().__init__()
-        self.ai_system = ai_system
-        self.image_path = image_path
-        self.image_type = image_type
+        self.name = name
+        self.factory = factory
+        self.load_time = None
     
     def run(self):
-        self.progress.emit("Loading models...")
-        time.sleep(1)
-        
-        self.progress.emit("Preprocessing image...")
-        time.sleep(1)
-        
-        self.progress.emit("Analyzing with AI models...")
-        analysis = self.ai_system.analyze_image(self.image_path, self.image_type)
-        
-        self.progress.emit("Generating report...")
-        time.sleep(1)
-        
-        self.finished.emit(analysis)
+        start = time.perf_counter()
+        try:
+            ai_system = self.factory()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.load_time = time.perf_counter() - start
+        self.loaded.emit(ai_system)
 
 class HealthcareGUI(QMainWindow):
-    def __init__(self):
+    def __init__(self, splash=None):
         super().__init__()
+        self.splash = splash
         self.initUI()
+        self.start_model_loading()
+    
+    def start_model_loading(self):
+        """Start every analyzer's inference process from parallel background threads"""
+        self.model_status = {}
+        self.model_loaders = []
+        # One NUMA node and share of the container's CPU quota per inference process
+        radiology_cpus, pathology_cpus = plan_workers(2)
+        for name, tab, factory in [
+            ("Radiology", self.radiology_tab,
+             partial(RemoteAnalyzer, 'ai.comprehensive_radiology_ai', 'ComprehensiveRadiologyAI', radiology_cpus)),
+            ("Pathology", self.pathology_tab,
+             partial(RemoteAnalyzer, 'ai.pathology_ai', 'PathologyAI', pathology_cpus))
+        ]:
+            loader = ModelLoader(name, factory)
+            loader.loaded.connect(tab.set_ai_system)
+            loader.loaded.connect(lambda ai_system, loader=loader: self.model_loaded(loader, ai_system))
+            loader.failed.connect(tab.model_load_failed)
+            loader.failed.connect(lambda error, loader=loader: self.model_failed(loader, error))
+            self.model_status[name] = "loading..."
+            self.model_loaders.append(loader)
+        
+        self.show_model_status()
+        for loader in self.model_loaders:
+            loader.start()
+    
+    def model_loaded(self, loader, ai_system):
+        # Weights held by the analyzer's inference process, from its model registry
+        megabytes = sum(entry['megabytes'] for entry in ai_system.memory_report)
+        self.model_status[loader.name] = f"ready ({loader.load_time:.1f}s, {megabytes:.0f} MB)"
+        self.show_model_status()
+    
+    def model_failed(self, loader, error):
+        self.model_status[loader.name] = "failed"
+        self.show_model_status()
+    
+    def show_model_status(self):
+        """Show per-model load progress on the splash screen and status bar"""
+        lines = [f"{name} models: {status}" for name, status in self.model_status.items()]
+        self.statusBar().showMessage("   ".join(lines))
+        
+        if self.splash is not None:
+            self.splash.showMessage(
+                "\n".join(lines),
+                Qt.AlignmentFlag.AlignBottom | Qt.AlignmentFlag.AlignHCenter,
+                QColor('white')
+            )
+            if not any(status == "loading..." for status in self.model_status.values()):
+                self.splash.finish(self)
+                self.splash = None
     
     def initUI(self):
         self.setWindowTitle('Advanced Clinical Imaging System')
@@ -703,35 +912,14 @@ class HealthcareGUI(QMainWindow):
         content = QWidget()
         content_layout = QHBoxLayout(content)
         
-        # Left panel with patient tabs
+        # Left panel with the patient browser
         left_panel = QWidget()
         left_layout = QVBoxLayout(left_panel)
         
-        # Patient tabs
-        patient_tabs = QTabWidget()
-        patient_tabs.setStyleSheet("""
-            QTabWidget::pane {
-                border: 1px solid #bdc3c7;
-                border-radius: 3px;
-                background: white;
-            }
-            QTabBar::tab {
-                background: #f8f9fa;
-                border: 1px solid #bdc3c7;
-                padding: 8px 12px;
-                margin-right: 2px;
-            }
-            QTabBar::tab:selected {
-                background: white;
-                border-bottom: none;
-            }
-        """)
-        
-        for patient in SAMPLE_PATIENTS:
-            tab = PatientTab(patient)
-            patient_tabs.addTab(tab, f"{patient['name']} ({patient['id']})")
+        # Patient browser backed by the patient database
+        self.patient_browser = PatientBrowser(get_patient_store())
         
-        left_layout.addWidget(patient_tabs)
+        left_layout.addWidget(self.patient_browser)
         
         # Right panel with analysis tabs
         right_panel = QWidget()
@@ -756,11 +944,11 @@ class HealthcareGUI(QMainWindow):
             }
         """)
         
-        radiology_tab = RadiologyTab()
-        pathology_tab = PathologyTab()
+        self.radiology_tab = RadiologyTab()
+        self.pathology_tab = PathologyTab()
         
-        analysis_tabs.addTab(radiology_tab, "Radiology")
-        analysis_tabs.addTab(pathology_tab, "Pathology")
+        analysis_tabs.addTab(self.radiology_tab, "Radiology")
+        analysis_tabs.addTab(self.pathology_tab, "Pathology")
         
         right_layout.addWidget(analysis_tabs)
         
@@ -789,12 +977,10 @@ def main():
     splash = QSplashScreen(splash_pix)
     splash.show()
     
-    # Create and show main window
-    window = HealthcareGUI()
+    # Show the main window right away; the splash closes once all models have loaded
+    window = HealthcareGUI(splash)
     window.show()
-    
-    # Close splash screen
-    splash.finish(window)
+    splash.raise_()
     
     sys.exit(app.exec())
 
@@ -0,0 +1,276 @@
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QFormLayout, QLabel, QLineEdit,
+                            QTableView, QTableWidget, QTableWidgetItem, QHeaderView,
+                            QAbstractItemView, QSplitter)
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from utils.patient_store import LIST_COLUMNS
+
+COLUMN_TITLES = {
+    'id': 'Patient ID',
+    'name': 'Name',
+    'age': 'Age',
+    'gender': 'Gender',
+    'dob': 'DOB',
+    'last_visit': 'Last Visit'
+}
+
+class PatientTableModel(QAbstractTableModel):
+    """Patient list that pulls rows from a PatientStore page by page as the view scrolls"""
+
+    def __init__(self, store, page_size=256, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.page_size = page_size
+        self.search = ''
+        self._rows = []
+        self._exhausted = False
+
+    def set_search(self, search):
+        """Restart the list with the patients matching a search"""
+        self.beginResetModel()
+        self.search = search
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(LIST_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            return self._rows[index.row()][index.column()]
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return COLUMN_TITLES[LIST_COLUMNS[section]]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        after = None
+        if self._rows:
+            last = self._rows[-1]
+            after = (last[LIST_COLUMNS.index('name')], last[LIST_COLUMNS.index('id')])
+
+        rows = self.store.page(self.search, after, self.page_size)
+        self._exhausted = len(rows) < self.page_size
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def patient_id(self, row):
+        return self._rows[row][LIST_COLUMNS.index('id')]
+
+class PatientDetails(QWidget):
+    """Demographics and imaging studies of the selected patient"""
+
+    FIELDS = [
+        ('Patient ID:', 'id'),
+        ('Name:', 'name'),
+        ('Age:', 'age'),
+        ('Gender:', 'gender'),
+        ('DOB:', 'dob'),
+        ('Medical History:', 'history'),
+        ('Allergies:', 'allergies')
+    ]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        # Patient info section
+        info_group = QWidget()
+        info_layout = QFormLayout()
+
+        # Style for labels
+        label_style = """
+            QLabel {
+                font-weight: bold;
+                color: #2c3e50;
+                min-width: 100px;
+            }
+        """
+
+        # Style for text fields
+        field_style = """
+            QLineEdit {
+                padding: 5px;
+                border: 1px solid #bdc3c7;
+                border-radius: 3px;
+                background: #f8f9fa;
+                min-width: 200px;
+            }
+            QLineEdit:disabled {
+                background: #f5f6f7;
+                color: #2c3e50;
+            }
+        """
+
+        self.fields = {}
+        for label_text, key in self.FIELDS:
+            label = QLabel(label_text)
+            label.setStyleSheet(label_style)
+            field = QLineEdit()
+            field.setReadOnly(True)
+            field.setStyleSheet(field_style)
+            info_layout.addRow(label, field)
+            self.fields[key] = field
+
+        info_group.setLayout(info_layout)
+
+        # Studies section
+        studies_label = QLabel("Imaging Studies")
+        studies_label.setStyleSheet("""
+            QLabel {
+                font-size: 14px;
+                font-weight: bold;
+                color: #2c3e50;
+                margin-top: 15px;
+                margin-bottom: 5px;
+            }
+        """)
+
+        self.studies_table = QTableWidget()
+        self.studies_table.setColumnCount(3)
+        self.studies_table.setHorizontalHeaderLabels(['Date', 'Type', 'Reason'])
+        self.studies_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.studies_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.studies_table.setStyleSheet("""
+            QTableWidget {
+                border: 1px solid #bdc3c7;
+                border-radius: 3px;
+                background: white;
+            }
+            QHeaderView::section {
+                background-color: #f8f9fa;
+                padding: 5px;
+                border: none;
+                border-bottom: 1px solid #bdc3c7;
+                font-weight: bold;
+                color: #2c3e50;
+            }
+        """)
+
+        layout.addWidget(info_group)
+        layout.addWidget(studies_label)
+        layout.addWidget(self.studies_table)
+        layout.addStretch()
+
+        self.setLayout(layout)
+
+    def show_patient(self, patient):
+        """Fill the form from a patient record, or clear it for None"""
+        patient = patient or {}
+        for key, field in self.fields.items():
+            field.setText(patient.get(key) or '')
+
+        studies = patient.get('studies', [])
+        self.studies_table.setRowCount(len(studies))
+        for i, study in enumerate(studies):
+            self.studies_table.setItem(i, 0, QTableWidgetItem(study['date']))
+            self.studies_table.setItem(i, 1, QTableWidgetItem(study['type']))
+            self.studies_table.setItem(i, 2, QTableWidgetItem(study['reason']))
+
+class PatientBrowser(QWidget):
+    """Searchable patient list with the selected patient's details.
+
+    Only the rows scrolled into view are read from the store, and only the
+    selected patient's full record and studies are loaded, so start-up and
+    search cost do not grow with the number of patients.
+    """
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.model = PatientTableModel(store, parent=self)
+
+        # Search once typing pauses instead of on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_search)
+
+        self.initUI()
+        self.apply_search()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Search by name, patient ID or date (YYYY-MM-DD)")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.setStyleSheet("""
+            QLineEdit {
+                padding: 6px;
+                border: 1px solid #bdc3c7;
+                border-radius: 3px;
+                background: white;
+            }
+        """)
+        self.search_edit.textChanged.connect(lambda _: self.search_timer.start())
+
+        self.count_label = QLabel()
+        self.count_label.setStyleSheet("color: #7f8c8d;")
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self.table.verticalHeader().hide()
+        # Fixed row heights and column widths keep layout independent of the row count
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self.table.setStyleSheet("""
+            QTableView {
+                border: 1px solid #bdc3c7;
+                border-radius: 3px;
+                background: white;
+            }
+            QHeaderView::section {
+                background-color: #f8f9fa;
+                padding: 5px;
+                border: none;
+                border-bottom: 1px solid #bdc3c7;
+                font-weight: bold;
+                color: #2c3e50;
+            }
+        """)
+        self.table.selectionModel().currentRowChanged.connect(self.show_selected)
+
+        self.details = PatientDetails()
+
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.details)
+
+        layout.addWidget(self.search_edit)
+        layout.addWidget(self.count_label)
+        layout.addWidget(splitter)
+        self.setLayout(layout)
+
+    def apply_search(self):
+        search = self.search_edit.text()
+        self.model.set_search(search)
+        if self.model.canFetchMore():
+            self.model.fetchMore()
+        self.count_label.setText(f"{self.store.count(search)} patients")
+
+        if self.model.rowCount() > 0:
+            self.table.selectRow(0)
+        else:
+            self.details.show_patient(None)
+
+    def show_selected(self, current, previous):
+        if current.isValid():
+            self.details.show_patient(self.store.patient(self.model.patient_id(current.row())))
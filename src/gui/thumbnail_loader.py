@@ -0,0 +1,68 @@
+import os
+import collections
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QObject, Qt, QSize, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader, QPixmap
+
+def decode_thumbnail(image_path, size):
+    """Decode an image directly at reduced size where the format supports it"""
+    reader = QImageReader(image_path)
+    reader.setAutoTransform(True)
+    original = reader.size()
+    if original.isValid():
+        reader.setScaledSize(original.scaled(size, Qt.AspectRatioMode.KeepAspectRatio))
+    return reader.read()
+
+class ThumbnailLoader(QObject):
+    """Decode image previews on background threads and keep an LRU pixmap cache.
+
+    Previews are cached by path, modification time and target size, so
+    re-opening a study shows its preview immediately. The decoder runs off
+    the UI thread and returns a QImage; pixmaps are only created on the UI
+    thread, which emits thumbnail_ready(path, pixmap).
+    """
+    thumbnail_ready = pyqtSignal(str, QPixmap)
+    _decoded = pyqtSignal(object, QImage)
+
+    def __init__(self, decoder=decode_thumbnail, cache_size=64, max_workers=2, parent=None):
+        super().__init__(parent)
+        self.decoder = decoder
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._in_flight = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='thumbnail')
+        self._decoded.connect(self._store)
+
+    def request(self, image_path, size):
+        """Return the cached preview, or start decoding it and return None"""
+        try:
+            key = (os.path.abspath(image_path), os.path.getmtime(image_path), size.width(), size.height())
+        except OSError:
+            return None
+
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        if key not in self._in_flight:
+            self._in_flight.add(key)
+            self._executor.submit(self._decode, key, image_path, QSize(size))
+        return None
+
+    def _decode(self, key, image_path, size):
+        try:
+            image = self.decoder(image_path, size)
+        except Exception:
+            image = QImage()
+        self._decoded.emit(key, image)
+
+    def _store(self, key, image):
+        self._in_flight.discard(key)
+        if image.isNull():
+            return
+
+        pixmap = QPixmap.fromImage(image)
+        self._cache[key] = pixmap
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        self.thumbnail_ready.emit(key[0], pixmap)
@@ -0,0 +1,528 @@
+import math
+import itertools
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from PyQt6.QtWidgets import QGraphicsView, QGraphicsScene, QGraphicsItem
+from PyQt6.QtCore import Qt, QObject, QRectF, pyqtSignal
+from PyQt6.QtGui import QImage, QPixmap, QPainter, QColor
+
+def array_to_qimage(array):
+    """Copy an (H, W, C) uint8 array with 1, 3 or 4 channels into a QImage"""
+    array = np.ascontiguousarray(array)
+    height, width, channels = array.shape
+    image_format = {
+        1: QImage.Format.Format_Grayscale8,
+        3: QImage.Format.Format_RGB888,
+        4: QImage.Format.Format_RGBA8888
+    }[channels]
+    return QImage(array.data, width, height, width * channels, image_format).copy()
+
+def heatmap_colormap():
+    """256-entry blue-green-red RGBA lookup table whose alpha follows the value"""
+    values = np.linspace(0.0, 1.0, 256, dtype=np.float32)
+    red = np.clip(2.0 * values - 0.5, 0.0, 1.0)
+    green = np.clip(1.5 - np.abs(4.0 * values - 2.0), 0.0, 1.0)
+    blue = np.clip(1.5 - 2.0 * values, 0.0, 1.0)
+    return (np.stack([red, green, blue, values], axis=1) * 255).astype(np.uint8)
+
+HEATMAP_LUT = heatmap_colormap()
+
+# Grayscale images up to this many pixels are kept in memory for window/level
+MAX_WINDOW_LEVEL_PIXELS = 64 * 1024 * 1024
+
+def level_for_scale(levels, scale):
+    """Coarsest of a list of (width, height) levels with at least one pixel per screen pixel"""
+    full_width = levels[0][0]
+    for level in range(len(levels) - 1, -1, -1):
+        if full_width / levels[level][0] <= 1.0 / max(scale, 1e-6):
+            return level
+    return 0
+
+def window_level_lut(window, level, maxval):
+    """uint8 lookup table mapping every stored value 0..maxval through a window/level"""
+    values = np.arange(maxval + 1, dtype=np.float32)
+    low = level - window / 2.0
+    return np.clip((values - low) * (255.0 / max(window, 1e-6)), 0, 255).astype(np.uint8)
+
+class WindowLevelImage:
+    """Grayscale image kept at its stored bit depth, with 2x box-downsampled levels.
+
+    8-bit images stay uint8 and everything else is stored as uint16, so any
+    window/level is a lookup table of at most 65536 entries.
+    """
+
+    def __init__(self, array, tile_size=256):
+        self.tile_size = tile_size
+        self.maxval = 255 if array.dtype == np.uint8 else 65535
+        self.arrays = [array]
+        while max(array.shape) > tile_size:
+            height, width = array.shape[0] // 2 * 2, array.shape[1] // 2 * 2
+            array = array[:height, :width].reshape(height // 2, 2, width // 2, 2).mean(
+                axis=(1, 3), dtype=np.float32
+            ).astype(array.dtype)
+            self.arrays.append(array)
+        self.levels = [(array.shape[1], array.shape[0]) for array in self.arrays]
+
+    @classmethod
+    def load(cls, image_path):
+        """Load a grayscale image at full bit depth, or return None for other images"""
+        image = Image.open(image_path)
+        if image.mode not in ('L', 'I', 'I;16', 'I;16B', 'I;16L', 'F'):
+            return None
+        if image.width * image.height > MAX_WINDOW_LEVEL_PIXELS:
+            return None
+
+        array = np.asarray(image)
+        if array.dtype != np.uint8 and array.dtype != np.uint16:
+            # 32-bit integer or float pixels: keep them as uint16, rescaled only if out of range
+            low, high = float(array.min()), float(array.max())
+            if low < 0 or high > 65535 or array.dtype.kind == 'f':
+                array = (array.astype(np.float32) - low) * (65535.0 / max(high - low, 1e-6))
+            array = array.astype(np.uint16)
+        return cls(np.ascontiguousarray(array))
+
+    def default_window(self):
+        """(window, level) spanning the 0.5-99.5 percentile range of the coarsest level"""
+        low, high = np.percentile(self.arrays[-1], [0.5, 99.5])
+        return max(float(high - low), 1.0), float(high + low) / 2.0
+
+class PyramidLayer:
+    """Tiles of an image read from the image pyramid cache"""
+    _ids = itertools.count(1)
+
+    def __init__(self, pyramid, image_path):
+        self.id = next(self._ids)
+        self.pyramid = pyramid
+        self.image_path = image_path
+        meta = pyramid.metadata(image_path)  # Builds the pyramid on first use
+        self.levels = [tuple(level) for level in meta['levels']]
+        self.tile_size = meta['tile_size']
+
+    def read_tile(self, level, row, col):
+        return array_to_qimage(self.pyramid.read_tile(self.image_path, level, row, col))
+
+class HeatmapLayer:
+    """Model heatmap rendered as colored tiles on the grid of an image layer.
+
+    The heatmap is a 2D array of values in [0, 1] at any resolution; each
+    tile upsamples only the part of the heatmap it covers.
+    """
+    _ids = itertools.count(1)
+
+    def __init__(self, heatmap, levels, tile_size):
+        self.id = f"heatmap-{next(self._ids)}"
+        self.heatmap = Image.fromarray(np.clip(np.asarray(heatmap, dtype=np.float32), 0.0, 1.0), 'F')
+        self.levels = levels
+        self.tile_size = tile_size
+
+    def read_tile(self, level, row, col):
+        width, height = self.levels[level]
+        x0, y0 = col * self.tile_size, row * self.tile_size
+        x1, y1 = min(x0 + self.tile_size, width), min(y0 + self.tile_size, height)
+
+        # Box in heatmap coordinates covered by this tile
+        scale_x, scale_y = self.heatmap.width / width, self.heatmap.height / height
+        tile = self.heatmap.resize(
+            (x1 - x0, y1 - y0), Image.Resampling.BILINEAR,
+            box=(x0 * scale_x, y0 * scale_y, x1 * scale_x, y1 * scale_y)
+        )
+        values = (np.asarray(tile) * 255).astype(np.uint8)
+        return array_to_qimage(HEATMAP_LUT[values])
+
+class TileCache(QObject):
+    """Decode tiles on background threads into an LRU cache of pixmaps.
+
+    Keys are (layer id, level, row, col). Tiles are converted to pixmaps on
+    the UI thread, which then emits tile_ready(key).
+    """
+    tile_ready = pyqtSignal(object)
+    _decoded = pyqtSignal(object, QImage)
+
+    def __init__(self, capacity=512, max_workers=4, parent=None):
+        super().__init__(parent)
+        self.capacity = capacity
+        self._cache = collections.OrderedDict()
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tile')
+        self._decoded.connect(self._store)
+
+    def get(self, key):
+        """Cached pixmap for a tile, or None"""
+        pixmap = self._cache.get(key)
+        if pixmap is not None:
+            self._cache.move_to_end(key)
+        return pixmap
+
+    def request(self, key, read):
+        """Start decoding a tile with read() unless it is cached or already queued"""
+        if key not in self._cache and key not in self._pending:
+            self._pending[key] = self._executor.submit(self._decode, key, read)
+
+    def cancel_pending(self):
+        """Drop queued tiles that have not started; visible ones are requested again on repaint"""
+        for key, future in list(self._pending.items()):
+            if future.cancel():
+                del self._pending[key]
+
+    def _decode(self, key, read):
+        try:
+            image = read()
+        except Exception:
+            image = QImage()
+        self._decoded.emit(key, image)
+
+    def _store(self, key, image):
+        self._pending.pop(key, None)
+        if image.isNull():
+            return
+
+        self._cache[key] = QPixmap.fromImage(image)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+        self.tile_ready.emit(key)
+
+class TileLayerItem(QGraphicsItem):
+    """Scene item drawing one tiled layer at the pyramid level matching the zoom.
+
+    Scene coordinates are full-resolution pixels. Only cached tiles are
+    drawn; missing ones are requested and covered by the nearest coarser
+    cached level until they arrive, so painting never waits on decoding.
+    """
+
+    def __init__(self, layer, tiles):
+        super().__init__()
+        self.layer = layer
+        self.tiles = tiles
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        width, height = layer.levels[0]
+        self._bounds = QRectF(0, 0, width, height)
+
+    def boundingRect(self):
+        return self._bounds
+
+    def downsample(self, level):
+        width, height = self.layer.levels[0]
+        level_width, level_height = self.layer.levels[level]
+        return width / level_width, height / level_height
+
+    def tile_rects(self, level, row, col):
+        """Source rect within the tile image and target rect in the scene"""
+        size = self.layer.tile_size
+        level_width, level_height = self.layer.levels[level]
+        width = min(size, level_width - col * size)
+        height = min(size, level_height - row * size)
+        fx, fy = self.downsample(level)
+        target = QRectF(col * size * fx, row * size * fy, width * fx, height * fy)
+        return QRectF(0, 0, width, height), target
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect.intersected(self._bounds)
+        if exposed.isEmpty():
+            return
+
+        scale = math.hypot(painter.worldTransform().m11(), painter.worldTransform().m12())
+        level = level_for_scale(self.layer.levels, scale)
+        size = self.layer.tile_size
+        fx, fy = self.downsample(level)
+        first_col, last_col = int(exposed.left() / (size * fx)), int(exposed.right() / (size * fx))
+        first_row, last_row = int(exposed.top() / (size * fy)), int(exposed.bottom() / (size * fy))
+        level_width, level_height = self.layer.levels[level]
+        last_col = min(last_col, (level_width - 1) // size)
+        last_row = min(last_row, (level_height - 1) // size)
+
+        # The coarsest level is a single tile and backs every fallback
+        top = len(self.layer.levels) - 1
+        self.request(top, 0, 0)
+
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                pixmap = self.tiles.get((self.layer.id, level, row, col))
+                if pixmap is None:
+                    self.request(level, row, col)
+                    self.draw_fallback(painter, level, row, col)
+                else:
+                    source, target = self.tile_rects(level, row, col)
+                    painter.drawPixmap(target, pixmap, source)
+
+    def request(self, level, row, col):
+        self.tiles.request(
+            (self.layer.id, level, row, col),
+            lambda: self.layer.read_tile(level, row, col)
+        )
+
+    def draw_fallback(self, painter, level, row, col):
+        """Draw the part of the nearest cached coarser tile that covers a missing tile"""
+        _, target = self.tile_rects(level, row, col)
+        for coarser in range(level + 1, len(self.layer.levels)):
+            shift = coarser - level
+            parent_row, parent_col = row >> shift, col >> shift
+            pixmap = self.tiles.get((self.layer.id, coarser, parent_row, parent_col))
+            if pixmap is None:
+                continue
+
+            # Map the missing tile's scene rect into the coarser tile's pixels
+            size = self.layer.tile_size
+            fx, fy = self.downsample(coarser)
+            source = QRectF(
+                target.x() / fx - parent_col * size, target.y() / fy - parent_row * size,
+                target.width() / fx, target.height() / fy
+            )
+            painter.drawPixmap(target, pixmap, source)
+            return
+
+class WindowLevelItem(QGraphicsItem):
+    """Scene item rendering a WindowLevelImage through a window/level lookup table.
+
+    Each paint maps only the exposed part of the level matching the zoom,
+    so the work per frame is bounded by the screen size rather than the
+    image size. The LUT is applied in one vectorized pass into a reusable
+    8-bit buffer that Qt reads directly as a QImage, without a copy.
+    """
+
+    def __init__(self, image):
+        super().__init__()
+        self.image = image
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+        width, height = image.levels[0]
+        self._bounds = QRectF(0, 0, width, height)
+        self._display = np.empty(0, dtype=np.uint8)
+        self.set_window_level(*image.default_window())
+
+    def boundingRect(self):
+        return self._bounds
+
+    def set_window_level(self, window, level):
+        self.window = max(window, 1.0)
+        self.level = level
+        self.lut = window_level_lut(self.window, self.level, self.image.maxval)
+        self.update()
+
+    def paint(self, painter, option, widget=None):
+        exposed = option.exposedRect.intersected(self._bounds)
+        if exposed.isEmpty():
+            return
+
+        scale = math.hypot(painter.worldTransform().m11(), painter.worldTransform().m12())
+        level = level_for_scale(self.image.levels, scale)
+        array = self.image.arrays[level]
+        fx = self._bounds.width() / array.shape[1]
+        fy = self._bounds.height() / array.shape[0]
+        x0, y0 = int(exposed.left() / fx), int(exposed.top() / fy)
+        x1 = min(int(math.ceil(exposed.right() / fx)), array.shape[1])
+        y1 = min(int(math.ceil(exposed.bottom() / fy)), array.shape[0])
+        if x1 <= x0 or y1 <= y0:
+            return
+
+        width, height = x1 - x0, y1 - y0
+        if self._display.size < width * height:
+            self._display = np.empty(width * height, dtype=np.uint8)
+        display = self._display[:width * height].reshape(height, width)
+        np.take(self.lut, array[y0:y1, x0:x1], out=display, mode='clip')
+
+        # The QImage only borrows the buffer, which outlives this synchronous draw
+        image = QImage(display.data, width, height, width, QImage.Format.Format_Grayscale8)
+        painter.drawImage(QRectF(x0 * fx, y0 * fy, width * fx, height * fy), image)
+
+class TiledImageViewer(QGraphicsView):
+    """Zoomable, pannable viewer that renders large images from the image pyramid.
+
+    Wheel zooms around the cursor, dragging pans and double-click fits the
+    image to the window. Grayscale images are kept at full bit depth and
+    can be windowed by dragging with the right mouse button: horizontally
+    for window width, vertically for level. Heatmaps are drawn as separate
+    tiled layers above the image. Drops are left to the parent widget.
+    """
+    image_loaded = pyqtSignal(str)
+    window_level_changed = pyqtSignal(float, float)
+    _opened = pyqtSignal(str, object)
+
+    MAX_ZOOM = 8.0
+
+    def __init__(self, pyramid, placeholder="", parent=None):
+        super().__init__(parent)
+        self.pyramid = pyramid
+        self.placeholder = placeholder
+        self.message = placeholder
+        self.image_path = None
+        self.image_item = None
+        self.heatmap_items = {}
+        self._pending_heatmaps = {}
+        self._fitted = True
+        self._window_drag = None
+
+        self.setScene(QGraphicsScene(self))
+        self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
+        self.setResizeAnchor(QGraphicsView.ViewportAnchor.AnchorViewCenter)
+        # Tiles are cheap to redraw from cache, and a full repaint re-requests every visible tile
+        self.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate)
+        self.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        self.setAcceptDrops(False)
+
+        self.tiles = TileCache(parent=self)
+        self.tiles.tile_ready.connect(lambda _: self.viewport().update())
+
+        # Building a pyramid for a new image can take a while, so it runs off the UI thread
+        self._open_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pyramid')
+        self._opened.connect(self._show_layer)
+
+    def open_image(self, image_path):
+        """Show an image, building its pyramid in the background if needed"""
+        self.clear()
+        self.image_path = image_path
+        self.message = "Loading image..."
+        self.viewport().update()
+        self._open_executor.submit(self._open_layer, image_path)
+
+    def clear(self):
+        self._window_drag = None
+        self.tiles.cancel_pending()
+        self.scene().clear()
+        self.image_item = None
+        self.heatmap_items = {}
+        self._pending_heatmaps = {}
+        self.image_path = None
+        self.message = self.placeholder
+        self.viewport().update()
+
+    def add_heatmap(self, name, heatmap, opacity=0.45):
+        """Overlay a heatmap (2D array in [0, 1]) over the whole image as its own layer"""
+        if self.image_item is None:
+            self._pending_heatmaps[name] = (heatmap, opacity)
+            return
+
+        self.remove_heatmap(name)
+        base = self.image_item.image if self.windowable() else self.image_item.layer
+        item = TileLayerItem(HeatmapLayer(heatmap, base.levels, base.tile_size), self.tiles)
+        item.setOpacity(opacity)
+        item.setZValue(1 + len(self.heatmap_items))
+        self.scene().addItem(item)
+        self.heatmap_items[name] = item
+
+    def remove_heatmap(self, name):
+        item = self.heatmap_items.pop(name, None)
+        if item is not None:
+            self.scene().removeItem(item)
+
+    def clear_heatmaps(self):
+        for name in list(self.heatmap_items):
+            self.remove_heatmap(name)
+        self._pending_heatmaps = {}
+
+    def set_heatmap_visible(self, name, visible):
+        if name in self.heatmap_items:
+            self.heatmap_items[name].setVisible(visible)
+
+    def windowable(self):
+        return isinstance(self.image_item, WindowLevelItem)
+
+    def set_window_level(self, window, level):
+        if self.windowable():
+            self.image_item.set_window_level(window, level)
+            self.window_level_changed.emit(self.image_item.window, self.image_item.level)
+
+    def reset_window_level(self):
+        if self.windowable():
+            self.set_window_level(*self.image_item.image.default_window())
+
+    def fit_to_window(self):
+        if self.image_item is not None:
+            self.fitInView(self.image_item, Qt.AspectRatioMode.KeepAspectRatio)
+            self._fitted = True
+
+    def _open_layer(self, image_path):
+        try:
+            # Grayscale studies keep their bit depth for windowing; everything else uses the pyramid
+            layer = WindowLevelImage.load(image_path) or PyramidLayer(self.pyramid, image_path)
+            self._opened.emit(image_path, layer)
+        except Exception as e:
+            self._opened.emit(image_path, e)
+
+    def _show_layer(self, image_path, layer):
+        if image_path != self.image_path:
+            return  # Another image was opened meanwhile
+        if isinstance(layer, Exception):
+            self.message = f"Cannot display image: {layer}"
+            self.viewport().update()
+            return
+
+        if isinstance(layer, WindowLevelImage):
+            self.image_item = WindowLevelItem(layer)
+        else:
+            self.image_item = TileLayerItem(layer, self.tiles)
+        self.scene().addItem(self.image_item)
+        self.scene().setSceneRect(self.image_item.boundingRect())
+        self.fit_to_window()
+
+        pending, self._pending_heatmaps = self._pending_heatmaps, {}
+        for name, (heatmap, opacity) in pending.items():
+            self.add_heatmap(name, heatmap, opacity)
+        self.image_loaded.emit(image_path)
+        if self.windowable():
+            self.window_level_changed.emit(self.image_item.window, self.image_item.level)
+
+    def wheelEvent(self, event):
+        if self.image_item is None:
+            return
+        factor = 1.25 ** (event.angleDelta().y() / 120)
+
+        # Zoom out no further than fitting the window, and in to MAX_ZOOM screen pixels per image pixel
+        fit = min(self.viewport().width() / self.image_item.boundingRect().width(),
+                  self.viewport().height() / self.image_item.boundingRect().height())
+        current = self.transform().m11()
+        factor = max(min(factor, self.MAX_ZOOM / current), min(fit, 1.0) / current)
+        self.scale(factor, factor)
+        self._fitted = False
+        self.tiles.cancel_pending()
+
+    def scrollContentsBy(self, dx, dy):
+        super().scrollContentsBy(dx, dy)
+        self.tiles.cancel_pending()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self._fitted:
+            self.fit_to_window()
+
+    def mouseDoubleClickEvent(self, event):
+        self.fit_to_window()
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.RightButton and self.windowable():
+            self._window_drag = (event.position(), self.image_item.window, self.image_item.level)
+            event.accept()
+            return
+        super().mousePressEvent(event)
+
+    def mouseMoveEvent(self, event):
+        if self._window_drag is not None:
+            start, window, level = self._window_drag
+            delta = event.position() - start
+            # Dragging across the whole viewport sweeps the full value range
+            value_range = self.image_item.image.maxval
+            self.set_window_level(
+                window + delta.x() * value_range / max(self.viewport().width(), 1),
+                level - delta.y() * value_range / max(self.viewport().height(), 1)
+            )
+            event.accept()
+            return
+        super().mouseMoveEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        if self._window_drag is not None and event.button() == Qt.MouseButton.RightButton:
+            self._window_drag = None
+            event.accept()
+            return
+        super().mouseReleaseEvent(event)
+
+    def drawForeground(self, painter, rect):
+        """Show the placeholder or status message when no image is displayed"""
+        if self.image_item is not None or not self.message:
+            return
+        painter.save()
+        painter.resetTransform()
+        painter.setPen(QColor('#7f8c8d'))
+        painter.drawText(self.viewport().rect(), Qt.AlignmentFlag.AlignCenter, self.message)
+        painter.restore()
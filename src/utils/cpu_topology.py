@@ -0,0 +1,117 @@
+import os
+import math
+import glob
+from typing import Dict, List, Optional, Set
+
+class Placement:
+    """CPUs and thread budget assigned to one inference worker"""
+
+    def __init__(self, node: Optional[int], cpus: List[int], threads: int):
+        self.node = node
+        self.cpus = cpus
+        self.threads = threads
+
+def parse_cpu_list(text: str) -> List[int]:
+    """Expand a kernel CPU list such as '0-3,8,10-11'"""
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """CPUs worth of time the container's cgroup quota allows, or None if unlimited"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        quota, period = cpu_max.split()
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+
+    # cgroup v1: quota of -1 means unlimited
+    quota = _read('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') or _read('/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_quota_us')
+    period = _read('/sys/fs/cgroup/cpu/cpu.cfs_period_us') or _read('/sys/fs/cgroup/cpu,cpuacct/cpu.cfs_period_us')
+    if quota and period and int(quota) > 0:
+        return int(quota) / int(period)
+    return None
+
+def available_cpus() -> Set[int]:
+    """CPUs this process may be scheduled on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return set(os.sched_getaffinity(0))
+    return set(range(os.cpu_count() or 1))
+
+def cpu_budget() -> int:
+    """Threads worth running in this process.
+
+    The smallest of the CPUs in the affinity mask, the cgroup quota rounded
+    up and CLINICAL_CPU_BUDGET (set for workers placed by plan_workers).
+    """
+    budget = len(available_cpus())
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        budget = min(budget, math.ceil(limit))
+    override = int(os.environ.get("CLINICAL_CPU_BUDGET", 0))
+    if override > 0:
+        budget = min(budget, override)
+    return max(budget, 1)
+
+def numa_nodes() -> Dict[int, List[int]]:
+    """Usable CPUs of each NUMA node; a single node holding every CPU when there is no NUMA info"""
+    usable = available_cpus()
+    nodes = {}
+    for path in glob.glob('/sys/devices/system/node/node[0-9]*/cpulist'):
+        node = int(os.path.basename(os.path.dirname(path))[len('node'):])
+        cpus = sorted(usable.intersection(parse_cpu_list(_read(path) or '')))
+        if cpus:
+            nodes[node] = cpus
+    return nodes or {0: sorted(usable)}
+
+def plan_workers(count: int) -> List[Placement]:
+    """Spread inference workers over NUMA nodes and split the CPU budget between them.
+
+    Workers are assigned to nodes round-robin. Each gets an equal share of
+    the cgroup quota, capped by the CPUs of its node divided among the
+    workers sharing that node. On a single-node host workers are not
+    pinned, only sized.
+    """
+    nodes = numa_nodes()
+    node_ids = sorted(nodes)
+    share = max(cpu_budget() // max(count, 1), 1)
+
+    assigned = [node_ids[i % len(node_ids)] for i in range(count)]
+    placements = []
+    for node in assigned:
+        per_node = max(len(nodes[node]) // assigned.count(node), 1)
+        placements.append(Placement(
+            node=node if len(node_ids) > 1 else None,
+            cpus=nodes[node],
+            threads=min(share, per_node)
+        ))
+    return placements
+
+def apply_placement(placement: Placement):
+    """Pin the current process to a placement and cap its thread pools.
+
+    Call before loading models: Linux allocates pages on the node of the
+    CPU that first touches them, so weights loaded after pinning are local.
+    """
+    if placement.node is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, placement.cpus)
+    os.environ["CLINICAL_CPU_BUDGET"] = str(placement.threads)
+    # Native thread pools read these when torch is first imported
+    for variable in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, str(placement.threads))
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from PIL import Image
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "clinical-imaging", "pyramids")
+
+# Disk space the pyramids may use before the least recently used ones are removed
+DEFAULT_MAX_MEGABYTES = 2048
+
+# Minimum interval between recording uses of one pyramid for LRU eviction
+TOUCH_INTERVAL = 60
+
+class ImagePyramidCache:
+    """On-disk multi-resolution pyramid cache for large images.
+
+    Each image is decoded once and stored as power-of-two downsampled levels.
+    Every level is a uint8 array of fixed-size tiles with shape
+    (tile_rows, tile_cols, tile_size, tile_size, channels), keyed by the
+    SHA-1 of the file content so renamed or copied files share one entry.
+
+    The levels are decoded patient images, so the directory (default
+    ~/.cache/clinical-imaging/pyramids, CLINICAL_PYRAMID_CACHE) is created
+    private to the user and held to a byte budget (CLINICAL_PYRAMID_CACHE_MB,
+    default 2 GB). Each use stamps an entry's meta.json, and after every
+    build the least recently used entries are removed until the cache fits.
+    Processes sharing the directory rebuild an entry another one evicted.
+    """
+
+    def __init__(self, cache_dir: str = None, tile_size: int = 256, max_bytes: int = None):
+        self.cache_dir = cache_dir or os.environ.get("CLINICAL_PYRAMID_CACHE", DEFAULT_CACHE_DIR)
+        self.tile_size = tile_size
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("CLINICAL_PYRAMID_CACHE_MB", DEFAULT_MAX_MEGABYTES)) * 2**20)
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._hashes: Dict[Tuple[str, float, int], str] = {}
+        self._metadata: Dict[str, Dict] = {}
+        self._touched: Dict[str, float] = {}
+
+    def content_hash(self, image_path: str) -> str:
+        """SHA-1 of the file content, memoized by path, mtime and size"""
+        stat = os.stat(image_path)
+        key = (os.path.abspath(image_path), stat.st_mtime, stat.st_size)
+        with self._lock:
+            if key in self._hashes:
+                return self._hashes[key]
+
+        digest = hashlib.sha1()
+        with open(image_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+
+        with self._lock:
+            self._hashes[key] = digest.hexdigest()
+        return self._hashes[key]
+
+    def metadata(self, image_path: str) -> Dict:
+        """Return pyramid metadata for an image, building the pyramid on first use"""
+        key = self.content_hash(image_path)
+        with self._lock:
+            meta = self._metadata.get(key)
+        if meta is not None:
+            self._touch(key)
+            return meta
+
+        meta_path = os.path.join(self.cache_dir, key, 'meta.json')
+        built = False
+        if not os.path.exists(meta_path):
+            self._build(image_path, key)
+            built = True
+        with open(meta_path) as f:
+            meta = json.load(f)
+
+        with self._lock:
+            self._metadata[key] = meta
+        self._touch(key, force=True)
+        if built:
+            self.evict(keep=key)
+        return meta
+
+    def cache_bytes(self) -> int:
+        """Disk space used by all pyramids in the cache directory"""
+        return sum(size for _, _, size in self._entries())
+
+    def evict(self, keep: str = None):
+        """Remove least recently used pyramids until the cache fits its byte budget"""
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for key, _, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            # Readers with the levels memory-mapped keep their pages until they unmap them
+            shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+            with self._lock:
+                self._metadata.pop(key, None)
+                self._touched.pop(key, None)
+            total -= size
+
+    def clear(self):
+        """Remove every pyramid, e.g. at the end of a session handling patient images"""
+        with self._lock:
+            self._metadata.clear()
+            self._touched.clear()
+        for name in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        """(key, last use, bytes) of every complete pyramid on disk"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            directory = os.path.join(self.cache_dir, name)
+            if name.startswith('.'):
+                continue  # Staging directory of a pyramid being built
+            try:
+                last_used = os.stat(os.path.join(directory, 'meta.json')).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(directory))
+            except OSError:
+                continue  # Removed by another process meanwhile
+            entries.append((name, last_used, size))
+        return entries
+
+    def _touch(self, key: str, force: bool = False):
+        """Record a use of a pyramid, at most once per TOUCH_INTERVAL"""
+        now = time.time()
+        with self._lock:
+            if not force and now - self._touched.get(key, 0) < TOUCH_INTERVAL:
+                return
+            self._touched[key] = now
+        try:
+            os.utime(os.path.join(self.cache_dir, key, 'meta.json'))
+        except OSError:
+            pass  # Evicted; the next read rebuilds it
+
+    def level_for_size(self, image_path: str, min_width: int, min_height: int) -> int:
+        """Smallest level that is still at least min_width x min_height (level 0 if none is)"""
+        levels = self.metadata(image_path)['levels']
+        for level in range(len(levels) - 1, -1, -1):
+            width, height = levels[level]
+            if width >= min_width and height >= min_height:
+                return level
+        return 0
+
+    def read_level(self, image_path: str, level: int) -> np.ndarray:
+        """Read a whole level as an (H, W, C) uint8 array"""
+        tiles = self._tiles(image_path, level)
+        width, height = self.metadata(image_path)['levels'][level]
+        rows, cols, tile, _, channels = tiles.shape
+        array = tiles.transpose(0, 2, 1, 3, 4).reshape(rows * tile, cols * tile, channels)
+        return np.ascontiguousarray(array[:height, :width])
+
+    def read_tile(self, image_path: str, level: int, row: int, col: int) -> np.ndarray:
+        """Read a single (tile_size, tile_size, C) tile of a level"""
+        return np.array(self._tiles(image_path, level)[row, col])
+
+    def get_image(self, image_path: str, min_size: Tuple[int, int] = (0, 0)) -> Image.Image:
+        """Nearest pyramid level at least min_size (width, height) large, as a PIL image"""
+        level = self.level_for_size(image_path, *min_size)
+        array = self.read_level(image_path, level)
+        if array.shape[2] == 1:
+            return Image.fromarray(array[:, :, 0], 'L')
+        return Image.fromarray(array, 'RGB')
+
+    def _tiles(self, image_path: str, level: int) -> np.ndarray:
+        """Memory-mapped tiles of a level, rebuilding the pyramid if it was evicted"""
+        try:
+            return self._load_tiles(self.metadata(image_path), level)
+        except FileNotFoundError:
+            key = self.content_hash(image_path)
+            with self._lock:
+                self._metadata.pop(key, None)
+            return self._load_tiles(self.metadata(image_path), level)
+
+    def _load_tiles(self, meta: Dict, level: int) -> np.ndarray:
+        path = os.path.join(self.cache_dir, meta['key'], f'level_{level}.npy')
+        return np.load(path, mmap_mode='r')
+
+    def _build(self, image_path: str, key: str):
+        """Decode the image once and write every pyramid level atomically"""
+        image = self._to_uint8(Image.open(image_path))
+        channels = 1 if image.mode == 'L' else 3
+
+        staging = tempfile.mkdtemp(dir=self.cache_dir, prefix=f'.{key}-')
+        try:
+            levels: List[Tuple[int, int]] = []
+            while True:
+                levels.append(image.size)
+                array = np.asarray(image, dtype=np.uint8).reshape(image.height, image.width, channels)
+                np.save(os.path.join(staging, f'level_{len(levels) - 1}.npy'), self._tile(array))
+                if max(image.size) <= self.tile_size:
+                    break
+                image = image.reduce(2)
+
+            with open(os.path.join(staging, 'meta.json'), 'w') as f:
+                json.dump({
+                    'key': key,
+                    'source': os.path.abspath(image_path),
+                    'tile_size': self.tile_size,
+                    'channels': channels,
+                    'levels': levels
+                }, f)
+
+            try:
+                os.replace(staging, os.path.join(self.cache_dir, key))
+            except OSError:
+                # Another process finished the same pyramid first
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    def _tile(self, array: np.ndarray) -> np.ndarray:
+        """Pad an (H, W, C) array to whole tiles and reshape to (rows, cols, T, T, C)"""
+        tile = self.tile_size
+        height, width, channels = array.shape
+        rows, cols = -(-height // tile), -(-width // tile)
+        padded = np.zeros((rows * tile, cols * tile, channels), dtype=np.uint8)
+        padded[:height, :width] = array
+        return padded.reshape(rows, tile, cols, tile, channels).transpose(0, 2, 1, 3, 4).copy()
+
+    @staticmethod
+    def _to_uint8(image: Image.Image) -> Image.Image:
+        """Convert any PIL mode to 8-bit L or RGB, rescaling high bit depth images"""
+        if image.mode in ('I', 'I;16', 'I;16B', 'I;16L', 'F'):
+            array = np.asarray(image, dtype=np.float32)
+            low, high = float(array.min()), float(array.max())
+            array = (array - low) * (255.0 / max(high - low, 1e-6))
+            return Image.fromarray(array.astype(np.uint8), 'L')
+        if image.mode in ('1', 'L'):
+            return image.convert('L')
+        return image.convert('RGB')
+
+_shared_cache: Optional[ImagePyramidCache] = None
+_shared_lock = threading.Lock()
+
+def get_pyramid_cache() -> ImagePyramidCache:
+    """Process-wide pyramid cache shared by the GUI and the analyzers"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = ImagePyramidCache()
+        return _shared_cache
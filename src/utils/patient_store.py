@@ -0,0 +1,203 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_DATABASE = os.path.join(os.path.expanduser("~"), ".local", "share", "clinical-imaging", "patients.db")
+
+# Columns shown in the patient list, in display order
+LIST_COLUMNS = ['id', 'name', 'age', 'gender', 'dob', 'last_visit']
+
+# Demo patients used to seed an empty database
+SAMPLE_PATIENTS = [
+    {
+        'id': 'P001',
+        'name': 'John Smith',
+        'age': '45',
+        'gender': 'Male',
+        'dob': '1979-05-15',
+        'history': 'HTN, T2DM',
+        'allergies': 'Penicillin',
+        'last_visit': '2024-01-10',
+        'studies': [
+            {'date': '2024-01-10', 'type': 'Chest X-Ray', 'reason': 'Annual checkup'},
+            {'date': '2023-06-15', 'type': 'CT Chest', 'reason': 'Persistent cough'}
+        ]
+    },
+    {
+        'id': 'P002',
+        'name': 'Sarah Johnson',
+        'age': '62',
+        'gender': 'Female',
+        'dob': '1962-08-23',
+        'history': 'CAD, COPD',
+        'allergies': 'None',
+        'last_visit': '2024-02-01',
+        'studies': [
+            {'date': '2024-02-01', 'type': 'Chest X-Ray', 'reason': 'SOB workup'},
+            {'date': '2023-11-20', 'type': 'Chest X-Ray', 'reason': 'COPD exacerbation'}
+        ]
+    },
+    {
+        'id': 'P003',
+        'name': 'Michael Chen',
+        'age': '35',
+        'gender': 'Male',
+        'dob': '1989-11-30',
+        'history': 'Asthma',
+        'allergies': 'Sulfa',
+        'last_visit': '2024-01-25',
+        'studies': [
+            {'date': '2024-01-25', 'type': 'Chest X-Ray', 'reason': 'Pneumonia follow-up'}
+        ]
+    }
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS patients (
+    id TEXT PRIMARY KEY COLLATE NOCASE,
+    name TEXT NOT NULL COLLATE NOCASE,
+    age TEXT,
+    gender TEXT,
+    dob TEXT,
+    history TEXT,
+    allergies TEXT,
+    last_visit TEXT
+);
+CREATE TABLE IF NOT EXISTS studies (
+    id INTEGER PRIMARY KEY,
+    patient_id TEXT NOT NULL REFERENCES patients(id),
+    date TEXT,
+    type TEXT,
+    reason TEXT
+);
+CREATE INDEX IF NOT EXISTS patients_name ON patients(name, id);
+CREATE INDEX IF NOT EXISTS patients_dob ON patients(dob);
+CREATE INDEX IF NOT EXISTS patients_last_visit ON patients(last_visit);
+CREATE INDEX IF NOT EXISTS studies_patient ON studies(patient_id, date);
+"""
+
+class PatientStore:
+    """Indexed SQLite store of patients and their imaging studies.
+
+    The patient list is read in pages ordered by name, continuing after the
+    last (name, id) seen, so each page is an index range scan regardless of
+    how far the user has scrolled. Searches match prefixes of the patient
+    ID, name, date of birth or last visit date ('2024-01' matches every day
+    in January).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or os.environ.get("CLINICAL_PATIENT_DB", DEFAULT_DATABASE)
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+        if self.count() == 0:
+            self.add_patients(SAMPLE_PATIENTS)
+
+    def add_patients(self, patients: Iterable[Dict]):
+        """Insert or replace patients, each with an optional list of studies"""
+        patients = list(patients)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO patients "
+                "(id, name, age, gender, dob, history, allergies, last_visit) "
+                "VALUES (:id, :name, :age, :gender, :dob, :history, :allergies, :last_visit)",
+                [
+                    {column: patient.get(column) for column in
+                     ['id', 'name', 'age', 'gender', 'dob', 'history', 'allergies', 'last_visit']}
+                    for patient in patients
+                ]
+            )
+            self._connection.executemany(
+                "DELETE FROM studies WHERE patient_id = ?",
+                [(patient['id'],) for patient in patients]
+            )
+            self._connection.executemany(
+                "INSERT INTO studies (patient_id, date, type, reason) VALUES (?, ?, ?, ?)",
+                [
+                    (patient['id'], study['date'], study['type'], study['reason'])
+                    for patient in patients for study in patient.get('studies', [])
+                ]
+            )
+
+    def count(self, search: str = '') -> int:
+        """Number of patients matching a search"""
+        where, parameters = self._search_clause(search)
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT COUNT(*) FROM patients {where}", parameters
+            ).fetchone()[0]
+
+    def page(self, search: str = '', after: Optional[Tuple[str, str]] = None, limit: int = 256) -> List[Tuple]:
+        """Up to limit matching patients ordered by name, continuing after a (name, id) key.
+
+        Rows contain the LIST_COLUMNS values in order.
+        """
+        where, parameters = self._search_clause(search)
+        if after is not None:
+            where += (" AND " if where else "WHERE ") + "(name, id) > (?, ?)"
+            parameters += list(after)
+
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT {', '.join(LIST_COLUMNS)} FROM patients {where} "
+                f"ORDER BY name, id LIMIT ?",
+                parameters + [limit]
+            ).fetchall()
+
+    def patient(self, patient_id: str) -> Optional[Dict]:
+        """Full record of one patient with studies, most recent first"""
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT id, name, age, gender, dob, history, allergies, last_visit "
+                "FROM patients WHERE id = ?",
+                (patient_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            patient = dict(zip([column[0] for column in cursor.description], row))
+            patient['studies'] = [
+                {'date': date, 'type': study_type, 'reason': reason}
+                for date, study_type, reason in self._connection.execute(
+                    "SELECT date, type, reason FROM studies WHERE patient_id = ? ORDER BY date DESC",
+                    (patient_id,)
+                )
+            ]
+        return patient
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    @staticmethod
+    def _search_clause(search: str) -> Tuple[str, List]:
+        search = search.strip()
+        if not search:
+            return "", []
+        # Escape LIKE wildcards typed by the user; NOCASE columns use their index for prefix LIKE
+        pattern = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        # Dates are stored as ISO text, so a prefix is a range on the date index
+        upper = search[:-1] + chr(ord(search[-1]) + 1)
+        return (
+            "WHERE (id LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\' "
+            "OR (dob >= ? AND dob < ?) OR (last_visit >= ? AND last_visit < ?))",
+            [pattern, pattern, search, upper, search, upper]
+        )
+
+_shared_store = None
+_shared_lock = threading.Lock()
+
+def get_patient_store() -> PatientStore:
+    """Process-wide patient store"""
+    global _shared_store
+    with _shared_lock:
+        if _shared_store is None:
+            _shared_store = PatientStore()
+        return _shared_store
@@ -0,0 +1,226 @@
+import os
+import time
+import threading
+import pytest
+
+pytest.importorskip("PyQt6")
+
+from gui.analysis_queue import AnalysisPool, DeadlineQueue
+
+class RecordingAnalyzer:
+    """Analyzer stand-in that records calls and can be held mid-analysis"""
+
+    def __init__(self, fast_types=()):
+        self.fast_types = fast_types
+        self.calls = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def analyze_image(self, image_path, image_type, progress_callback=None, **options):
+        self.calls.append((os.path.basename(image_path), options))
+        self.started.set()
+        self.release.wait(5)
+        try:
+            progress_callback('decode', 'Decoding image...')
+        except Exception as e:
+            # Analyzers report failures, including cancellation, as results
+            return {'success': False, 'error': str(e)}
+        fast = options.get('fast', False) and image_type in self.fast_types
+        return {'success': True, 'image_type': image_type, 'variant': 'fast' if fast else 'full'}
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def finished(request):
+    return request.status in ('done', 'cancelled')
+
+@pytest.fixture
+def images(tmp_path):
+    paths = []
+    for name in ('a.png', 'b.png', 'c.png'):
+        path = tmp_path / name
+        path.write_bytes(b'')
+        paths.append(str(path))
+    return paths
+
+@pytest.fixture
+def analyzer():
+    return RecordingAnalyzer()
+
+@pytest.fixture
+def pool(analyzer):
+    pool = AnalysisPool()
+    pool.set_ai_system(analyzer)
+    return pool
+
+def test_duplicate_submission_returns_the_queued_request(pool, analyzer, images):
+    analyzer.release.clear()
+    first = pool.submit(images[0], 'chest')
+    assert pool.submit(images[0], 'chest') is first
+    assert pool.submit(images[0], 'neuro') is not first
+    analyzer.release.set()
+    wait_for(lambda: finished(first))
+    assert [call[0] for call in analyzer.calls].count('a.png') == 2
+
+def test_finished_result_is_reused(pool, analyzer, images):
+    first = pool.submit(images[0], 'chest')
+    wait_for(lambda: finished(first))
+    assert pool.submit(images[0], 'chest') is first
+    assert len(analyzer.calls) == 1
+
+def test_real_submission_claims_a_speculative_request(pool, analyzer, images):
+    analyzer.release.clear()
+    speculative = pool.submit(images[0], 'chest', speculative=True)
+    claimed = pool.submit(images[0], 'chest', priority='STAT')
+    assert claimed is speculative
+    assert not claimed.speculative
+    assert claimed.priority == 'STAT'
+    analyzer.release.set()
+    wait_for(lambda: finished(claimed))
+
+def test_cancelled_queued_request_never_runs(pool, analyzer, images):
+    analyzer.release.clear()
+    running = pool.submit(images[0], 'chest')
+    analyzer.started.wait(5)
+    queued = pool.submit(images[1], 'chest')
+    pool.cancel(queued)
+    assert queued.status == 'cancelled'
+    analyzer.release.set()
+    wait_for(lambda: finished(running))
+    time.sleep(0.05)
+    assert [call[0] for call in analyzer.calls] == ['a.png']
+    # A cancelled request is not reused
+    assert pool.submit(images[1], 'chest') is not queued
+
+def test_running_request_stops_at_next_stage(pool, analyzer, images):
+    analyzer.release.clear()
+    request = pool.submit(images[0], 'chest')
+    analyzer.started.wait(5)
+    pool.cancel(request)
+    analyzer.release.set()
+    wait_for(lambda: finished(request))
+    assert request.status == 'cancelled'
+    assert request.result is None
+
+class FailingAnalyzer(RecordingAnalyzer):
+    def analyze_image(self, image_path, image_type, progress_callback=None, **options):
+        super().analyze_image(image_path, image_type, progress_callback, **options)
+        if image_path.endswith('a.png'):
+            raise RuntimeError("inference process died")
+        return {'success': True, 'variant': 'full'}
+
+def test_analyzer_exception_becomes_the_result_and_worker_survives(images):
+    pool = AnalysisPool()
+    pool.set_ai_system(FailingAnalyzer())
+    failed = pool.submit(images[0], 'chest')
+    later = pool.submit(images[1], 'chest')
+    wait_for(lambda: finished(failed) and finished(later))
+    assert failed.result == {'success': False, 'error': 'inference process died'}
+    assert later.result['success']
+    assert failed not in pool.pending()
+    # Failures are not cached
+    assert pool.submit(images[0], 'chest') is not failed
+
+def test_submitting_a_missing_file_reports_an_error(pool, tmp_path):
+    request = pool.submit(str(tmp_path / 'deleted.png'), 'chest')
+    wait_for(lambda: finished(request))
+    assert request.status == 'done'
+
+class Entry:
+    def __init__(self, name, sort_key):
+        self.name = name
+        self.sort_key = sort_key
+
+def test_deadline_queue_orders_by_priority_then_deadline():
+    queue = DeadlineQueue()
+    for entry in [Entry('routine', (2, 5.0)), Entry('stat late', (0, 9.0)),
+                  Entry('urgent', (1, 1.0)), Entry('stat early', (0, 3.0))]:
+        queue.put(entry)
+    assert [queue.get().name for _ in range(4)] == ['stat early', 'stat late', 'urgent', 'routine']
+
+def test_deadline_queue_skips_stale_entries():
+    queue = DeadlineQueue()
+    promoted, other = Entry('promoted', (2, 1.0)), Entry('other', (1, 1.0))
+    queue.put(promoted)
+    queue.put(other)
+    promoted.sort_key = (0, 1.0)
+    queue.put(promoted)
+    assert queue.get() is promoted
+    assert queue.get() is other
+    # The stale copy of promoted is dropped rather than returned again
+    queue.put(Entry('last', (2, 2.0)))
+    assert queue.get().name == 'last'
+
+def test_deadline_queue_get_blocks_until_put():
+    queue = DeadlineQueue()
+    received = []
+    consumer = threading.Thread(target=lambda: received.append(queue.get()))
+    consumer.start()
+    time.sleep(0.05)
+    assert not received
+    queue.put(Entry('late', (0, 0.0)))
+    consumer.join(5)
+    assert received[0].name == 'late'
+
+def test_stat_request_overtakes_queued_routine_work(pool, analyzer, images):
+    analyzer.release.clear()
+    running = pool.submit(images[0], 'chest')
+    analyzer.started.wait(5)
+    routine = pool.submit(images[1], 'chest')
+    stat = pool.submit(images[2], 'chest', priority='STAT')
+    analyzer.release.set()
+    wait_for(lambda: finished(running) and finished(routine) and finished(stat))
+    assert [call[0] for call in analyzer.calls] == ['a.png', 'c.png', 'b.png']
+
+def test_fast_fallback_is_used_when_behind_deadline(images):
+    analyzer = RecordingAnalyzer(fast_types=('neuro',))
+    pool = AnalysisPool(fast_fallback=True)
+    pool.set_ai_system(analyzer)
+    pool._record_service_time('neuro', False, 1e6)
+    request = pool.submit(images[0], 'neuro')
+    wait_for(lambda: finished(request))
+    assert analyzer.calls[0][1] == {'fast': True}
+    assert request.fast
+    # Fast results are not reused for later submissions
+    assert pool.submit(images[0], 'neuro') is not request
+
+def test_fallback_without_fast_variant_is_a_full_result(images):
+    analyzer = RecordingAnalyzer(fast_types=('neuro',))
+    pool = AnalysisPool(fast_fallback=True)
+    pool.set_ai_system(analyzer)
+    pool._record_service_time('chest', False, 1e6)
+    request = pool.submit(images[0], 'chest')
+    wait_for(lambda: finished(request))
+    assert not request.fast
+    assert pool.submit(images[0], 'chest') is request
+
+def test_fast_fallback_keeps_tta(images):
+    analyzer = RecordingAnalyzer(fast_types=('neuro',))
+    pool = AnalysisPool(fast_fallback=True)
+    pool.set_ai_system(analyzer)
+    pool._record_service_time('neuro', True, 1e6)
+    request = pool.submit(images[0], 'neuro', tta=True)
+    wait_for(lambda: finished(request))
+    assert analyzer.calls[0][1] == {'fast': True, 'tta': True}
+
+def test_tta_service_times_are_kept_apart(images):
+    analyzer = RecordingAnalyzer(fast_types=('neuro',))
+    pool = AnalysisPool(fast_fallback=True)
+    pool.set_ai_system(analyzer)
+    pool._record_service_time('neuro', True, 1e6)
+    request = pool.submit(images[0], 'neuro')
+    wait_for(lambda: finished(request))
+    assert analyzer.calls[0][1] == {}
+    assert not request.fast
+
+def test_no_fallback_without_a_service_time_estimate(images):
+    analyzer = RecordingAnalyzer(fast_types=('neuro',))
+    pool = AnalysisPool(fast_fallback=True)
+    pool.set_ai_system(analyzer)
+    request = pool.submit(images[0], 'neuro')
+    wait_for(lambda: finished(request))
+    assert analyzer.calls[0][1] == {}
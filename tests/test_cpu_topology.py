@@ -0,0 +1,61 @@
+import pytest
+
+from utils import cpu_topology
+from utils.cpu_topology import parse_cpu_list, plan_workers
+
+@pytest.fixture
+def host(monkeypatch):
+    """Fake host: set files to the sysfs/cgroup contents and cpus to the affinity mask"""
+    class Host:
+        files = {}
+        cpus = set(range(8))
+        nodes = None
+
+    monkeypatch.setattr(cpu_topology, '_read', lambda path: Host.files.get(path))
+    monkeypatch.setattr(cpu_topology, 'available_cpus', lambda: set(Host.cpus))
+    monkeypatch.setattr(cpu_topology, 'numa_nodes', lambda: Host.nodes or {0: sorted(Host.cpus)})
+    monkeypatch.delenv("CLINICAL_CPU_BUDGET", raising=False)
+    return Host
+
+def test_parse_cpu_list():
+    assert parse_cpu_list('0-3,8,10-11\n') == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list('') == []
+
+def test_cgroup_v2_quota(host):
+    host.files = {'/sys/fs/cgroup/cpu.max': '250000 100000'}
+    assert cpu_topology.cgroup_cpu_limit() == 2.5
+    host.files = {'/sys/fs/cgroup/cpu.max': 'max 100000'}
+    assert cpu_topology.cgroup_cpu_limit() is None
+
+def test_cgroup_v1_quota(host):
+    host.files = {
+        '/sys/fs/cgroup/cpu/cpu.cfs_quota_us': '150000',
+        '/sys/fs/cgroup/cpu/cpu.cfs_period_us': '100000'
+    }
+    assert cpu_topology.cgroup_cpu_limit() == 1.5
+    host.files['/sys/fs/cgroup/cpu/cpu.cfs_quota_us'] = '-1'
+    assert cpu_topology.cgroup_cpu_limit() is None
+
+def test_budget_is_smallest_of_affinity_quota_and_override(host, monkeypatch):
+    assert cpu_topology.cpu_budget() == 8
+    host.files = {'/sys/fs/cgroup/cpu.max': '250000 100000'}
+    assert cpu_topology.cpu_budget() == 3  # Quota rounded up
+    monkeypatch.setenv("CLINICAL_CPU_BUDGET", "2")
+    assert cpu_topology.cpu_budget() == 2
+
+def test_single_node_workers_share_the_budget_unpinned(host):
+    host.files = {'/sys/fs/cgroup/cpu.max': '400000 100000'}
+    placements = plan_workers(2)
+    assert [(placement.node, placement.threads) for placement in placements] == [(None, 2), (None, 2)]
+
+def test_workers_spread_over_numa_nodes(host):
+    host.nodes = {0: [0, 1, 2, 3], 1: [4, 5, 6, 7]}
+    placements = plan_workers(3)
+    assert [placement.node for placement in placements] == [0, 1, 0]
+    assert [placement.cpus for placement in placements] == [[0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 2, 3]]
+    # Budget 8 split three ways is 2; node 1's sole worker could use 4 but gets its share
+    assert [placement.threads for placement in placements] == [2, 2, 2]
+
+def test_workers_get_at_least_one_thread(host):
+    host.cpus = {0}
+    assert [placement.threads for placement in plan_workers(4)] == [1, 1, 1, 1]
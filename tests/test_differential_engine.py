@@ -0,0 +1,57 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from differential_engine import DifferentialEngine
+from radiology_knowledge_base import get_knowledge_base
+
+def rule(diagnosis, required, evidence):
+    return {
+        'diagnosis': diagnosis,
+        'likelihood': 'Moderate',
+        'required': required,
+        'evidence': evidence,
+        'supporting_findings': required,
+        'next_steps': ['Follow up']
+    }
+
+RULES = [
+    rule('Heart failure', ['Cardiomegaly', 'Edema'], {'Cardiomegaly': 0.5, 'Edema': 0.5}),
+    rule('Cardiomyopathy', ['Cardiomegaly'], {'Cardiomegaly': 1.0}),
+    rule('Pneumonia', ['Pneumonia'], {'Pneumonia': 1.0, 'Effusion': 0.5})
+]
+
+def finding(condition, confidence):
+    return {'condition': condition, 'confidence': confidence}
+
+def diagnoses(engine, findings):
+    return [differential['diagnosis'] for differential in engine.differentials(findings)]
+
+def test_rule_fires_only_when_all_required_findings_are_present():
+    engine = DifferentialEngine(RULES)
+    assert diagnoses(engine, [finding('Cardiomegaly', 80)]) == ['Cardiomyopathy']
+    assert 'Heart failure' in diagnoses(engine, [finding('Cardiomegaly', 80), finding('Edema', 60)])
+
+def test_differentials_are_ranked_by_weighted_confidence():
+    engine = DifferentialEngine(RULES)
+    results = engine.differentials([finding('Cardiomegaly', 50), finding('Pneumonia', 90), finding('Effusion', 40)])
+    assert [result['diagnosis'] for result in results] == ['Pneumonia', 'Cardiomyopathy']
+    assert results[0]['score'] == pytest.approx(0.9 + 0.5 * 0.4)
+    assert results[1]['score'] == pytest.approx(0.5)
+
+def test_findings_at_or_below_min_confidence_are_ignored():
+    engine = DifferentialEngine(RULES, min_confidence=30)
+    assert diagnoses(engine, [finding('Cardiomegaly', 30), finding('Pneumonia', 10)]) == []
+
+def test_evidence_for_rules_that_did_not_fire_is_not_reported():
+    engine = DifferentialEngine(RULES)
+    assert diagnoses(engine, [finding('Edema', 90), finding('Effusion', 90)]) == []
+
+def test_repeated_required_finding_counts_once():
+    engine = DifferentialEngine([rule('Mass', ['Mass', 'Mass'], {'Mass': 1.0})])
+    assert diagnoses(engine, [finding('Mass', 70)]) == ['Mass']
+
+def test_knowledge_base_rules_load():
+    knowledge_base = get_knowledge_base()
+    engine = DifferentialEngine(knowledge_base.differential_rules, knowledge_base.differential_min_confidence)
+    assert 'Hypertensive Heart Disease' in diagnoses(engine, [finding('Cardiomegaly', 90)])
@@ -0,0 +1,47 @@
+import os
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from utils.image_pyramid import ImagePyramidCache
+
+def write_image(path, size, seed):
+    pixels = np.random.default_rng(seed).integers(0, 255, (size, size), dtype=np.uint8)
+    Image.fromarray(pixels, 'L').save(path)
+    return pixels
+
+def test_levels_round_trip(tmp_path):
+    pixels = write_image(tmp_path / 'scan.png', 600, 0)
+    cache = ImagePyramidCache(str(tmp_path / 'cache'), tile_size=256)
+    assert np.array_equal(cache.read_level(str(tmp_path / 'scan.png'), 0)[:, :, 0], pixels)
+    assert cache.metadata(str(tmp_path / 'scan.png'))['levels'] == [[600, 600], [300, 300], [150, 150]]
+
+def test_cache_directory_is_private(tmp_path):
+    cache = ImagePyramidCache(str(tmp_path / 'cache'))
+    assert os.stat(cache.cache_dir).st_mode & 0o077 == 0
+
+def test_least_recently_used_pyramid_is_evicted(tmp_path):
+    paths = [str(tmp_path / f'scan{i}.png') for i in range(3)]
+    for i, path in enumerate(paths):
+        write_image(path, 300, i)
+    cache = ImagePyramidCache(str(tmp_path / 'cache'), tile_size=256, max_bytes=0)
+    cache.metadata(paths[0])
+    one_entry = cache.cache_bytes()
+
+    cache.max_bytes = 2 * one_entry
+    cache.metadata(paths[1])
+    os.utime(os.path.join(cache.cache_dir, cache.content_hash(paths[1]), 'meta.json'), (0, 0))
+    cache.metadata(paths[2])
+
+    remaining = set(os.listdir(cache.cache_dir))
+    assert remaining == {cache.content_hash(paths[0]), cache.content_hash(paths[2])}
+    assert cache.cache_bytes() <= cache.max_bytes
+
+def test_evicted_pyramid_is_rebuilt_on_read(tmp_path):
+    pixels = write_image(tmp_path / 'scan.png', 300, 0)
+    cache = ImagePyramidCache(str(tmp_path / 'cache'))
+    cache.metadata(str(tmp_path / 'scan.png'))
+    # Another process sharing the directory evicts the entry
+    ImagePyramidCache(cache.cache_dir).clear()
+    assert np.array_equal(cache.read_level(str(tmp_path / 'scan.png'), 0)[:, :, 0], pixels)
@@ -0,0 +1,91 @@
+import os
+import pickle
+import multiprocessing
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from ai.inference_process import RemoteAnalyzer, export_arrays, import_arrays, send_result
+from radiology_knowledge_base import get_knowledge_base
+
+def round_trip(value):
+    return import_arrays(pickle.loads(pickle.dumps(export_arrays(value))))
+
+def test_arrays_round_trip_through_shared_memory():
+    heatmap = np.arange(12, dtype=np.float32).reshape(3, 4)
+    result = round_trip({'success': True, 'heatmaps': [heatmap], 'shape': (3, 4)})
+    assert np.array_equal(result['heatmaps'][0], heatmap)
+    assert result['heatmaps'][0].dtype == np.float32
+    assert result['shape'] == (3, 4)
+
+def test_frozen_knowledge_base_entries_become_dicts():
+    knowledge_base = get_knowledge_base()
+    finding = {
+        'condition': 'Cardiomegaly',
+        'confidence': 80.0,
+        'description': knowledge_base.description('Cardiomegaly'),
+        'recommendations': knowledge_base.recommendations_for('Cardiomegaly', 80.0)
+    }
+    result = round_trip({'success': True, 'findings': [finding]})
+    assert result['findings'][0]['description'] == dict(knowledge_base.description('Cardiomegaly'))
+
+def test_advanced_radiology_report_round_trips():
+    pytest.importorskip("torch")
+    pytest.importorskip("torchxrayvision")
+    from advanced_radiology_ai import AdvancedRadiologyAI
+    from differential_engine import DifferentialEngine
+
+    # Report generation only needs the knowledge base, not the model
+    analyzer = AdvancedRadiologyAI.__new__(AdvancedRadiologyAI)
+    analyzer.knowledge_base = get_knowledge_base()
+    analyzer.differential_engine = DifferentialEngine(
+        analyzer.knowledge_base.differential_rules,
+        analyzer.knowledge_base.differential_min_confidence
+    )
+    report = analyzer.generate_comprehensive_report({'Cardiomegaly': 0.85, 'Effusion': 0.6, 'Edema': 0.1})
+    report['success'] = True
+
+    result = round_trip(report)
+    assert [finding['condition'] for finding in result['findings']] == ['Cardiomegaly', 'Effusion']
+    assert result['urgency_level'] == report['urgency_level']
+
+def test_unpicklable_result_is_reported_as_error():
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    send_result(sender, ('done', 7), {'success': True, 'callback': lambda: None})
+    kind, request_id, value = receiver.recv()
+    assert (kind, request_id) == ('done', 7)
+    assert value['success'] is False
+    assert 'could not be sent' in value['error']
+
+FLAKY_ANALYZER = """
+import os
+
+class FlakyAnalyzer:
+    def __init__(self):
+        if os.path.exists(os.environ['FLAKY_ANALYZER_FAIL']):
+            raise RuntimeError("out of memory")
+
+    def analyze_image(self, image_path, progress_callback=None):
+        os._exit(1)  # Killed mid-analysis
+"""
+
+def test_failed_restart_is_reported_as_result(tmp_path, monkeypatch):
+    pytest.importorskip("torch")  # The inference process reports its model registry
+    (tmp_path / 'flaky_analyzer.py').write_text(FLAKY_ANALYZER)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setenv('FLAKY_ANALYZER_FAIL', str(tmp_path / 'fail'))
+
+    analyzer = RemoteAnalyzer('flaky_analyzer', 'FlakyAnalyzer')
+    try:
+        (tmp_path / 'fail').touch()
+        crashed = analyzer.analyze_image('scan.png')
+        assert not crashed['success'] and 'stopped' in crashed['error']
+
+        restart_failed = analyzer.analyze_image('scan.png')
+        assert not restart_failed['success']
+        assert 'out of memory' in restart_failed['error']
+
+        (tmp_path / 'fail').unlink()
+        assert not analyzer.analyze_image('scan.png')['success']  # Restarted, then killed again
+    finally:
+        analyzer.close()
@@ -0,0 +1,62 @@
+import pytest
+
+from utils.patient_store import PatientStore, SAMPLE_PATIENTS
+
+def patient(number, name, dob='1980-01-01', last_visit='2024-03-01'):
+    return {'id': f'T{number:04d}', 'name': name, 'dob': dob, 'last_visit': last_visit}
+
+@pytest.fixture
+def store():
+    store = PatientStore(':memory:')
+    yield store
+    store.close()
+
+def all_pages(store, search='', limit=7):
+    rows, after = [], None
+    while True:
+        page = store.page(search, after, limit)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        after = (page[-1][1], page[-1][0])
+
+def test_empty_database_is_seeded(store):
+    assert store.count() == len(SAMPLE_PATIENTS)
+    assert store.patient('P001')['studies'][0]['date'] == '2024-01-10'
+
+def test_pages_cover_every_patient_once_in_name_order(store):
+    # Duplicate names exercise the id tie-breaker of the (name, id) key
+    store.add_patients(patient(i, f'Patient {i % 10}') for i in range(50))
+    rows = all_pages(store)
+    assert len(rows) == store.count() == 50 + len(SAMPLE_PATIENTS)
+    keys = [(row[1].lower(), row[0].lower()) for row in rows]
+    assert keys == sorted(keys)
+    assert len(set(keys)) == len(keys)
+
+def test_search_matches_id_and_name_prefixes_case_insensitively(store):
+    assert [row[0] for row in store.page('sarah')] == ['P002']
+    assert [row[0] for row in store.page('p00')] == ['P001', 'P003', 'P002']  # Ordered by name
+    assert store.count('  Mich ') == 1
+
+def test_search_matches_date_prefixes(store):
+    store.add_patients([patient(1, 'Ann Lee', dob='1990-07-04', last_visit='2023-12-31')])
+    assert {row[0] for row in store.page('2024-01')} == {'P001', 'P003'}
+    assert [row[0] for row in store.page('1990-07')] == ['T0001']
+    assert [row[0] for row in store.page('2023-12')] == ['T0001']
+
+def test_like_wildcards_are_matched_literally(store):
+    store.add_patients([patient(1, '100% Match'), patient(2, 'Under_score')])
+    assert store.count('%') == 0
+    assert [row[1] for row in store.page('100%')] == ['100% Match']
+    assert [row[1] for row in store.page('Under_')] == ['Under_score']
+    assert store.count('Unde%') == 0
+
+def test_paging_a_search_continues_after_the_key(store):
+    store.add_patients(patient(i, f'Smith {i:02d}') for i in range(20))
+    rows = all_pages(store, 'smith', limit=6)
+    assert [row[1] for row in rows] == [f'Smith {i:02d}' for i in range(20)]
+
+def test_replacing_a_patient_replaces_its_studies(store):
+    updated = dict(SAMPLE_PATIENTS[0], studies=[{'date': '2024-05-01', 'type': 'CT Chest', 'reason': 'Follow-up'}])
+    store.add_patients([updated])
+    assert [study['date'] for study in store.patient('P001')['studies']] == ['2024-05-01']
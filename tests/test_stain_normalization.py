@@ -0,0 +1,58 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+from PIL import Image
+
+from ai.stain_normalization import MacenkoNormalizer, REFERENCE_STAIN_MATRIX
+
+def synthetic_he(stain_matrix, pixels=4096, seed=0):
+    """RGB pixels stained with hematoxylin only, eosin only, or a mix of both"""
+    rng = np.random.default_rng(seed)
+    concentrations = rng.uniform(0.8, 1.5, size=(pixels, 2))
+    kind = rng.integers(0, 3, size=pixels)
+    concentrations[kind == 0, 1] = 0.0
+    concentrations[kind == 1, 0] = 0.0
+    optical_density = concentrations @ stain_matrix.T
+    rgb = 240.0 * np.exp(-optical_density) - 1.0
+    return np.clip(rgb, 0, 255).reshape(64, -1, 3)
+
+def test_stain_vectors_are_recovered_hematoxylin_first():
+    stain_matrix, max_concentrations = MacenkoNormalizer().estimate_stain_parameters(synthetic_he(REFERENCE_STAIN_MATRIX))
+    reference = REFERENCE_STAIN_MATRIX / np.linalg.norm(REFERENCE_STAIN_MATRIX, axis=0)
+    assert np.abs(stain_matrix - reference).max() < 0.05
+    assert max_concentrations.shape == (2,)
+
+@pytest.mark.parametrize('signs', [(1, 1), (-1, 1), (1, -1), (-1, -1)])
+def test_eigenvector_signs_do_not_swap_stains(monkeypatch, signs):
+    eigh = np.linalg.eigh
+
+    def flipped_eigh(matrix):
+        values, vectors = eigh(matrix)
+        vectors = vectors.copy()
+        vectors[:, 1] *= signs[0]
+        vectors[:, 2] *= signs[1]
+        return values, vectors
+
+    expected, _ = MacenkoNormalizer().estimate_stain_parameters(synthetic_he(REFERENCE_STAIN_MATRIX))
+    monkeypatch.setattr(np.linalg, 'eigh', flipped_eigh)
+    stain_matrix, _ = MacenkoNormalizer().estimate_stain_parameters(synthetic_he(REFERENCE_STAIN_MATRIX))
+    assert np.allclose(stain_matrix, expected, atol=1e-4)
+
+def test_background_slide_is_not_normalized():
+    assert MacenkoNormalizer().estimate_stain_parameters(np.full((64, 64, 3), 238.0)) is None
+
+def test_slide_cache_keeps_the_most_recently_used_slides(tmp_path):
+    normalizer = MacenkoNormalizer(max_slides=2)
+    paths = []
+    for i in range(3):
+        path = str(tmp_path / f'slide{i}.png')
+        Image.fromarray(synthetic_he(REFERENCE_STAIN_MATRIX, seed=i).astype(np.uint8)).save(path)
+        paths.append(path)
+
+    normalizer.slide_parameters(paths[0])
+    normalizer.slide_parameters(paths[1])
+    normalizer.slide_parameters(paths[0])  # Now the most recent
+    normalizer.slide_parameters(paths[2])
+    cached = [path for path, _ in normalizer._slide_cache]
+    assert cached == [paths[0], paths[2]]
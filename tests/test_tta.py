@@ -0,0 +1,31 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from ai.tta import VIEWS, augment_views, summarize_views
+
+def test_summary_is_mean_and_population_variance_per_condition():
+    probabilities = torch.tensor([[0.2, 0.9], [0.4, 0.9], [0.6, 0.9]])
+    summary = summarize_views(['Effusion', 'Nodule'], probabilities)
+    assert summary['views'] == 3
+    assert summary['mean'] == pytest.approx({'Effusion': 0.4, 'Nodule': 0.9})
+    assert summary['variance'] == pytest.approx({'Effusion': 0.08 / 3, 'Nodule': 0.0}, abs=1e-7)
+
+def test_views_are_one_batch_of_the_input_shape():
+    image = torch.rand(3, 32, 48)
+    views = augment_views(image)
+    assert views.shape == (len(VIEWS), 3, 32, 48)
+    assert views.dtype == image.dtype
+
+def test_identity_and_flip_views_are_exact():
+    image = torch.rand(1, 16, 16)
+    views = augment_views(image, [(False, 0, 1.0), (True, 0, 1.0)])
+    assert torch.allclose(views[0], image, atol=1e-5)
+    assert torch.allclose(views[1], image.flip(-1), atol=1e-5)
+
+def test_zoom_view_is_a_centre_crop():
+    # A horizontal ramp keeps its centre value and narrows its range when zoomed in
+    image = torch.linspace(-1, 1, 64).expand(1, 64, 64).contiguous()
+    zoomed = augment_views(image, [(False, 0, 1.25)])[0]
+    assert zoomed[0, 32, :].abs().max() < image[0, 32, :].abs().max()
+    assert zoomed[0, 32, 31:33].mean() == pytest.approx(0.0, abs=1e-5)
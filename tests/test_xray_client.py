@@ -0,0 +1,36 @@
+import os
+import socket
+import pytest
+
+import xray_client
+from xray_client import check_socket_owner, default_socket_path
+
+def test_socket_lives_in_private_runtime_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv('XRAY_DAEMON_SOCKET', raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    path = default_socket_path()
+    assert os.path.dirname(path) == str(tmp_path / 'clinical-imaging')
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+def test_socket_falls_back_to_private_cache_directory(tmp_path, monkeypatch):
+    monkeypatch.delenv('XRAY_DAEMON_SOCKET', raising=False)
+    monkeypatch.delenv('XDG_RUNTIME_DIR', raising=False)
+    monkeypatch.setenv('HOME', str(tmp_path))
+    (tmp_path / '.cache' / 'clinical-imaging' / 'run').mkdir(parents=True, mode=0o755)
+    path = default_socket_path()
+    assert path.startswith(str(tmp_path / '.cache'))
+    # An existing directory is tightened too
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+
+def test_environment_overrides_socket_path(monkeypatch):
+    monkeypatch.setenv('XRAY_DAEMON_SOCKET', '/run/custom.sock')
+    assert default_socket_path() == '/run/custom.sock'
+
+def test_socket_of_another_user_is_refused(tmp_path, monkeypatch):
+    path = str(tmp_path / 'daemon.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        check_socket_owner(path)
+        monkeypatch.setattr(os, 'getuid', lambda: os.stat(path).st_uid + 1)
+        with pytest.raises(PermissionError):
+            xray_client.request_analysis('scan.png', path)
@@ -0,0 +1,37 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("torchxrayvision")
+pytest.importorskip("sklearn")
+pytest.importorskip("matplotlib")
+from PIL import Image
+
+from xray_diagnosis import preprocess_image
+
+def gradient(mode, maxval):
+    """Non-square left-to-right ramp from 0 to maxval"""
+    ramp = np.tile(np.linspace(0, maxval, 400), (300, 1))
+    if mode == 'F':
+        return Image.fromarray(ramp.astype(np.float32), 'F')
+    if mode == 'I;16':
+        return Image.fromarray(ramp.astype(np.uint16), 'I;16')
+    if mode == 'I':
+        return Image.fromarray(ramp.astype(np.int32), 'I')
+    gray = Image.fromarray(ramp.astype(np.uint8), 'L')
+    return gray.convert(mode)
+
+@pytest.mark.parametrize('mode, maxval', [
+    ('L', 255), ('1', 255), ('RGB', 255), ('RGBA', 255), ('P', 255),
+    ('I;16', 65535), ('I', 65535), ('F', 3.5)
+])
+def test_every_mode_is_normalized_to_the_model_range(tmp_path, mode, maxval):
+    path = tmp_path / ('scan.tiff' if mode in ('F', 'I', 'I;16') else 'scan.png')
+    gradient(mode, maxval).save(path)
+    tensor = preprocess_image(str(path))
+    assert tuple(tensor.shape) == (1, 1, 224, 224)
+    assert tensor.dtype.is_floating_point
+    assert float(tensor.min()) >= -1024.5 and float(tensor.max()) <= 1024.5
+    if mode != '1':
+        # Dark on the left, bright on the right
+        assert float(tensor[0, 0, :, 0].mean()) < float(tensor[0, 0, :, -1].mean())
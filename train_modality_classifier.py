@@ -0,0 +1,43 @@
+import os
+import sys
+
+# Analyzers live in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+def labelled_images(folder):
+    """Images under <folder>/<modality>/<body part>/, with their (modality, body part) labels"""
+    from ai.modality_classifier import MODALITIES, BODY_PARTS
+
+    paths, labels = [], []
+    for modality in MODALITIES:
+        for body_part in BODY_PARTS:
+            directory = os.path.join(folder, modality, body_part)
+            if not os.path.isdir(directory):
+                continue
+            for root, _, files in os.walk(directory):
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(root, name))
+                        labels.append((modality, body_part))
+    return paths, labels
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python train_modality_classifier.py <folder>")
+        print("Images are read from <folder>/<modality>/<body part>/, e.g. <folder>/X-ray/chest/")
+        return
+
+    from ai.modality_classifier import train_modality_classifier
+
+    paths, labels = labelled_images(sys.argv[1])
+    if not paths:
+        print(f"Error: No labelled images found in {sys.argv[1]}")
+        return
+
+    print(f"Training the modality classifier on {len(paths)} images...")
+    print(f"Saved classifier weights to {train_modality_classifier(paths, labels)}")
+
+if __name__ == "__main__":
+    main()
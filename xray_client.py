@@ -0,0 +1,65 @@
+import os
+import sys
+import json
+import socket
+
+def default_socket_path():
+    """Daemon socket in a directory only the current user can enter.
+
+    $XDG_RUNTIME_DIR/clinical-imaging when the session has a runtime
+    directory, ~/.cache/clinical-imaging/run otherwise; XRAY_DAEMON_SOCKET
+    overrides it.
+    """
+    if 'XRAY_DAEMON_SOCKET' in os.environ:
+        return os.environ['XRAY_DAEMON_SOCKET']
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime:
+        directory = os.path.join(runtime, 'clinical-imaging')
+    else:
+        directory = os.path.join(os.path.expanduser("~"), ".cache", "clinical-imaging", "run")
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    os.chmod(directory, 0o700)
+    return os.path.join(directory, 'xray_diagnosis.sock')
+
+def check_socket_owner(socket_path):
+    """Refuse a socket bound by another user: requests carry patient image paths"""
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f"{socket_path} belongs to another user")
+
+def request_analysis(image_path, socket_path=None):
+    """Send an image to the warm-model daemon and return its report"""
+    socket_path = socket_path or default_socket_path()
+    check_socket_owner(socket_path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        request = json.dumps({'image_path': os.path.abspath(image_path)})
+        sock.sendall(request.encode('utf-8') + b'\n')
+        response = json.loads(sock.makefile('rb').readline())
+    
+    if not response.get('success', False):
+        return f"Error analyzing image: {response.get('error', 'Unknown error')}"
+    return response['report']
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python xray_client.py <path_to_xray_image>")
+        return
+    
+    image_path = sys.argv[1]
+    if not os.path.exists(image_path):
+        print(f"Error: Image file not found: {image_path}")
+        return
+    
+    print("\nAnalyzing X-ray image...")
+    try:
+        report = request_analysis(image_path)
+    except OSError as e:
+        # No usable daemon: fall back to a cold in-process analysis
+        if isinstance(e, PermissionError):
+            print(f"Not using the daemon: {e}")
+        import xray_diagnosis
+        report = xray_diagnosis.analyze_xray(image_path)
+    print("\n" + report)
+
+if __name__ == "__main__":
+    main()
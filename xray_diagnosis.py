@@ -1,40 +1,69 @@
 import torch
 import torchxrayvision as xrv
-import skimage, torch, torchvision
+import torchvision
 import sklearn, sklearn.metrics
 import numpy as np
 import matplotlib.pyplot as plt
 from PIL import Image
+import os
 import sys
+import json
+import stat
+import socket
+import socketserver
+
+# Shared model registry lives in src/
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from ai.model_registry import get_model_registry, load_xrv_densenet
+
+# Per-user Unix socket of the warm-model daemon (see xray_client.py)
+from xray_client import default_socket_path
 
 def load_model():
     """Load the pre-trained model"""
     print("Loading DenseNet model trained on multiple chest X-ray datasets...")
-    model = xrv.models.DenseNet(weights="densenet121-res224-all")
-    return model
+    return load_xrv_densenet("densenet121-res224-all")
 
-def preprocess_image(image_path):
+# ITU-R BT.709 luma weights, as used by skimage.color.rgb2gray
+LUMA_WEIGHTS = np.array([0.2125, 0.7154, 0.0721], dtype=np.float32)
+
+def preprocess_image(image_path, size=(224, 224)):
     """Preprocess the image for model input"""
     print(f"Processing image: {image_path}")
     
-    # Load and convert to grayscale
-    img = skimage.io.imread(image_path)
-    if len(img.shape) > 2:
-        img = skimage.color.rgb2gray(img)
+    # Decode at native bit depth and area-resample straight to the model size
+    image = Image.open(image_path)
+    if image.mode in ('I', 'I;16', 'I;16B', 'I;16L'):
+        # 16-bit films: resample as 32-bit integers, no float copy at full resolution
+        img = np.asarray(image.convert('I').resize(size, Image.Resampling.BOX), dtype=np.float32)
+        maxval = 65535
+    elif image.mode == 'F':
+        # Copied: asarray of a float32 image is a read-only view, and it is scaled in place below
+        img = np.array(image.resize(size, Image.Resampling.BOX), dtype=np.float32)
+        maxval = max(float(img.max()), 1.0)
+    elif image.mode in ('1', 'L'):
+        img = np.asarray(image.convert('L').resize(size, Image.Resampling.BOX), dtype=np.float32)
+        maxval = 255
+    else:
+        # Colour images: convert to grayscale after resampling, on 224x224 pixels only
+        img = np.asarray(image.convert('RGB').resize(size, Image.Resampling.BOX), dtype=np.float32)
+        img = img @ LUMA_WEIGHTS
+        maxval = 255
     
-    # Resize and normalize
-    img = skimage.transform.resize(img, (224, 224))
-    img = xrv.datasets.normalize(img, 255)
+    # Normalize to [-1024, 1024] in place, as xrv.datasets.normalize does
+    img *= 2048.0 / maxval
+    img -= 1024.0
     
     # Add channel and batch dimensions
     img = torch.from_numpy(img).unsqueeze(0).unsqueeze(0)
     return img
 
-def analyze_xray(image_path):
+def analyze_xray(image_path, model=None):
     """Analyze X-ray image and return findings"""
     try:
-        # Load model
-        model = load_model()
+        # Load model unless a warm one is supplied
+        if model is None:
+            model = load_model()
         
         # Process image
         img = preprocess_image(image_path)
@@ -42,7 +71,7 @@ def analyze_xray(image_path):
         # Get prediction
         print("Analyzing image...")
         with torch.no_grad():
-            preds = model(img)
+            preds = get_model_registry().forward(model, img).float().cpu()
         
         # Get predictions and pathology names
         pathologies = model.pathologies
@@ -180,9 +209,72 @@ def get_followup_plan(findings):
     
     return plan
 
+class XRayRequestHandler(socketserver.StreamRequestHandler):
+    """Answer newline-delimited JSON analysis requests with the daemon's warm model"""
+    
+    def handle(self):
+        for line in self.rfile:
+            try:
+                image_path = json.loads(line)['image_path']
+                if os.path.exists(image_path):
+                    response = {'success': True, 'report': analyze_xray(image_path, self.server.model)}
+                else:
+                    response = {'success': False, 'error': f"Image file not found: {image_path}"}
+            except Exception as e:
+                response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+def daemon_running(socket_path):
+    """Check whether a daemon is accepting connections on the socket"""
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def serve(socket_path=None):
+    """Keep the model warm and serve analysis requests over a local Unix socket"""
+    socket_path = socket_path or default_socket_path()
+    if daemon_running(socket_path):
+        print(f"Error: a daemon is already listening on {socket_path}")
+        return
+    if os.path.lexists(socket_path):
+        status = os.lstat(socket_path)
+        if not stat.S_ISSOCK(status.st_mode) or status.st_uid != os.getuid():
+            print(f"Error: {socket_path} exists and is not a socket of this user")
+            return
+        os.unlink(socket_path)  # Stale socket from a previous run
+    
+    model = load_model()
+    model.eval()
+    
+    # Created private, so no other user can connect between bind and listen
+    previous_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, XRayRequestHandler)
+    finally:
+        os.umask(previous_umask)
+    
+    with server:
+        server.model = model
+        print(f"X-ray diagnosis daemon listening on {socket_path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
 def main():
+    if len(sys.argv) == 2 and sys.argv[1] == "--serve":
+        serve()
+        return
+    
     if len(sys.argv) != 2:
         print("Usage: python xray_diagnosis.py <path_to_xray_image>")
+        print("       python xray_diagnosis.py --serve")
         return
     
     image_path = sys.argv[1]